@@ -1,21 +1,27 @@
 #1. Imports and Initial Setup
 import os
+import sys
 import cv2
 import numpy as np
 import mediapipe as mp
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.utils import to_categorical
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from tensorflow.keras.callbacks import TensorBoard
 import matplotlib.pyplot as plt
 
+# Shared keypoint tooling lives in the Django app's detection package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sign_language_detection"))
+from detection.dataset import SequenceDataset, convert_dataset, pack_mp_data
+from detection.features import FRAME_FEATURE_SIZE, frame_features
+from detection.keypoints import KeypointExtractor
+from detection.streaming import PredictionSmoother, SequenceWindow
+from detection.training import train
+
 # MediaPipe Initialization
 mp_holistic = mp.solutions.holistic  # Holistic model for face/pose/hand landmarks [[6]]
 mp_drawing = mp.solutions.drawing_utils  # Drawing utilities
 
 # Paths and Actions
-DATA_PATH = os.path.join("MP_Data")  # Folder to store training data
+DATA_PATH = os.path.join("MP_Data")  # Legacy one-.npy-per-frame training data
+PACKED_DATA_PATH = os.path.join("MP_Data.packed")  # Consolidated memory-mapped dataset (raw keypoints)
+FEATURES_DATA_PATH = os.path.join("MP_Data.features")  # The same sequences as pose + hand geometry features
 actions = np.array(["hello", "thanks", "iloveyou"])  # Actions to detect [[7]]
 no_sequences = 30  # Videos per action
 sequence_length = 30  # Frames per video
@@ -56,27 +62,21 @@ def draw_landmarks(image, results):
         mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
     )
 
+keypoint_extractor = KeypointExtractor()  # Reuses one preallocated 1662-float buffer
+
 def extract_keypoints(results):
-    """Extract keypoints from MediaPipe results and flatten into a vector."""
-    pose = np.array([[res.x, res.y, res.z, res.visibility] for res in results.pose_landmarks.landmark]).flatten() if results.pose_landmarks else np.zeros(33*4)
-    face = np.array([[res.x, res.y, res.z] for res in results.face_landmarks.landmark]).flatten() if results.face_landmarks else np.zeros(468*3)
-    lh = np.array([[res.x, res.y, res.z] for res in results.left_hand_landmarks.landmark]).flatten() if results.left_hand_landmarks else np.zeros(21*3)
-    rh = np.array([[res.x, res.y, res.z] for res in results.right_hand_landmarks.landmark]).flatten() if results.right_hand_landmarks else np.zeros(21*3)
-    return np.concatenate([pose, face, lh, rh])
+    """Extract keypoints from MediaPipe results into a new 1662-float vector."""
+    return keypoint_extractor.extract(results).copy()
 #3. Data Collection
-# Create directories for data
-for action in actions:
-    for sequence in range(no_sequences):
-        try:
-            os.makedirs(os.path.join(DATA_PATH, action, str(sequence)))
-        except:
-            pass
+# New recordings are appended to the consolidated dataset
+dataset = SequenceDataset.create(PACKED_DATA_PATH, sequence_length=sequence_length, feature_size=1662)
 
 # Collect data via webcam
 cap = cv2.VideoCapture(0)
 with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5) as holistic:
     for action in actions:
         for sequence in range(no_sequences):
+            window = []
             for frame_num in range(sequence_length):
                 ret, frame = cap.read()
                 image, results = mediapipe_detection(frame, holistic)
@@ -91,55 +91,43 @@ with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=
                     cv2.putText(image, f"Collecting frames for {action}", (15, 12),
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)
 
-                # Save keypoints
-                keypoints = extract_keypoints(results)
-                np.save(os.path.join(DATA_PATH, action, str(sequence), f"{frame_num}.npy"), keypoints)
+                # Collect keypoints
+                window.append(extract_keypoints(results))
                 cv2.imshow("Data Collection", image)
                 if cv2.waitKey(10) & 0xFF == ord("q"):
                     break
+
+            # Save the whole sequence at once (partial sequences are discarded)
+            if len(window) == sequence_length:
+                dataset.append(np.stack(window), action)
     cap.release()
     cv2.destroyAllWindows()
     #4. Model Training
 # Preprocess data
-label_map = {label: num for num, label in enumerate(actions)}
-sequences, labels = [], []
-
-for action in actions:
-    for sequence in range(no_sequences):
-        window = []
-        for frame_num in range(sequence_length):
-            res = np.load(os.path.join(DATA_PATH, action, str(sequence), f"{frame_num}.npy"))
-            window.append(res)
-        sequences.append(window)
-        labels.append(label_map[action])
-
-X = np.array(sequences)
-y = to_categorical(labels).astype(int)
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.05)
-
-# Build LSTM model [[2]]
+# Fold any legacy per-frame recordings into the dataset
+if os.path.isdir(DATA_PATH):
+    pack_mp_data(DATA_PATH, PACKED_DATA_PATH, actions=list(actions), sequence_length=sequence_length)
+# The model is trained on pose + hand geometry features (see detection.features),
+# computed once per frame for the sequences not converted yet. The raw dataset
+# is kept as is, for the Django training jobs and quantization calibration
+convert_dataset(PACKED_DATA_PATH, FEATURES_DATA_PATH)
+
+# Sequences are streamed from disk in shuffled shards (memory stays bounded by
+# the shuffle buffer); training stops once validation loss stops improving and
+# the best epoch is checkpointed to sign_language_model.h5
 log_dir = os.path.join("Logs")
-tb_callback = TensorBoard(log_dir=log_dir)
-
-model = Sequential([
-    LSTM(64, return_sequences=True, activation="relu", input_shape=(30, 1662)),
-    LSTM(128, return_sequences=True, activation="relu"),
-    LSTM(64, return_sequences=False, activation="relu"),
-    Dense(64, activation="relu"),
-    Dense(32, activation="relu"),
-    Dense(actions.shape[0], activation="softmax")
-])
-
-model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
-model.fit(X_train, y_train, epochs=200, callbacks=[tb_callback])
-model.save("sign_language_model.h5")
+model, history = train(
+    FEATURES_DATA_PATH, "sign_language_model.h5", actions=list(actions),
+    epochs=200, batch_size=32, validation_split=0.05, patience=20, log_dir=log_dir,
+)
 #5. Real-Time Detection
 # Load trained model
 model.load_weights("sign_language_model.h5")
 
 # Real-time detection loop
-sequence, sentence, predictions = [], [], []
-threshold = 0.8
+# Fixed-size window and O(1) smoother: memory stays flat however long it runs
+window = SequenceWindow(sequence_length, FRAME_FEATURE_SIZE)
+smoother = PredictionSmoother(history=10, threshold=0.8, max_sentence=5)
 
 cap = cv2.VideoCapture(0)
 with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5) as holistic:
@@ -149,24 +137,18 @@ with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=
         draw_landmarks(image, results)
 
         # Prediction logic
-        keypoints = extract_keypoints(results)
-        sequence.append(keypoints)
-        sequence = sequence[-30:]
+        window.append(frame_features(keypoint_extractor.extract(results)))
 
-        if len(sequence) == 30:
-            res = model.predict(np.expand_dims(sequence, axis=0))[0]
-            predictions.append(np.argmax(res))
+        if window.is_full:
+            res = model(window.batch(), training=False).numpy()[0]
 
             # Smooth predictions [[7]]
-            if np.unique(predictions[-10:])[0] == np.argmax(res) and res[np.argmax(res)] > threshold:
-                if len(sentence) == 0 or actions[np.argmax(res)] != sentence[-1]:
-                    sentence.append(actions[np.argmax(res)])
-                if len(sentence) > 5:
-                    sentence = sentence[-5:]
+            best = np.argmax(res)
+            smoother.update(actions[best], float(res[best]))
 
         # Visualization
         cv2.rectangle(image, (0, 0), (640, 40), (245, 117, 16), -1)
-        cv2.putText(image, " ".join(sentence), (3, 30),
+        cv2.putText(image, " ".join(smoother.sentence), (3, 30),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
 
         cv2.imshow("Sign Language Detection", image)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Worker memory per concurrent audio download: whole-file HttpResponse vs serve_file.
+
+Opens ``--concurrency`` responses for the same recording and reads only the
+first chunk of each, like slow clients that are still downloading, then
+reports the Python heap held by them (tracemalloc). Also times a small Range
+request (a seek in the audio element) against a full download.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_audio_serving.py [--size-mb 20] [--concurrency 1 10 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import django
+from django.conf import settings
+
+settings.configure(ALLOWED_HOSTS=['*'])
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from detection.file_serving import serve_file
+
+
+def legacy_serve(request, path):
+    # What serve_audio did before
+    with open(path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type='audio/wav')
+        return response
+
+
+def in_flight_memory(serve, request, path, concurrency):
+    tracemalloc.start()
+    responses = []
+    for _ in range(concurrency):
+        response = serve(request, path)
+        iterator = iter(response)
+        next(iterator)  # First chunk sent, the rest still pending
+        responses.append((response, iterator))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for response, _ in responses:
+        response.close()
+    return current, peak
+
+
+def drain(response):
+    total = sum(len(chunk) for chunk in response)
+    response.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    factory = RequestFactory()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'recording.wav')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(int(args.size_mb * 1024 * 1024)))
+
+        print(f"file size {args.size_mb:.0f} MB")
+        print(f"{'downloads':>9} {'legacy held':>12} {'serve_file held':>16}")
+        request = factory.get('/audio/recording.wav')
+        for concurrency in args.concurrency:
+            legacy, _ = in_flight_memory(legacy_serve, request, path, concurrency)
+            streamed, _ = in_flight_memory(
+                lambda r, p: serve_file(r, p, content_type='audio/wav'), request, path, concurrency)
+            print(f"{concurrency:>9} {legacy / 2**20:>10.1f}MB {streamed / 2**20:>14.2f}MB")
+
+        start = time.perf_counter()
+        full = drain(legacy_serve(request, path))
+        legacy_ms = (time.perf_counter() - start) * 1000
+        ranged = factory.get('/audio/recording.wav', HTTP_RANGE='bytes=1048576-1114111')
+        start = time.perf_counter()
+        response = serve_file(ranged, path, content_type='audio/wav')
+        partial = drain(response)
+        range_ms = (time.perf_counter() - start) * 1000
+        print(f"seek: legacy sends {full / 2**20:.0f} MB in {legacy_ms:.1f}ms, "
+              f"Range request sends {partial / 1024:.0f} KB ({response.status_code}) in {range_ms:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
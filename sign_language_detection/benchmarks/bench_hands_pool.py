@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput of 30 fps client streams through MediaPipe Hands.
+
+Each of ``--streams`` clients sends a frame every 1/30 s (skipping frames it
+is already too late for) to a ``--workers`` thread "server" and waits for
+the landmarks. Three setups are compared:
+
+- shared: one static-image graph behind a lock (what the model did before)
+- per-thread: ``HandsPool`` without stream ids, one static graph per worker
+- tracking: ``HandsPool`` with one video-mode graph per stream
+
+With ``--image`` pointing at a photo of a hand, real MediaPipe graphs are
+used. Otherwise a simulated graph stands in: palm detection costs
+``--detect-ms`` and landmarks ``--landmark-ms``, spent in ``time.sleep`` so the
+GIL is released like in MediaPipe's C++ calculators, and video mode skips
+detection while it keeps the track (re-detecting every ``--redetect`` frames).
+
+Usage (from the Django project directory):
+    python benchmarks/bench_hands_pool.py [--streams 4] [--workers 4] [--seconds 5]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from detection.hands_pool import HandsPool, mediapipe_hands
+
+FPS = 30
+
+
+class SimulatedHands:
+    def __init__(self, static_image_mode, detect_ms=12.0, landmark_ms=4.0, redetect=60, **options):
+        self.static = static_image_mode
+        self.detect = detect_ms / 1000
+        self.landmark = landmark_ms / 1000
+        self.redetect = redetect
+        self.frames = 0
+
+    def process(self, image):
+        if self.static or self.frames % self.redetect == 0:
+            time.sleep(self.detect)
+        time.sleep(self.landmark)
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class SharedHands:
+    """The previous setup: one static graph for every thread, behind a lock."""
+
+    def __init__(self, factory):
+        self.hands = factory(static_image_mode=True)
+        self.lock = threading.Lock()
+
+    def process(self, image, session=None):
+        with self.lock:
+            return self.hands.process(image)
+
+
+def run(processor, args, image):
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    latencies = []
+    skipped = [0]
+    lock = threading.Lock()
+
+    def client(stream):
+        session = f'stream-{stream}' if args.use_sessions else None
+        start = time.perf_counter() + stream / FPS / args.streams
+        frame = 0
+        deadline = start + args.seconds
+        while True:
+            due = start + frame / FPS
+            if due >= deadline:
+                break
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+            executor.submit(processor.process, image, session).result()
+            latency = (time.perf_counter() - due) * 1000
+            with lock:
+                latencies.append(latency)
+            # A real client only sends the newest frame once it gets an answer
+            newest = max(frame + 1, int((time.perf_counter() - start) * FPS))
+            with lock:
+                skipped[0] += newest - frame - 1
+            frame = newest
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.streams)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    executor.shutdown()
+    latencies.sort()
+    return {
+        'fps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'skipped': skipped[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--image', help='RGB photo of a hand; uses real MediaPipe graphs')
+    parser.add_argument('--detect-ms', type=float, default=12.0)
+    parser.add_argument('--landmark-ms', type=float, default=4.0)
+    parser.add_argument('--redetect', type=int, default=60)
+    args = parser.parse_args()
+
+    if args.image:
+        import cv2
+        image = cv2.cvtColor(cv2.imread(args.image), cv2.COLOR_BGR2RGB)
+        factory = mediapipe_hands
+        print(f"MediaPipe Hands on {args.image} ({image.shape[1]}x{image.shape[0]})")
+    else:
+        image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        def factory(static_image_mode, **options):
+            return SimulatedHands(static_image_mode, args.detect_ms, args.landmark_ms, args.redetect)
+        print(f"Simulated graph: detection {args.detect_ms} ms, landmarks {args.landmark_ms} ms, "
+              f"re-detect every {args.redetect} frames in video mode")
+
+    offered = args.streams * FPS
+    print(f"{args.streams} streams x {FPS} fps = {offered} frames/s offered, {args.workers} workers")
+    print(f"{'setup':<12} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'skipped':>8}")
+    setups = [
+        ('shared', SharedHands(factory), False),
+        ('per-thread', HandsPool(factory=factory), False),
+        ('tracking', HandsPool(factory=factory), True),
+    ]
+    for name, processor, use_sessions in setups:
+        args.use_sessions = use_sessions
+        result = run(processor, args, image)
+        print(f"{name:<12} {result['fps']:>9.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} {result['skipped']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Image-to-landmarks latency of /api/detect-sign/ and /api/extract-landmarks/.
+
+Compares the previous path (base64 JSON, PIL decode, ``np.array`` and an
+RGB->BGR ``cvtColor``) with ``decode_image`` on the raw upload, at full size
+and scaled down to ``--max-side``. When MediaPipe is installed the time of
+``Hands.process`` on the resulting frame is included, which is where the
+smaller frame pays off most; otherwise only the decode is timed.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_image_decode.py [--width 1920 --height 1080] [--max-side 640]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from detection.images import decode_image
+
+
+def legacy_decode(body):
+    # What the views did before: JSON + base64, PIL, then RGB->BGR for MediaPipe
+    image_bytes = base64.b64decode(json.loads(body)['image_data'])
+    image_array = np.array(Image.open(io.BytesIO(image_bytes)))
+    return cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+
+
+def synthetic_photo(width, height, rng):
+    # Smooth gradients plus noise compress like a camera frame, unlike pure noise
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    image += rng.normal(0, 12, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def timed(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.95) - 1]
+
+
+def make_hands():
+    try:
+        import mediapipe as mp
+    except ImportError:
+        return None
+    return mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--max-side', type=int, default=640)
+    parser.add_argument('--quality', type=int, default=90)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ok, jpeg = cv2.imencode('.jpg', synthetic_photo(args.width, args.height, rng),
+                            [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+    jpeg = jpeg.tobytes()
+    body = json.dumps({'image_data': base64.b64encode(jpeg).decode('ascii')}).encode()
+    hands = make_hands()
+
+    paths = [
+        ('legacy (base64 + PIL + BGR)', lambda: legacy_decode(body)),
+        ('decode_image, full size', lambda: decode_image(jpeg)),
+        (f'decode_image, max side {args.max_side}', lambda: decode_image(jpeg, args.max_side)),
+    ]
+    print(f"{args.width}x{args.height} JPEG, {len(jpeg) / 1024:.0f} KB "
+          f"({len(body) / 1024:.0f} KB as base64 JSON)")
+    if hands is None:
+        print("MediaPipe not installed: timing the decode only")
+    print(f"{'path':<34} {'frame':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, decode in paths:
+        frame = decode()
+        if hands is not None:
+            def run(decode=decode):
+                hands.process(decode())
+        else:
+            run = decode
+        run()  # warm up
+        p50, p95 = timed(run, args.repeats)
+        print(f"{name:<34} {frame.shape[1]:>4}x{frame.shape[0]:<5} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
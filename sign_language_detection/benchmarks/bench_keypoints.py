@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost of turning MediaPipe Holistic results into a keypoint vector.
+
+Compares the original list-comprehension ``extract_keypoints`` with
+``KeypointExtractor`` (full 1662-value layout, and hands only). The results
+are synthetic objects with the same attribute layout as MediaPipe's, so
+MediaPipe itself is not needed.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_keypoints.py [--repeats 5000] [--missing-hands]
+"""
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from detection.keypoints import KeypointExtractor
+
+
+def legacy_extract_keypoints(results):
+    # The implementation previously copied into the collection script and the Tk app
+    pose = np.array([[res.x, res.y, res.z, res.visibility] for res in results.pose_landmarks.landmark]).flatten() if results.pose_landmarks else np.zeros(33*4)
+    face = np.array([[res.x, res.y, res.z] for res in results.face_landmarks.landmark]).flatten() if results.face_landmarks else np.zeros(468*3)
+    lh = np.array([[res.x, res.y, res.z] for res in results.left_hand_landmarks.landmark]).flatten() if results.left_hand_landmarks else np.zeros(21*3)
+    rh = np.array([[res.x, res.y, res.z] for res in results.right_hand_landmarks.landmark]).flatten() if results.right_hand_landmarks else np.zeros(21*3)
+    return np.concatenate([pose, face, lh, rh])
+
+
+def fake_landmarks(count, rng):
+    return SimpleNamespace(landmark=[
+        SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v))
+        for x, y, z, v in rng.random((count, 4))
+    ])
+
+
+def fake_results(rng, missing_hands=False):
+    return SimpleNamespace(
+        pose_landmarks=fake_landmarks(33, rng),
+        face_landmarks=fake_landmarks(468, rng),
+        left_hand_landmarks=None if missing_hands else fake_landmarks(21, rng),
+        right_hand_landmarks=None if missing_hands else fake_landmarks(21, rng),
+    )
+
+
+def time_per_call(func, results, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(results)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5000)
+    parser.add_argument('--missing-hands', action='store_true', help='Benchmark frames with no hands detected')
+    args = parser.parse_args()
+
+    results = fake_results(np.random.default_rng(0), args.missing_hands)
+    full = KeypointExtractor()
+    hands_only = KeypointExtractor(include_pose=False, include_face=False)
+
+    np.testing.assert_allclose(full.extract(results), legacy_extract_keypoints(results), rtol=1e-6)
+
+    legacy_us = time_per_call(legacy_extract_keypoints, results, args.repeats)
+    print(f"{'variant':<22} {'values':>6} {'per frame':>10}")
+    print(f"{'list comprehension':<22} {1662:>6} {legacy_us:>8.1f}us")
+    for name, extractor in (('extractor', full), ('extractor, hands only', hands_only)):
+        us = time_per_call(extractor.extract, results, args.repeats)
+        print(f"{name:<22} {extractor.size:>6} {us:>8.1f}us ({legacy_us / us:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
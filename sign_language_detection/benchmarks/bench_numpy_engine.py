@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark serving the landmark classifier with Keras vs the NumPy engine.
+
+Each backend runs in a fresh subprocess so that startup time (imports plus
+model load) and peak RSS are measured independently of the other backend.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_numpy_engine.py [--keras ../hand_landmarks.keras]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def measure_latency(predict, batch_size, repeats):
+    import numpy as np
+
+    batch = np.random.rand(batch_size, 21, 3).astype(np.float32)
+    predict(batch)  # first call includes tracing/allocation
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(batch)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    timings.sort()
+    return {'p50_ms': timings[len(timings) // 2], 'p95_ms': timings[int(0.95 * (len(timings) - 1))]}
+
+
+def run_worker(backend, model_path, repeats):
+    start = time.perf_counter()
+    if backend == 'keras':
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model_path)
+        predict = lambda x: model(x, training=False).numpy()
+    else:
+        from detection.numpy_engine import NumpyModel
+        model = NumpyModel.load(model_path)
+        predict = model.predict
+    startup = time.perf_counter() - start
+
+    result = {
+        'backend': backend,
+        'startup_s': startup,
+        'latency': {size: measure_latency(predict, size, repeats) for size in (1, 16, 64)},
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+    print(json.dumps(result))
+
+
+def run_backend(backend, model_path, repeats):
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', backend, '--model', model_path, '--repeats', str(repeats)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keras', default=os.path.join(os.path.dirname(PROJECT_DIR), 'hand_landmarks.keras'))
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--worker', choices=['keras', 'numpy'], help=argparse.SUPPRESS)
+    parser.add_argument('--model', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.model, args.repeats)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, 'model.npz')
+        subprocess.run(
+            [sys.executable, '-c',
+             'import sys, tensorflow as tf; sys.path.insert(0, sys.argv[3]); '
+             'from detection.numpy_engine import export_keras_model; '
+             'export_keras_model(tf.keras.models.load_model(sys.argv[1]), sys.argv[2])',
+             args.keras, npz_path, PROJECT_DIR],
+            check=True, capture_output=True, env=dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3'),
+        )
+        results = [run_backend('keras', args.keras, args.repeats), run_backend('numpy', npz_path, args.repeats)]
+
+    print(f"{'backend':<8} {'startup':>9} {'peak RSS':>10} {'b=1 p50':>9} {'b=16 p50':>9} {'b=64 p50':>9}")
+    for r in results:
+        lat = r['latency']
+        print(f"{r['backend']:<8} {r['startup_s']:>8.2f}s {r['peak_rss_mb']:>8.0f}MB "
+              f"{lat['1']['p50_ms']:>7.3f}ms {lat['16']['p50_ms']:>7.3f}ms {lat['64']['p50_ms']:>7.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
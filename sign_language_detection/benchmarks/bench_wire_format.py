@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compare the JSON list-of-dicts landmark payload with the binary float32 format.
+
+Measures bytes on the wire and server-side parse cost (decode + validation +
+conversion to a float32 (frames, 21, 3) array) per request.
+
+Usage (from the Django project directory):
+    python benchmarks/bench_wire_format.py [--frames 1 30] [--repeats 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from detection.wire import decode_landmarks, encode_landmarks
+
+
+def parse_json(body):
+    # Same work as DetectSignView._detect_from_landmarks, once per frame
+    data = json.loads(body)
+    frames = []
+    for landmarks_data in data['frames']:
+        if len(landmarks_data) != 21:
+            raise ValueError('Expected 21 landmarks')
+        landmarks = []
+        for landmark in landmarks_data:
+            if not all(key in landmark for key in ['x', 'y', 'z']):
+                raise ValueError('Missing coordinate')
+            landmarks.append([landmark['x'], landmark['y'], landmark['z']])
+        frames.append(landmarks)
+    return np.array(frames, dtype=np.float32)
+
+
+def time_per_call(func, body, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(body)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, nargs='+', default=[1, 30])
+    parser.add_argument('--repeats', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'frames':>6} {'format':<8} {'bytes':>8} {'parse':>10}")
+    for frames in args.frames:
+        landmarks = np.random.rand(frames, 21, 3).astype(np.float32)
+        json_body = json.dumps({'frames': [
+            [{'x': float(x), 'y': float(y), 'z': float(z)} for x, y, z in frame] for frame in landmarks
+        ]}).encode()
+        binary_body = encode_landmarks(landmarks)
+
+        assert np.array_equal(parse_json(json_body), decode_landmarks(binary_body))
+        repeats = max(1, args.repeats // frames)
+        json_us = time_per_call(parse_json, json_body, repeats)
+        binary_us = time_per_call(decode_landmarks, binary_body, repeats)
+
+        print(f"{frames:>6} {'json':<8} {len(json_body):>8,} {json_us:>8.1f}us")
+        print(f"{frames:>6} {'binary':<8} {len(binary_body):>8,} {binary_us:>8.1f}us "
+              f"({len(json_body) / len(binary_body):.1f}x smaller, {json_us / binary_us:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Incrementally maintained detection analytics.
+
+``record_detections`` folds newly written ``DetectionHistory`` rows into the
+running totals (``UserAnalytics``), the per-gesture counters and the hourly
+and daily rollups using ``F()`` updates, so its cost does not depend on how
+many detections a user already has. ``rebuild_user_analytics`` recomputes
+all of them from ``DetectionHistory`` (see the ``rebuild_analytics``
+command).
+"""
+
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import (
+    DailyDetectionRollup, DetectionHistory, GestureCount, HourlyDetectionRollup, UserAnalytics,
+)
+
+
+def _hour_bucket(timestamp):
+    return timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_bucket(timestamp):
+    return timezone.localdate(timestamp)
+
+
+def _increment(model, lookup, count, confidence_sum):
+    """Add to a counter row, creating it if it does not exist yet."""
+    changes = {'count': F('count') + count, 'confidence_sum': F('confidence_sum') + confidence_sum}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=count, confidence_sum=confidence_sum, **lookup)
+    except IntegrityError:
+        # Created concurrently
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_detections(user, detections):
+    """Fold saved ``DetectionHistory`` rows of ``user`` (a user or its pk) into the aggregates."""
+    user_id = getattr(user, 'pk', user)
+    gestures = defaultdict(lambda: [0, 0.0])
+    hours = defaultdict(lambda: [0, 0.0])
+    days = defaultdict(lambda: [0, 0.0])
+    for detection in detections:
+        for bucket in (gestures[detection.gesture],
+                       hours[_hour_bucket(detection.timestamp)],
+                       days[_day_bucket(detection.timestamp)]):
+            bucket[0] += 1
+            bucket[1] += detection.confidence
+    if not gestures:
+        return
+
+    total = sum(count for count, _ in gestures.values())
+    confidence_sum = sum(s for _, s in gestures.values())
+
+    with transaction.atomic():
+        updated = UserAnalytics.objects.filter(user_id=user_id).update(
+            total_detections=F('total_detections') + total,
+            confidence_sum=F('confidence_sum') + confidence_sum,
+            average_confidence=(F('confidence_sum') + confidence_sum) / (F('total_detections') + total),
+            last_updated=timezone.now(),
+        )
+        if not updated:
+            UserAnalytics.objects.create(
+                user_id=user_id, total_detections=total, confidence_sum=confidence_sum,
+                average_confidence=confidence_sum / total,
+            )
+        for gesture, (count, s) in gestures.items():
+            _increment(GestureCount, {'user_id': user_id, 'gesture': gesture}, count, s)
+        for hour, (count, s) in hours.items():
+            _increment(HourlyDetectionRollup, {'user_id': user_id, 'hour': hour}, count, s)
+        for day, (count, s) in days.items():
+            _increment(DailyDetectionRollup, {'user_id': user_id, 'day': day}, count, s)
+
+
+def rebuild_user_analytics(user):
+    """Recompute every aggregate of ``user`` from ``DetectionHistory``."""
+    # order_by() clears the default ordering so it does not end up in GROUP BY
+    history = DetectionHistory.objects.filter(user=user).order_by()
+    totals = {'count': Count('id'), 'confidence_sum': Sum('confidence')}
+
+    with transaction.atomic():
+        overall = history.aggregate(**totals)
+        total, confidence_sum = overall['count'], overall['confidence_sum'] or 0.0
+        analytics = UserAnalytics.objects.filter(user=user)
+        values = {
+            'total_detections': total,
+            'confidence_sum': confidence_sum,
+            'average_confidence': confidence_sum / total if total else 0.0,
+            'last_updated': timezone.now(),
+        }
+        if not analytics.update(**values):
+            UserAnalytics.objects.create(user=user, **values)
+
+        GestureCount.objects.filter(user=user).delete()
+        GestureCount.objects.bulk_create(
+            GestureCount(user=user, gesture=row['gesture'], count=row['count'], confidence_sum=row['confidence_sum'])
+            for row in history.values('gesture').annotate(**totals).iterator()
+        )
+
+        HourlyDetectionRollup.objects.filter(user=user).delete()
+        HourlyDetectionRollup.objects.bulk_create(
+            HourlyDetectionRollup(user=user, hour=row['bucket'], count=row['count'],
+                                  confidence_sum=row['confidence_sum'])
+            for row in history.annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+                              .values('bucket').annotate(**totals).iterator()
+        )
+
+        DailyDetectionRollup.objects.filter(user=user).delete()
+        DailyDetectionRollup.objects.bulk_create(
+            DailyDetectionRollup(user=user, day=row['bucket'], count=row['count'],
+                                 confidence_sum=row['confidence_sum'])
+            for row in history.annotate(bucket=TruncDate('timestamp'))
+                              .values('bucket').annotate(**totals).iterator()
+        )
+    return total
+
+
+def top_gestures(user, limit=5):
+    return list(
+        GestureCount.objects.filter(user=user, count__gt=0)
+        .order_by('-count').values('gesture', 'count')[:limit]
+    )
+
+
+def daily_confidence(user, days=30):
+    """Mean confidence per day over the last ``days`` days, oldest first."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return [
+        {'timestamp': rollup.day.isoformat(), 'confidence': rollup.average_confidence, 'count': rollup.count}
+        for rollup in DailyDetectionRollup.objects.filter(user=user, day__gte=since).order_by('day')
+    ]
@@ -3,49 +3,86 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.conf import settings
 import json
-import base64
-import cv2
 import numpy as np
-from PIL import Image
-import io
 import logging
 
-from .model_loader import SignLanguageModel
+from .model_registry import registry, load_landmark_model
+from .model_loader import artifact_path
+from .batching import BatcherOverloaded, landmark_batcher, prediction_cache
+from .event_sink import detection_events
+from .wire import decode_landmarks, is_binary_request
+from .images import ImageDataError, decode_base64_image, decode_image, image_bytes, is_image_request
+from .hands_pool import hands_pool
+from .lifecycle import model_lifecycle
 
 logger = logging.getLogger(__name__)
 
+def stream_session(request):
+    """Hands tracking session of a client sending consecutive frames, if any.
+
+    Clients opt in with an ``X-Stream-Id`` header (or ``?stream=``); the id is
+    namespaced by user so streams of different users never share a graph.
+    """
+    stream = request.META.get('HTTP_X_STREAM_ID') or request.GET.get('stream')
+    if not stream:
+        return None
+    owner = request.user.pk if request.user.is_authenticated else request.META.get('REMOTE_ADDR')
+    return f'{owner}:{stream[:64]}'
+
+def overloaded_response(error):
+    """503 for a request the detection batcher rejected because its queue is full."""
+    response = JsonResponse({
+        'error': str(error),
+        'letter': '?',
+        'confidence': 0.0
+    }, status=503)
+    response['Retry-After'] = '1'
+    return response
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def health_check(request):
-    """Health check endpoint for the API."""
+    """Health check endpoint for the API; 503 until the models are loaded and warmed up."""
+    model_lifecycle.start()
+    ready = model_lifecycle.is_ready()
+    lifecycle = model_lifecycle.status()
     return JsonResponse({
-        'status': 'healthy',
+        'status': 'healthy' if ready else 'starting',
         'service': 'Sign Language Detection API',
         'version': '1.0.0',
+        'ready': ready,
+        'lifecycle': lifecycle,
+        'models': lifecycle['models'],
+        'batching': landmark_batcher.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'events': detection_events.stats(),
+        'hands': hands_pool.stats(),
         'features': {
             'landmark_detection': True,
             'image_detection': True,
             'mediapipe_integration': True
         }
-    })
+    }, status=200 if ready else 503)
 
 @csrf_exempt
 @require_http_methods(["GET"])
 def model_info(request):
     """Get information about the loaded model."""
     try:
-        model_instance = SignLanguageModel()
+        model_instance = registry.get('landmarks')
         info = model_instance.get_model_info()
         
         return JsonResponse({
             'model_info': info,
+            'registry': registry.status()['landmarks'],
             'available_methods': ['landmarks', 'image'],
-            'supported_formats': ['base64_image', 'landmark_coordinates'],
+            'supported_formats': ['base64_image', 'image_upload', 'landmark_coordinates'],
             'output_classes': 26,  # A-Z
             'input_requirements': {
                 'landmarks': '21 hand landmarks with x,y,z coordinates',
-                'image': 'Base64 encoded image (JPEG/PNG)'
+                'image': 'JPEG/PNG/WebP as the request body, a multipart "image" file or base64 image_data'
             }
         })
     except Exception as e:
@@ -58,13 +95,19 @@ def model_info(request):
 class DetectSignView(View):
     """Main detection endpoint for sign language recognition."""
     
-    def __init__(self):
-        super().__init__()
-        self.model = SignLanguageModel()
+    @property
+    def model(self):
+        # Looked up on every access so that hot-swapped versions are picked up
+        return registry.get('landmarks')
     
     def post(self, request):
         """Handle sign detection requests."""
         try:
+            if is_binary_request(request):
+                return self._detect_from_binary(request.body)
+            if is_image_request(request):
+                return self._detect_from_image(image_bytes(request), stream_session(request))
+            
             # Parse request data
             data = json.loads(request.body)
             use_landmarks = data.get('use_landmarks', True)
@@ -72,7 +115,7 @@ class DetectSignView(View):
             if use_landmarks and 'landmarks' in data:
                 return self._detect_from_landmarks(data['landmarks'])
             elif 'image_data' in data:
-                return self._detect_from_image(data['image_data'])
+                return self._detect_from_image(decode_base64_image(data['image_data']), stream_session(request))
             else:
                 return JsonResponse({
                     'error': 'Missing required data. Provide either landmarks or image_data.'
@@ -82,6 +125,10 @@ class DetectSignView(View):
             return JsonResponse({
                 'error': 'Invalid JSON data'
             }, status=400)
+        except ImageDataError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
         except Exception as e:
             logger.error(f"Detection error: {str(e)}")
             return JsonResponse({
@@ -105,18 +152,14 @@ class DetectSignView(View):
                     }, status=400)
                 landmarks.append([landmark['x'], landmark['y'], landmark['z']])
             
-            # Make prediction
-            result = self.model.predict(np.array(landmarks))
+            # Make prediction (batched with other concurrent requests)
+            result = landmark_batcher.submit(np.array(landmarks, dtype=np.float32))
+            self._record_detection(result)
             
-            return JsonResponse({
-                'letter': result['letter'],
-                'confidence': float(result['confidence']),
-                'processing_time': result.get('processing_time', 0),
-                'method': 'landmarks',
-                'landmarks_detected': True,
-                'raw_predictions': result.get('raw_predictions', [])
-            })
+            return JsonResponse(self._landmark_response_data(result))
             
+        except BatcherOverloaded as e:
+            return overloaded_response(e)
         except Exception as e:
             logger.error(f"Landmark detection error: {str(e)}")
             return JsonResponse({
@@ -125,26 +168,75 @@ class DetectSignView(View):
                 'confidence': 0.0
             }, status=500)
     
-    def _detect_from_image(self, image_data):
-        """Detect sign from base64 encoded image."""
+    def _detect_from_binary(self, body):
+        """Detect signs from packed float32 (frames, 21, 3) landmarks."""
         try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert PIL image to numpy array
-            image_array = np.array(image)
-            
-            # Convert RGB to BGR for OpenCV compatibility
-            if len(image_array.shape) == 3 and image_array.shape[2] == 3:
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+            # Zero-copy view of the request body; the only validation needed is the size
+            frames = decode_landmarks(body)
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+        
+        try:
+            # Queue every frame before waiting so they can share a batch
+            futures = [landmark_batcher.submit_async(frame) for frame in frames]
+            results = []
+            for future in futures:
+                result = future.result(timeout=landmark_batcher.timeout)
+                self._record_detection(result)
+                results.append(self._landmark_response_data(result))
+        except BatcherOverloaded as e:
+            return overloaded_response(e)
+        except Exception as e:
+            logger.error(f"Landmark detection error: {str(e)}")
+            return JsonResponse({
+                'error': f'Landmark detection failed: {str(e)}',
+                'letter': '?',
+                'confidence': 0.0
+            }, status=500)
+        
+        if len(results) == 1:
+            return JsonResponse(results[0])
+        return JsonResponse({
+            'results': results,
+            'frames': len(results)
+        })
+    
+    def _record_detection(self, result):
+        # History is kept for signed-in users only; written in the background
+        user = self.request.user
+        if user.is_authenticated:
+            detection_events.record(user.pk, result['letter'], result['confidence'])
+    
+    def _landmark_response_data(self, result):
+        return {
+            'letter': result['letter'],
+            'confidence': float(result['confidence']),
+            'processing_time': result.get('processing_time', 0),
+            'method': 'landmarks',
+            'landmarks_detected': True,
+            'raw_predictions': result.get('raw_predictions', [])
+        }
+    
+    def _detect_from_image(self, image_data, session=None):
+        """Detect sign from encoded image bytes."""
+        try:
+            # Decoded once, straight to the RGB MediaPipe expects
+            try:
+                image_array = decode_image(image_data, getattr(settings, 'IMAGE_MAX_SIDE', 0))
+            except ValueError as e:
+                return JsonResponse({
+                    'error': str(e)
+                }, status=400)
             
             # Use the model to extract landmarks first, then predict
-            landmarks = self.model.extract_hand_landmarks(image_array)
+            landmarks = self.model.extract_hand_landmarks(image_array, session=session)
             
             if landmarks is not None:
                 # Use landmarks for prediction (more accurate)
-                result = self.model.predict(landmarks)
+                result = landmark_batcher.submit(landmarks)
+                self._record_detection(result)
                 method = 'landmarks_from_image'
                 landmarks_detected = True
             else:
@@ -168,6 +260,8 @@ class DetectSignView(View):
                 'raw_predictions': result.get('raw_predictions', [])
             })
             
+        except BatcherOverloaded as e:
+            return overloaded_response(e)
         except Exception as e:
             logger.error(f"Image detection error: {str(e)}")
             return JsonResponse({
@@ -181,27 +275,26 @@ class DetectSignView(View):
 @csrf_exempt
 @require_http_methods(["POST"])
 def extract_landmarks(request):
-    """Extract hand landmarks from an image."""
+    """Extract hand landmarks from an image (raw body, multipart or base64 JSON)."""
     try:
-        data = json.loads(request.body)
-        image_data = data.get('image_data')
+        data = image_bytes(request)
         
-        if not image_data:
+        if not data:
             return JsonResponse({
                 'error': 'Missing image_data'
             }, status=400)
         
-        # Decode and process image
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
-        image_array = np.array(image)
-        
-        if len(image_array.shape) == 3 and image_array.shape[2] == 3:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+        # Decode once, straight to RGB and at most IMAGE_MAX_SIDE pixels
+        try:
+            image_array = decode_image(data, getattr(settings, 'IMAGE_MAX_SIDE', 0))
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
         
         # Extract landmarks
-        model_instance = SignLanguageModel()
-        landmarks = model_instance.extract_hand_landmarks(image_array)
+        model_instance = registry.get('landmarks')
+        landmarks = model_instance.extract_hand_landmarks(image_array, session=stream_session(request))
         
         if landmarks is not None:
             # Convert numpy array to list for JSON serialization
@@ -219,12 +312,65 @@ def extract_landmarks(request):
                 'message': 'No hand landmarks detected'
             })
             
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except ImageDataError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Landmark extraction error: {str(e)}")
         return JsonResponse({
             'error': f'Landmark extraction failed: {str(e)}'
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def batching_stats(request):
+    """Queue depth, batch-size histogram and wait times of the detection batcher, and cache hit ratio."""
+    return JsonResponse({
+        'batching': landmark_batcher.stats(),
+        'prediction_cache': prediction_cache.stats()
+    })
+
+@require_http_methods(["POST"])
+def reload_model(request):
+    """Hot-swap the landmark model (staff only), optionally to another file of the artifacts directory."""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'error': 'Staff access required'
+        }, status=403)
+    try:
+        data = json.loads(request.body) if request.body else {}
+        model_name = data.get('model')
+        
+        if model_name:
+            model_path = artifact_path(model_name)
+            version = registry.swap('landmarks', lambda: load_landmark_model(model_path))
+        else:
+            version = registry.swap('landmarks')
+        
+        return JsonResponse({
+            'success': True,
+            'version': version,
+            'registry': registry.status()['landmarks']
+        })
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except (ValueError, FileNotFoundError) as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Model reload error: {str(e)}")
+        return JsonResponse({
+            'error': f'Model reload failed: {str(e)}'
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_gesture_classes(request):
@@ -3,29 +3,41 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.conf import settings
 import json
 import logging
 import random
 
 from .model_loader_simple import sign_language_model
+from .wire import decode_landmarks, is_binary_request
+from .images import ImageDataError, decode_base64_image, decode_image, image_bytes, is_image_request
+from .batching import prediction_cache
+from .lifecycle import model_lifecycle
 
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
 @require_http_methods(["GET"])
 def health_check(request):
-    """Health check endpoint for the API."""
+    """Health check endpoint for the API; 503 until the models are loaded and warmed up."""
+    # A failed startup is retried here, with backoff (see detection.lifecycle)
+    model_lifecycle.start()
+    ready = sign_language_model.is_initialized and model_lifecycle.is_ready()
     return JsonResponse({
-        'status': 'healthy',
+        'status': 'healthy' if ready else 'starting',
+        'ready': ready,
         'service': 'Sign Language Detection API (Simplified)',
         'version': '1.0.0-simple',
+        'lifecycle': model_lifecycle.status(),
+        # Used by the registry-backed API and stream, not by this module's mock DetectSignView
+        'prediction_cache': prediction_cache.stats(),
         'features': {
             'landmark_detection': True,
             'image_detection': False,  # Disabled without TensorFlow
             'mediapipe_integration': False  # Simplified version
         },
         'note': 'This is a simplified version. Install TensorFlow for full functionality.'
-    })
+    }, status=200 if ready else 503)
 
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -61,6 +73,11 @@ class DetectSignView(View):
     def post(self, request):
         """Handle sign detection requests."""
         try:
+            if is_binary_request(request):
+                return self._detect_from_binary(request.body)
+            if is_image_request(request):
+                return self._detect_from_image_mock(image_bytes(request))
+            
             # Parse request data
             data = json.loads(request.body)
             use_landmarks = data.get('use_landmarks', True)
@@ -68,7 +85,7 @@ class DetectSignView(View):
             if use_landmarks and 'landmarks' in data:
                 return self._detect_from_landmarks(data['landmarks'])
             elif 'image_data' in data:
-                return self._detect_from_image_mock(data['image_data'])
+                return self._detect_from_image_mock(decode_base64_image(data['image_data']))
             else:
                 return JsonResponse({
                     'error': 'Missing required data. Provide either landmarks or image_data.'
@@ -78,6 +95,10 @@ class DetectSignView(View):
             return JsonResponse({
                 'error': 'Invalid JSON data'
             }, status=400)
+        except ImageDataError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
         except Exception as e:
             logger.error(f"Detection error: {str(e)}")
             return JsonResponse({
@@ -104,15 +125,7 @@ class DetectSignView(View):
             # Make prediction using simplified model
             result = self.model.predict(landmarks)
             
-            return JsonResponse({
-                'letter': result['letter'],
-                'confidence': float(result['confidence']),
-                'processing_time': result.get('processing_time', 0),
-                'method': 'landmarks_mock',
-                'landmarks_detected': True,
-                'raw_predictions': result.get('raw_predictions', []),
-                'note': 'This is a mock prediction. Install TensorFlow for real detection.'
-            })
+            return JsonResponse(self._landmark_response_data(result))
             
         except Exception as e:
             logger.error(f"Landmark detection error: {str(e)}")
@@ -122,9 +135,54 @@ class DetectSignView(View):
                 'confidence': 0.0
             }, status=500)
     
+    def _detect_from_binary(self, body):
+        """Detect signs from packed float32 (frames, 21, 3) landmarks."""
+        try:
+            frames = decode_landmarks(body)
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+        
+        try:
+            results = [self._landmark_response_data(self.model.predict(frame)) for frame in frames]
+        except Exception as e:
+            logger.error(f"Landmark detection error: {str(e)}")
+            return JsonResponse({
+                'error': f'Landmark detection failed: {str(e)}',
+                'letter': '?',
+                'confidence': 0.0
+            }, status=500)
+        
+        if len(results) == 1:
+            return JsonResponse(results[0])
+        return JsonResponse({
+            'results': results,
+            'frames': len(results)
+        })
+    
+    def _landmark_response_data(self, result):
+        return {
+            'letter': result['letter'],
+            'confidence': float(result['confidence']),
+            'processing_time': result.get('processing_time', 0),
+            'method': 'landmarks_mock',
+            'landmarks_detected': True,
+            'raw_predictions': result.get('raw_predictions', []),
+            'note': 'This is a mock prediction. Install TensorFlow for real detection.'
+        }
+    
     def _detect_from_image_mock(self, image_data):
         """Mock detection from image (simplified version)."""
         try:
+            # Decoded like the real endpoint, so bad images are rejected the same way
+            try:
+                decode_image(image_data, getattr(settings, 'IMAGE_MAX_SIDE', 0))
+            except ValueError as e:
+                return JsonResponse({
+                    'error': str(e)
+                }, status=400)
+            
             # Generate mock landmarks and prediction
             mock_landmarks = self.model.extract_hand_landmarks(None)  # Mock landmarks
             
@@ -164,14 +222,20 @@ class DetectSignView(View):
 def extract_landmarks(request):
     """Extract hand landmarks from an image (mock version)."""
     try:
-        data = json.loads(request.body)
-        image_data = data.get('image_data')
+        image_data = image_bytes(request)
         
         if not image_data:
             return JsonResponse({
                 'error': 'Missing image_data'
             }, status=400)
         
+        try:
+            decode_image(image_data, getattr(settings, 'IMAGE_MAX_SIDE', 0))
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+        
         # Generate mock landmarks
         landmarks = sign_language_model.extract_hand_landmarks(None)
         
@@ -192,6 +256,14 @@ def extract_landmarks(request):
                 'note': 'This is a simplified version.'
             })
             
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except ImageDataError as e:
+        return JsonResponse({
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         logger.error(f"Landmark extraction error: {str(e)}")
         return JsonResponse({
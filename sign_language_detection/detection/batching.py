@@ -0,0 +1,203 @@
+import threading
+import queue
+import time
+import logging
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import registry
+from .prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherOverloaded(RuntimeError):
+    """The batcher queue is full; the request was rejected instead of queued."""
+
+
+class MicroBatcher:
+    """Dynamic batching in front of a ``predict_batch`` callable.
+
+    Request threads call ``submit`` with a single (21, 3) landmark array and
+    block until their result is ready. A background worker collects queued
+    requests until either ``max_batch_size`` is reached or the oldest request
+    has waited ``max_wait_ms``, stacks them into one (N, 21, 3) array and runs
+    a single forward pass for the whole batch.
+
+    With a ``cache`` (see ``detection.prediction_cache``), inputs that match a
+    recent prediction are answered immediately without being queued.
+
+    Inputs whose shape is not ``input_shape`` are rejected by ``submit_async``,
+    and ``submit`` gives up after ``timeout`` seconds, so one bad request can
+    neither break a batch nor leave its callers waiting forever. When
+    ``max_queue_size`` requests are already waiting, ``submit_async`` raises
+    ``BatcherOverloaded`` (counted as ``rejected``) instead of blocking, since
+    it is also called from the event loop of the WebSocket consumer.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=3.0,
+                 max_queue_size=1024, name='batcher', cache=None, input_shape=(21, 3), timeout=30.0):
+        self.predict_batch = predict_batch
+        self.cache = cache
+        self.input_shape = tuple(input_shape)
+        self.timeout = timeout
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def submit(self, landmarks, timeout=None):
+        """Queue one (21, 3) input and wait for its result (at most ``timeout``, default ``self.timeout``)."""
+        return self.submit_async(landmarks).result(timeout=self.timeout if timeout is None else timeout)
+
+    def submit_async(self, landmarks):
+        """Queue one (21, 3) input and return a Future for its result.
+
+        Raises ValueError on a bad shape and BatcherOverloaded when the queue is full.
+        """
+        future = Future()
+        landmarks = np.asarray(landmarks, dtype=np.float32)
+        if landmarks.shape != self.input_shape:
+            raise ValueError(f"Expected input of shape {self.input_shape}, got {landmarks.shape}")
+        key = None
+        if self.cache is not None and self.cache.enabled:
+            key = self.cache.key(landmarks)
+            cached = self.cache.get(key)
+            if cached is not None:
+                future.set_result(cached)
+                return future
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((landmarks, future, time.perf_counter(), key))
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            raise BatcherOverloaded(f"Detection queue is full ({self._queue.maxsize} requests waiting)")
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def stats(self):
+        """Return counters used to tune ``max_batch_size`` and ``max_wait_ms``."""
+        with self._stats_lock:
+            waits = sorted(self._recent_waits)
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'requests': self._requests,
+                'batches': self._batches,
+                'errors': self._errors,
+                'rejected': self._rejected,
+                'avg_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'avg_wait_ms': sum(waits) / len(waits) if waits else 0.0,
+                'p95_wait_ms': waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                'max_wait_ms_seen': waits[-1] if waits else 0.0,
+                'avg_inference_ms': self._inference_time / self._batches * 1000.0 if self._batches else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
+
+    def _reset_stats(self):
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._rejected = 0
+        self._max_queue_depth = 0
+        self._inference_time = 0.0
+        self._batch_sizes = Counter()
+        self._recent_waits = deque(maxlen=1000)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        # Block for the first request, then fill the batch until it is full
+        # or the first request has waited long enough
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Callers that gave up (e.g. a cancelled asyncio task) are dropped
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                results = self.predict_batch(np.stack([item[0] for item in batch]))
+                error = None
+            except Exception as e:
+                logger.error(f"Batched prediction error: {str(e)}")
+                results = None
+                error = e
+            finished = time.perf_counter()
+
+            for i, (_, future, _, key) in enumerate(batch):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    if key is not None:
+                        self.cache.put(key, results[i])
+                    future.set_result(results[i])
+
+            with self._stats_lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._errors += 1 if error is not None else 0
+                self._batch_sizes[len(batch)] += 1
+                self._inference_time += finished - started
+                for _, _, queued_at, _ in batch:
+                    self._recent_waits.append((started - queued_at) * 1000.0)
+
+
+def _predict_landmarks(batch):
+    # Resolved per batch so that hot-swapped model versions are picked up
+    return registry.get('landmarks').predict_batch(batch)
+
+
+# Recent predictions, keyed on normalised landmarks and the model version
+prediction_cache = PredictionCache(
+    max_size=getattr(settings, 'PREDICTION_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'PREDICTION_CACHE_TTL', 5.0),
+    step=getattr(settings, 'PREDICTION_CACHE_STEP', 0.05),
+    namespace=lambda: registry.version('landmarks'),
+)
+
+# Shared batcher for landmark detection requests in this worker process
+landmark_batcher = MicroBatcher(
+    _predict_landmarks,
+    max_batch_size=getattr(settings, 'DETECTION_BATCH_MAX_SIZE', 16),
+    max_wait_ms=getattr(settings, 'DETECTION_BATCH_MAX_WAIT_MS', 3.0),
+    timeout=getattr(settings, 'DETECTION_BATCH_TIMEOUT', 30.0),
+    name='landmark-batcher',
+    cache=prediction_cache,
+)
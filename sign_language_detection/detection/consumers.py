@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+
+import numpy as np
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .batching import BatcherOverloaded, landmark_batcher
+from .event_sink import detection_events
+from .streaming import PredictionSmoother
+from .wire import decode_landmarks
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionConsumer(AsyncWebsocketConsumer):
+    """Streaming sign detection over a WebSocket (``/ws/detection/``).
+
+    The client sends one message per frame, e.g.
+    ``{"type": "landmarks", "landmarks": [{"x": .., "y": .., "z": ..}, ...]}``,
+    or a binary message with packed float32 landmarks (see ``detection.wire``).
+    Each frame goes through the shared batcher, so frames from all open
+    sessions are predicted together. Per-frame predictions are kept in a
+    30-frame window and a prediction message is only pushed back when the
+    smoothed letter changes. For signed-in users those letters are also
+    recorded in their detection history. A frame the batcher rejects because
+    it is overloaded is skipped with an ``overloaded`` message.
+    """
+
+    window_size = 30
+    threshold = 0.8
+
+    async def connect(self):
+        self.smoother = PredictionSmoother(history=self.window_size, threshold=self.threshold)
+        self.frames = 0
+        await self.accept()
+        await self.send_json({'type': 'ready', 'window_size': self.window_size})
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            try:
+                frames = decode_landmarks(bytes_data)
+            except ValueError as e:
+                await self.send_json({'type': 'error', 'error': str(e)})
+                return
+            for frame in frames:
+                await self._process_frame(frame)
+            return
+
+        try:
+            message = json.loads(text_data) if text_data else {}
+        except json.JSONDecodeError:
+            await self.send_json({'type': 'error', 'error': 'Invalid JSON data'})
+            return
+
+        message_type = message.get('type', 'landmarks')
+        if message_type == 'reset':
+            self._reset()
+            return
+        if message_type == 'ping':
+            await self.send_json({'type': 'pong', 'frames': self.frames})
+            return
+
+        landmarks = self._parse_landmarks(message.get('landmarks'))
+        if landmarks is None:
+            # No hand in this frame: forget the current sign
+            if message.get('landmarks') is None:
+                self._reset()
+            else:
+                await self.send_json({
+                    'type': 'error',
+                    'error': 'Invalid landmarks data. Expected 21 landmarks with x,y,z coordinates.'
+                })
+            return
+
+        await self._process_frame(landmarks)
+
+    async def _process_frame(self, landmarks):
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(landmark_batcher.submit_async(landmarks)), landmark_batcher.timeout,
+            )
+        except BatcherOverloaded as e:
+            # The frame is skipped; the client may slow down or keep streaming
+            await self.send_json({'type': 'overloaded', 'error': str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Streaming detection error: {str(e)}")
+            await self.send_json({'type': 'error', 'error': f'Detection failed: {str(e)}'})
+            return
+
+        self.frames += 1
+        letter = self.smoother.update(result['letter'], result['confidence'])
+        if letter is not None:
+            _, confidence = self.smoother.current()
+            user = self.scope.get('user')
+            if user is not None and user.is_authenticated:
+                detection_events.record(user.pk, letter, confidence, stream=self.channel_name)
+            await self.send_json({
+                'type': 'prediction',
+                'letter': letter,
+                'confidence': confidence,
+                'frame': self.frames,
+            })
+
+    async def disconnect(self, code):
+        detection_events.end_stream(self.channel_name)
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
+
+    def _reset(self):
+        self.smoother.reset()
+
+    @staticmethod
+    def _parse_landmarks(landmarks_data):
+        if not landmarks_data or len(landmarks_data) != 21:
+            return None
+        try:
+            if isinstance(landmarks_data[0], dict):
+                return np.array([[lm['x'], lm['y'], lm['z']] for lm in landmarks_data], dtype=np.float32)
+            landmarks = np.array(landmarks_data, dtype=np.float32)
+        except (KeyError, TypeError, ValueError):
+            return None
+        return landmarks if landmarks.shape == (21, 3) else None
@@ -0,0 +1,257 @@
+"""
+Consolidated, memory-mapped keypoint dataset.
+
+``MP_Data/<action>/<sequence>/<frame>.npy`` stores one small file per frame.
+``SequenceDataset`` keeps all sequences in a single raw float32 file of
+shape (N, sequence_length, feature_size) that is opened with ``np.memmap``,
+plus an ``index.json`` holding the action of each sequence and where it came
+from. New recordings are appended to the end of the data file.
+
+A dataset holds either the raw 1662-value keypoints of every frame or, if
+``features`` is set, features computed from them once when they are packed
+(see ``detection.features``).
+
+Only depends on NumPy so it can be used by the offline scripts as well as
+the Django app.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .features import FRAME_FEATURE_SIZE, FRAME_FEATURES, frame_features
+
+DATA_FILE = 'sequences.f32'
+INDEX_FILE = 'index.json'
+FORMAT_VERSION = 1
+
+
+class SequenceDataset:
+    """A growable (N, sequence_length, feature_size) float32 array on disk."""
+
+    def __init__(self, path, index):
+        self.path = path
+        self.index = index
+        self._sequences = None
+        self._source_set = None
+
+    @classmethod
+    def create(cls, path, sequence_length=30, feature_size=1662, exist_ok=True, features=None):
+        """Create an empty dataset at ``path`` (or open it if it already exists).
+
+        ``features`` names the feature set its frames hold (None for raw keypoints).
+        """
+        if os.path.exists(os.path.join(path, INDEX_FILE)):
+            if not exist_ok:
+                raise FileExistsError(f'Dataset already exists: {path}')
+            dataset = cls.open(path)
+            if (dataset.sequence_length, dataset.feature_size) != (sequence_length, feature_size):
+                raise ValueError(
+                    f'Existing dataset has frames of shape ({dataset.sequence_length}, {dataset.feature_size}), '
+                    f'not ({sequence_length}, {feature_size})'
+                )
+            if dataset.features != features:
+                raise ValueError(f'Existing dataset holds {dataset.features or "raw keypoints"}, '
+                                 f'not {features or "raw keypoints"}')
+            return dataset
+
+        os.makedirs(path, exist_ok=True)
+        open(os.path.join(path, DATA_FILE), 'wb').close()
+        dataset = cls(path, {
+            'format_version': FORMAT_VERSION,
+            'dtype': 'float32',
+            'sequence_length': sequence_length,
+            'feature_size': feature_size,
+            'features': features,
+            'actions': [],
+            'labels': [],
+            'sources': [],
+        })
+        dataset._save_index()
+        return dataset
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format version: {index.get('format_version')}")
+        return cls(path, index)
+
+    @property
+    def sequence_length(self):
+        return self.index['sequence_length']
+
+    @property
+    def feature_size(self):
+        return self.index['feature_size']
+
+    @property
+    def features(self):
+        """Feature set of the frames (see ``detection.features``), None for raw keypoints."""
+        return self.index.get('features')
+
+    @property
+    def actions(self):
+        return list(self.index['actions'])
+
+    @property
+    def labels(self):
+        """Label of each sequence, as an index into ``actions``."""
+        return np.asarray(self.index['labels'], dtype=np.int64)
+
+    @property
+    def sequences(self):
+        """Read-only memory map of all sequences, shape (N, sequence_length, feature_size)."""
+        if self._sequences is None or len(self._sequences) != len(self):
+            if len(self) == 0:
+                return np.empty((0, self.sequence_length, self.feature_size), dtype=np.float32)
+            self._sequences = np.memmap(
+                os.path.join(self.path, DATA_FILE), dtype=np.float32, mode='r',
+                shape=(len(self), self.sequence_length, self.feature_size),
+            )
+        return self._sequences
+
+    def __len__(self):
+        return len(self.index['labels'])
+
+    def __getitem__(self, item):
+        return self.sequences[item], self.labels[item]
+
+    def labels_for(self, actions):
+        """Labels re-indexed into ``actions`` (e.g. a model's own class order)."""
+        actions = list(actions)
+        mapping = np.array([actions.index(a) if a in actions else -1 for a in self.index['actions']], dtype=np.int64)
+        return mapping[self.labels] if len(self) else np.empty(0, dtype=np.int64)
+
+    def has_source(self, source):
+        if self._source_set is None:
+            self._source_set = set(self.index['sources'])
+        return source in self._source_set
+
+    def append(self, sequences, action, sources=None):
+        """Append one (sequence_length, feature_size) sequence or a batch of them."""
+        sequences = np.asarray(sequences, dtype=np.float32)
+        if sequences.ndim == 2:
+            sequences = sequences[np.newaxis]
+        if sequences.shape[1:] != (self.sequence_length, self.feature_size):
+            raise ValueError(
+                f'Expected sequences of shape (*, {self.sequence_length}, {self.feature_size}), '
+                f'got {sequences.shape}'
+            )
+        if sources is None:
+            sources = [None] * len(sequences)
+        elif isinstance(sources, str):
+            sources = [sources]
+        if len(sources) != len(sequences):
+            raise ValueError('Expected one source per sequence')
+
+        if action not in self.index['actions']:
+            self.index['actions'].append(action)
+        label = self.index['actions'].index(action)
+
+        data_path = os.path.join(self.path, DATA_FILE)
+        with open(data_path, 'r+b') as f:
+            # Drop anything written after the last indexed sequence (an
+            # interrupted append), then write the new rows
+            f.truncate(len(self) * self.sequence_length * self.feature_size * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(sequences).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The index is only updated once the data is on disk
+        self.index['labels'].extend([label] * len(sequences))
+        self.index['sources'].extend(sources)
+        if self._source_set is not None:
+            self._source_set.update(s for s in sources if s is not None)
+        self._save_index()
+        self._sequences = None
+
+    def _save_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, index_path)
+
+
+def pack_mp_data(data_path, output_path, actions=None, sequence_length=30, feature_size=1662,
+                 chunk_size=256, features=None):
+    """Append every ``MP_Data/<action>/<sequence>/`` recording not yet in the dataset.
+
+    Sequences are written ``chunk_size`` at a time so memory use does not grow
+    with the size of MP_Data. With ``features=FRAME_FEATURES`` the frames are
+    converted with ``frame_features`` as they are packed.
+
+    Returns the dataset and the number of sequences added.
+    """
+    if features not in (None, FRAME_FEATURES):
+        raise ValueError(f'Keypoints can only be packed as {FRAME_FEATURES} features, not {features}')
+    packed_size = FRAME_FEATURE_SIZE if features else feature_size
+    dataset = SequenceDataset.create(output_path, sequence_length, packed_size, features=features)
+
+    def write(batch, action, sources):
+        batch = np.stack(batch)
+        dataset.append(frame_features(batch) if features else batch, action, sources)
+    if actions is None:
+        actions = sorted(d for d in os.listdir(data_path) if os.path.isdir(os.path.join(data_path, d)))
+
+    added = 0
+    for action in actions:
+        action_dir = os.path.join(data_path, action)
+        if not os.path.isdir(action_dir):
+            continue
+        sequence_dirs = sorted((d for d in os.listdir(action_dir) if d.isdigit()), key=int)
+
+        batch, batch_sources = [], []
+        for sequence in sequence_dirs:
+            source = f'{action}/{sequence}'
+            if dataset.has_source(source):
+                continue
+            sequence_dir = os.path.join(action_dir, sequence)
+            frame_files = [os.path.join(sequence_dir, f'{frame}.npy') for frame in range(sequence_length)]
+            if not all(os.path.exists(p) for p in frame_files):
+                # Incomplete recording
+                continue
+            batch.append(np.stack([np.load(p) for p in frame_files]))
+            batch_sources.append(source)
+            if len(batch) == chunk_size:
+                write(batch, action, batch_sources)
+                added += len(batch)
+                batch, batch_sources = [], []
+
+        if batch:
+            write(batch, action, batch_sources)
+            added += len(batch)
+    return dataset, added
+
+
+def convert_dataset(source_path, output_path, features=FRAME_FEATURES, chunk_size=256):
+    """Append the ``features`` of every sequence of the raw dataset at ``source_path``
+    that is not yet in the dataset at ``output_path``.
+
+    Sequences are matched by their source, or by their position in the raw
+    dataset (which only ever grows) for recordings without one. Returns the
+    features dataset and the number of sequences added.
+    """
+    if features != FRAME_FEATURES:
+        raise ValueError(f'Keypoints can only be converted to {FRAME_FEATURES} features, not {features}')
+    raw = SequenceDataset.open(source_path)
+    if raw.features is not None:
+        raise ValueError(f'{source_path} holds {raw.features}, not raw keypoints')
+    dataset = SequenceDataset.create(output_path, raw.sequence_length, FRAME_FEATURE_SIZE, features=features)
+
+    sources = [source if source is not None else f'#{i}' for i, source in enumerate(raw.index['sources'])]
+    pending = np.array([i for i, source in enumerate(sources) if not dataset.has_source(source)], dtype=np.int64)
+    labels = raw.labels
+    added = 0
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        converted = frame_features(raw.sequences[chunk])
+        for label in dict.fromkeys(labels[chunk].tolist()):
+            rows = labels[chunk] == label
+            dataset.append(converted[rows], raw.actions[label], [sources[i] for i in chunk[rows]])
+            added += int(rows.sum())
+    return dataset, added
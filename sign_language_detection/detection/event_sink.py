@@ -0,0 +1,195 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionEventSink:
+    """Buffered, asynchronous writer for ``DetectionHistory``.
+
+    ``record`` only de-duplicates and enqueues, so it is cheap enough to call
+    per frame. A background thread drains the queue and writes up to
+    ``max_batch_size`` rows with one ``bulk_create``, at the latest
+    ``flush_interval_ms`` after the first queued event, then folds them into
+    the incremental analytics. Consecutive identical gestures of a stream are
+    recorded once, like the sentence logic of the detection loops. When the
+    queue is full new events are dropped and counted rather than blocking the
+    caller.
+    """
+
+    def __init__(self, max_batch_size=200, flush_interval_ms=1000.0, max_queue_size=10000,
+                 max_streams=10000, name='detection-events'):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.max_streams = max_streams
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        # Last gesture per stream, least recently used first
+        self._last_gestures = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def record(self, user_id, gesture, confidence, timestamp=None, stream=None):
+        """Queue one detection; return False if it was a repeat or was dropped.
+
+        ``stream`` identifies a sequence of predictions (a WebSocket session,
+        or the user for plain requests) for de-duplication.
+        """
+        stream = user_id if stream is None else stream
+        with self._lock:
+            if self._last_gestures.get(stream) == gesture:
+                self._last_gestures.move_to_end(stream)
+                self._deduplicated += 1
+                return False
+            self._last_gestures[stream] = gesture
+            self._last_gestures.move_to_end(stream)
+            if len(self._last_gestures) > self.max_streams:
+                self._last_gestures.popitem(last=False)
+
+        self._ensure_worker()
+        event = (user_id, gesture, float(confidence), timestamp or timezone.now())
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self._accepted += 1
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return True
+
+    def end_stream(self, stream):
+        """Forget the last gesture of ``stream`` (e.g. when a session closes)."""
+        with self._lock:
+            self._last_gestures.pop(stream, None)
+
+    def flush(self, timeout=5.0):
+        """Write everything queued so far; return False if it did not finish in time."""
+        if self._worker is None or not self._worker.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'flush_interval_ms': self.flush_interval * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'accepted': self._accepted,
+                'deduplicated': self._deduplicated,
+                'dropped': self._dropped,
+                'written': self._written,
+                'failed': self._failed,
+                'flushes': self._flushes,
+                'avg_flush_size': self._written / self._flushes if self._flushes else 0.0,
+                'avg_flush_ms': self._flush_time / self._flushes * 1000.0 if self._flushes else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    def _reset_stats(self):
+        self._accepted = 0
+        self._deduplicated = 0
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._flushes = 0
+        self._flush_time = 0.0
+        self._max_queue_depth = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        # Block for the first event, then keep collecting until the batch is
+        # full, the first event is flush_interval old, or a flush is requested
+        batch, waiters = [], []
+        item = self._queue.get()
+        deadline = time.perf_counter() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.max_batch_size:
+                break
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, waiters
+
+    def _run(self):
+        while True:
+            batch, waiters = self._collect()
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        from .analytics import record_detections
+        from .models import DetectionHistory
+
+        started = time.perf_counter()
+        rows = [
+            DetectionHistory(user_id=user_id, gesture=gesture, confidence=confidence, timestamp=timestamp)
+            for user_id, gesture, confidence, timestamp in batch
+        ]
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row.user_id].append(row)
+
+        try:
+            close_old_connections()
+            with transaction.atomic():
+                DetectionHistory.objects.bulk_create(rows, batch_size=self.max_batch_size)
+                for user_id, user_rows in by_user.items():
+                    record_detections(user_id, user_rows)
+            failed = 0
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} detection events: {str(e)}")
+            failed = len(rows)
+
+        with self._lock:
+            self._flushes += 1
+            self._written += len(rows) - failed
+            self._failed += failed
+            self._flush_time += time.perf_counter() - started
+
+
+# Shared detection event sink for this worker process
+detection_events = DetectionEventSink(
+    max_batch_size=getattr(settings, 'DETECTION_EVENTS_FLUSH_SIZE', 200),
+    flush_interval_ms=getattr(settings, 'DETECTION_EVENTS_FLUSH_INTERVAL_MS', 1000),
+    max_queue_size=getattr(settings, 'DETECTION_EVENTS_QUEUE_SIZE', 10000),
+)
+
+# Write out whatever is still queued when the process exits
+atexit.register(detection_events.flush)
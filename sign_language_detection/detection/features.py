@@ -0,0 +1,127 @@
+"""
+Geometric hand features, computed for a whole batch at once.
+
+``hand_features`` turns (N, 21, 3) MediaPipe hand landmarks into one vector
+of ``HAND_FEATURE_SIZE`` values per hand:
+
+- the 21 landmarks relative to the wrist, divided by the palm length (wrist
+  to middle finger knuckle), so neither where the hand is in the frame nor
+  its distance to the camera matters (63 values)
+- the distances between every pair of fingertips, in palm lengths (10)
+- the bend angle of the 3 joints of every finger, divided by pi (15)
+
+``frame_features`` applies it to both hands of 1662-value Holistic keypoint
+vectors and keeps the pose, giving ``FRAME_FEATURE_SIZE`` values per frame
+instead of 1662 (the face mesh is dropped).
+
+Everything is NumPy broadcasting over the batch. Missing hands (all zeros)
+give all-zero features. Models record the representation they were trained
+on under ``metadata['features']`` (``HAND_FEATURES`` or ``FRAME_FEATURES``),
+and ``transform`` looks up the matching function.
+
+Only depends on NumPy so it can be used by the offline scripts as well as
+the Django app.
+"""
+
+import numpy as np
+
+from .keypoints import HAND_SIZE, KEYPOINT_SIZE, LEFT_HAND_OFFSET, POSE_SIZE, RIGHT_HAND_OFFSET
+
+HAND_FEATURES = 'hand-geometry-v1'
+FRAME_FEATURES = 'pose-hand-geometry-v1'
+
+WRIST = 0
+MIDDLE_MCP = 9
+FINGERTIPS = np.array([4, 8, 12, 16, 20])
+# Landmarks of each finger from the wrist to the tip: thumb, index, middle, ring, pinky
+FINGERS = np.array([
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+])
+
+_TIP_PAIRS = np.triu_indices(len(FINGERTIPS), k=1)
+# (previous, joint, next) landmark of every finger joint
+_JOINT_PREV = FINGERS[:, :-2].ravel()
+_JOINTS = FINGERS[:, 1:-1].ravel()
+_JOINT_NEXT = FINGERS[:, 2:].ravel()
+
+COORDINATE_SIZE = 21 * 3
+DISTANCE_SIZE = len(_TIP_PAIRS[0])
+ANGLE_SIZE = len(_JOINTS)
+HAND_FEATURE_SIZE = COORDINATE_SIZE + DISTANCE_SIZE + ANGLE_SIZE
+FRAME_FEATURE_SIZE = POSE_SIZE + 2 * HAND_FEATURE_SIZE
+
+_EPSILON = 1e-6
+
+
+def normalize_hands(hands):
+    """Wrist-centred (N, 21, 3) landmarks in units of palm length, and the (N,) present mask."""
+    hands = np.asarray(hands, dtype=np.float32).reshape(-1, 21, 3)
+    present = np.any(hands != 0, axis=(1, 2))
+    centred = hands - hands[:, WRIST:WRIST + 1]
+    scale = np.linalg.norm(centred[:, MIDDLE_MCP], axis=-1)
+    scale = np.where(scale > _EPSILON, scale, 1.0)
+    return centred / scale[:, None, None], present
+
+
+def hand_features(hands, out=None):
+    """(N, HAND_FEATURE_SIZE) features of (N, 21, 3) hand landmarks."""
+    normalized, present = normalize_hands(hands)
+    count = len(normalized)
+    if out is None:
+        out = np.empty((count, HAND_FEATURE_SIZE), dtype=np.float32)
+
+    coordinates = out[:, :COORDINATE_SIZE]
+    coordinates[:] = normalized.reshape(count, COORDINATE_SIZE)
+
+    tips = normalized[:, FINGERTIPS]
+    distances = out[:, COORDINATE_SIZE:COORDINATE_SIZE + DISTANCE_SIZE]
+    distances[:] = np.linalg.norm(tips[:, _TIP_PAIRS[0]] - tips[:, _TIP_PAIRS[1]], axis=-1)
+
+    before = normalized[:, _JOINT_PREV] - normalized[:, _JOINTS]
+    after = normalized[:, _JOINT_NEXT] - normalized[:, _JOINTS]
+    cosine = np.einsum('njk,njk->nj', before, after) / (
+        np.linalg.norm(before, axis=-1) * np.linalg.norm(after, axis=-1) + _EPSILON
+    )
+    out[:, COORDINATE_SIZE + DISTANCE_SIZE:] = np.arccos(np.clip(cosine, -1.0, 1.0)) / np.pi
+
+    out[~present] = 0.0
+    return out
+
+
+def frame_features(keypoints):
+    """(..., FRAME_FEATURE_SIZE) features of (..., 1662) Holistic keypoint vectors."""
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    shape = keypoints.shape[:-1]
+    flat = keypoints.reshape(-1, KEYPOINT_SIZE)
+    count = len(flat)
+
+    out = np.empty((count, FRAME_FEATURE_SIZE), dtype=np.float32)
+    out[:, :POSE_SIZE] = flat[:, :POSE_SIZE]
+    # Both hands in one pass: left hands first, then right hands
+    hands = np.concatenate([
+        flat[:, LEFT_HAND_OFFSET:RIGHT_HAND_OFFSET],
+        flat[:, RIGHT_HAND_OFFSET:RIGHT_HAND_OFFSET + HAND_SIZE],
+    ])
+    features = hand_features(hands)
+    out[:, POSE_SIZE:POSE_SIZE + HAND_FEATURE_SIZE] = features[:count]
+    out[:, POSE_SIZE + HAND_FEATURE_SIZE:] = features[count:]
+    return out.reshape(*shape, FRAME_FEATURE_SIZE)
+
+
+TRANSFORMS = {
+    HAND_FEATURES: hand_features,
+    FRAME_FEATURES: frame_features,
+}
+
+
+def transform(name):
+    """The function computing the ``name`` features, or None for raw inputs."""
+    if name is None:
+        return None
+    if name not in TRANSFORMS:
+        raise ValueError(f"Unknown feature set: {name}")
+    return TRANSFORMS[name]
@@ -0,0 +1,117 @@
+"""
+Serving files from disk without loading them into memory.
+
+Whole files go out through ``FileResponse``, which lets the WSGI server use
+``wsgi.file_wrapper`` (``sendfile`` where available). Single byte ranges are
+answered with 206 Partial Content and streamed in ``block_size`` chunks, so
+seeking in an audio element only fetches what it needs. ETag/Last-Modified
+validators make repeat requests return 304 without touching the file.
+"""
+
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """Return (start, end) inclusive for a single-range header, None to ignore it.
+
+    Raises ``ValueError`` if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Malformed or multiple ranges: serve the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first and last and int(last) < int(first):
+        # An invalid range-spec, not an unsatisfiable one (RFC 9110 14.1.1)
+        return None
+    if size == 0:
+        # No byte of an empty file can be addressed
+        raise ValueError('Range not satisfiable')
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    # A stale If-Range validator means the client must get the whole file
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and date >= mtime
+
+
+def _iter_range(path, start, length, block_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, content_type=None, filename=None, max_age=0, block_size=BLOCK_SIZE):
+    """Respond with the file at ``path``, honouring conditional and Range requests.
+
+    ``max_age`` > 0 marks the response cacheable for that many seconds, which
+    is safe for files that are never rewritten in place.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    mtime = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is None:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, mtime):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response.block_size = block_size
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(path, start, length, block_size), status=206, content_type=content_type,
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    if filename:
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age, immutable=True)
+    return response
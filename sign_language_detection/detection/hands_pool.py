@@ -0,0 +1,152 @@
+"""
+Pool of MediaPipe Hands graphs.
+
+A Hands graph is not thread-safe, and one shared instance behind a lock
+serialises every image request in the process. ``HandsPool`` gives each
+request thread its own static-image graph instead, and each client stream
+(``session``) its own graph in video mode (``static_image_mode=False``), which
+tracks the hand from the previous frame and only reruns palm detection when
+the track is lost. Graphs unused for ``idle_timeout`` seconds are closed, and
+at most ``max_sessions`` stream graphs are kept (least recently used first
+out).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def mediapipe_hands(static_image_mode, max_num_hands=1, min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5):
+    import mediapipe as mp
+
+    return mp.solutions.hands.Hands(
+        static_image_mode=static_image_mode,
+        max_num_hands=max_num_hands,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+    )
+
+
+class _PooledHands:
+    __slots__ = ('hands', 'lock', 'last_used', 'frames', 'closed')
+
+    def __init__(self, hands):
+        self.hands = hands
+        # Only contended when two requests of one stream arrive together
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.frames = 0
+        self.closed = False
+
+
+class HandsPool:
+    """Per-thread static graphs and per-session video-mode graphs."""
+
+    def __init__(self, factory=mediapipe_hands, idle_timeout=60.0, max_sessions=32, **options):
+        self.factory = factory
+        self.options = options
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max(1, int(max_sessions))
+        self._threads = {}
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+        self._created = 0
+        self._evicted = 0
+
+    def process(self, image, session=None):
+        """Run Hands on an RGB ``image``; frames with the same ``session`` are tracked."""
+        while True:
+            entry = self._acquire(session)
+            with entry.lock:
+                # Evicted between lookup and use: take a fresh graph
+                if entry.closed:
+                    continue
+                entry.last_used = time.monotonic()
+                entry.frames += 1
+                return entry.hands.process(image)
+
+    def close_session(self, session):
+        with self._lock:
+            entry = self._sessions.pop(session, None)
+        if entry is not None:
+            self._close(entry)
+
+    def evict_idle(self, now=None):
+        """Close graphs idle for longer than ``idle_timeout``; return how many."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_eviction = now
+            idle = [
+                (pool, key) for pool in (self._threads, self._sessions) for key, entry in pool.items()
+                if now - entry.last_used > self.idle_timeout and not entry.lock.locked()
+            ]
+            entries = [pool.pop(key) for pool, key in idle]
+        for entry in entries:
+            self._close(entry)
+        return len(entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'thread_graphs': len(self._threads),
+                'session_graphs': len(self._sessions),
+                'created': self._created,
+                'evicted': self._evicted,
+                'idle_timeout': self.idle_timeout,
+                'max_sessions': self.max_sessions,
+            }
+
+    def _acquire(self, session):
+        now = time.monotonic()
+        if now - self._last_eviction > self.idle_timeout / 2:
+            self.evict_idle(now)
+
+        if session is None:
+            key, pool, static = threading.get_ident(), self._threads, True
+        else:
+            key, pool, static = session, self._sessions, False
+        with self._lock:
+            entry = pool.get(key)
+            if entry is not None:
+                if not static:
+                    pool.move_to_end(key)
+                return entry
+
+        # Building a graph takes a while, so not under the pool lock
+        created = _PooledHands(self.factory(static_image_mode=static, **self.options))
+        evicted = None
+        with self._lock:
+            entry = pool.setdefault(key, created)
+            if entry is created:
+                self._created += 1
+                if not static and len(pool) > self.max_sessions:
+                    evicted = pool.popitem(last=False)[1]
+        if entry is not created:
+            created.hands.close()
+        if evicted is not None:
+            self._close(evicted)
+        return entry
+
+    def _close(self, entry):
+        # Wait for a frame still being processed on it
+        with entry.lock:
+            entry.closed = True
+            try:
+                entry.hands.close()
+            except Exception as e:
+                logger.warning(f"Closing MediaPipe Hands failed: {str(e)}")
+        with self._lock:
+            self._evicted += 1
+
+
+hands_pool = HandsPool(
+    idle_timeout=getattr(settings, 'HANDS_POOL_IDLE_TIMEOUT', 60.0),
+    max_sessions=getattr(settings, 'HANDS_POOL_MAX_SESSIONS', 32),
+)
@@ -0,0 +1,146 @@
+"""
+Filtering, keyset pagination and streaming export of a user's detection history.
+
+Pages are ordered by ``(-timestamp, -id)`` and the cursor is the position of
+the last row of the previous page, so every page is a range scan of the
+``(user, -timestamp, -id)`` index no matter how deep the user has paged.
+"""
+
+import base64
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import DetectionHistory
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ('id', 'gesture', 'confidence', 'timestamp')
+
+# Shortcuts used by the history page's filter menu
+PERIODS = {
+    'today': lambda now: timezone.make_aware(datetime.combine(timezone.localdate(now), time.min)),
+    'week': lambda now: now - timedelta(days=7),
+    'month': lambda now: now - timedelta(days=30),
+}
+
+
+def _parse_bound(value, end_of_day=False):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        parsed = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_history(user, params):
+    """History of ``user`` restricted by the ``gesture``, ``since``, ``until`` and ``filter`` parameters.
+
+    ``gesture`` may list several gestures separated by commas. ``since`` and
+    ``until`` take a date or datetime; a plain ``until`` date includes that
+    whole day. Raises ``ValueError`` for malformed values.
+    """
+    history = DetectionHistory.objects.filter(user=user)
+
+    gestures = [g for g in params.get('gesture', '').split(',') if g]
+    if len(gestures) == 1:
+        history = history.filter(gesture=gestures[0])
+    elif gestures:
+        history = history.filter(gesture__in=gestures)
+
+    period = params.get('filter')
+    if period:
+        if period not in PERIODS:
+            raise ValueError(f"Invalid filter: {period}. Use one of {', '.join(PERIODS)}")
+        history = history.filter(timestamp__gte=PERIODS[period](timezone.now()))
+    if params.get('since'):
+        history = history.filter(timestamp__gte=_parse_bound(params['since']))
+    if params.get('until'):
+        history = history.filter(timestamp__lt=_parse_bound(params['until'], end_of_day=True))
+    return history.order_by('-timestamp', '-id')
+
+
+def encode_cursor(detection):
+    key = f'{detection.timestamp.isoformat()}|{detection.id}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = key.rsplit('|', 1)
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        timestamp = None
+    if timestamp is None:
+        raise ValueError('Invalid cursor')
+    return timestamp, pk
+
+
+def page_size(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError(f'Invalid limit: {value}')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate(history, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (rows, next cursor) for the page after ``cursor`` (None when it is the last page)."""
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        history = history.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+    # One extra row tells whether there is a next page
+    rows = list(history[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def serialize(detection):
+    return {
+        'id': detection.id,
+        'gesture': detection.gesture,
+        'confidence': detection.confidence,
+        'timestamp': detection.timestamp.isoformat(),
+        'video_clip': detection.video_clip.url if detection.video_clip else None,
+    }
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _export_rows(history):
+    # Plain tuples, fetched EXPORT_CHUNK_SIZE at a time with a server-side cursor
+    # where the database supports it
+    return history.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(history):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for pk, gesture, confidence, timestamp in _export_rows(history):
+        yield writer.writerow((pk, gesture, confidence, timestamp.isoformat()))
+
+
+def iter_ndjson(history):
+    for pk, gesture, confidence, timestamp in _export_rows(history):
+        yield json.dumps({
+            'id': pk, 'gesture': gesture, 'confidence': confidence, 'timestamp': timestamp.isoformat(),
+        }) + '\n'
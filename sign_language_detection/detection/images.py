@@ -0,0 +1,130 @@
+"""
+Decoding uploaded images for landmark extraction.
+
+Images can be sent as a raw body (``Content-Type: image/jpeg``, ``image/png``
+or ``image/webp``), as the ``image`` file of a multipart form, or base64 in
+the ``image_data`` JSON field. Each is decoded once with ``cv2.imdecode`` and
+converted to the RGB layout MediaPipe expects.
+
+Hand landmarks are normalised to the image size, so there is no point in
+running MediaPipe on a 12 MP photo: images larger than ``max_side`` are
+scaled down, JPEGs by decoding them directly at 1/2, 1/4 or 1/8 size (see
+``cv2.IMREAD_REDUCED_COLOR_*``) and then with ``INTER_AREA``. The resized and
+RGB frames are written into per-thread buffers that are reused while the
+frame size stays the same, so a decoded image is only valid until the next
+``decode_image`` call on the same thread.
+"""
+
+import base64
+import binascii
+import io
+import json
+import threading
+
+import cv2
+import numpy as np
+
+IMAGE_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/webp', 'image/bmp')
+# Largest first: decode at the smallest scale that is still >= max_side
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class BufferPool(threading.local):
+    """Per-thread scratch arrays, reallocated only when the shape changes."""
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self.buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+
+_pool = BufferPool()
+
+
+class ImageDataError(ValueError):
+    """The ``image_data`` of a request is not base64."""
+
+
+def decode_base64_image(image_data):
+    """Bytes of base64 ``image_data``, optionally a ``data:`` URL; raises ``ImageDataError``."""
+    if not isinstance(image_data, str):
+        raise ImageDataError('image_data must be a base64 string')
+    if image_data.startswith('data:'):
+        image_data = image_data.partition(',')[2]
+    try:
+        return base64.b64decode(image_data, validate=True)
+    except binascii.Error:
+        raise ImageDataError('image_data is not valid base64')
+
+
+def is_image_request(request):
+    if request.content_type in IMAGE_CONTENT_TYPES:
+        return True
+    return request.content_type == 'multipart/form-data' and 'image' in request.FILES
+
+
+def image_bytes(request):
+    """Encoded image from a raw image body, a multipart ``image`` file or JSON ``image_data``.
+
+    Returns None if the request has no image. Raises ``json.JSONDecodeError``
+    for a JSON body that cannot be parsed and ``ImageDataError`` for
+    ``image_data`` that is not base64.
+    """
+    if request.content_type in IMAGE_CONTENT_TYPES:
+        return request.body
+    if request.content_type == 'multipart/form-data':
+        upload = request.FILES.get('image')
+        return upload.read() if upload is not None else None
+    image_data = json.loads(request.body).get('image_data')
+    return decode_base64_image(image_data) if image_data else None
+
+
+def _encoded_size(data):
+    # Header only; PIL does not decode the pixels until asked to
+    from PIL import Image
+
+    try:
+        return Image.open(io.BytesIO(data)).size
+    except Exception:
+        return None
+
+
+def decode_image(data, max_side=None):
+    """Decode ``data`` (JPEG/PNG/WebP bytes) into an (H, W, 3) uint8 RGB array.
+
+    Images whose longer side exceeds ``max_side`` are scaled down to it.
+    The array is a pooled buffer (see the module docstring). Raises
+    ``ValueError`` if the data is not a decodable image.
+    """
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    if encoded.size == 0:
+        raise ValueError('Empty image')
+
+    flags = cv2.IMREAD_COLOR
+    if max_side:
+        size = _encoded_size(data)
+        if size is not None:
+            ratio = max(size) / max_side
+            flags = next((flag for factor, flag in REDUCED_DECODE_FLAGS if ratio >= factor), flags)
+
+    bgr = cv2.imdecode(encoded, flags)
+    if bgr is None:
+        raise ValueError('Could not decode image (expected JPEG, PNG or WebP)')
+
+    height, width = bgr.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        resized = _pool.get('resized', (size[1], size[0], 3))
+        bgr = cv2.resize(bgr, size, dst=resized, interpolation=cv2.INTER_AREA)
+
+    rgb = _pool.get('rgb', bgr.shape)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
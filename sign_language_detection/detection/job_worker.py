@@ -0,0 +1,29 @@
+"""
+Entry points of the job worker processes.
+
+Worker processes are spawned, so they unpickle these functions by importing
+this module before Django is set up: it must not import models (or anything
+that does) at module level.
+"""
+
+import os
+
+
+def init_worker(nice, threads):
+    """Lower the priority and cap the threads of this process, then set up Django."""
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    if threads:
+        for name in ('TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS', 'OMP_NUM_THREADS'):
+            os.environ[name] = str(threads)
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import django
+    django.setup()
+
+
+def run(job_id):
+    from .jobs import run_job
+    return run_job(job_id)
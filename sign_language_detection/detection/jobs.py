@@ -0,0 +1,427 @@
+"""
+Background training and export jobs.
+
+Jobs are rows of the ``Job`` table, so they survive restarts and can be
+polled from any web process; no message broker is involved. ``JobRunner``
+runs a dispatcher thread that claims queued jobs while fewer than
+``max_concurrent`` are running and hands them to a ``ProcessPoolExecutor``.
+Each job gets a fresh worker process (spawned, never forked from the
+threaded web server) with a lower CPU priority and a capped number of
+TensorFlow threads, so training never blocks a request thread nor starves
+the detection workers of this process.
+
+The worker reports progress to the job row and polls its
+``cancel_requested`` flag between steps. A successful export with
+``activate`` is hot-swapped into the serving model registry.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import traceback
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import job_worker
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Parameters a client may set, with the type they are coerced to
+TRAIN_PARAMS = {
+    'actions': list,
+    'epochs': int,
+    'batch_size': int,
+    'shard_size': int,
+    'shuffle_buffer': int,
+    'validation_split': float,
+    'patience': int,
+    'noise': float,
+    'seed': int,
+}
+EXPORT_PARAMS = {
+    'input': str,
+    'activate': bool,
+    'features': str,
+}
+
+# Largest max-abs difference from Keras an exported model may have
+EXPORT_TOLERANCE = 1e-4
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a job function to report progress and check for cancellation."""
+
+    def __init__(self, job_id, min_interval=1.0):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_check = 0.0
+
+    def progress(self, fraction, message=''):
+        Job.objects.filter(pk=self.job_id).update(
+            progress=min(1.0, max(0.0, float(fraction))), message=message[:255],
+        )
+        self._last_check = time.monotonic()
+        self._raise_if_cancelled()
+
+    def check_cancelled(self, force=False):
+        """Raise ``JobCancelled`` if cancellation was requested (at most once per ``min_interval``)."""
+        now = time.monotonic()
+        if force or now - self._last_check >= self.min_interval:
+            self._last_check = now
+            self._raise_if_cancelled()
+
+    def _raise_if_cancelled(self):
+        if Job.objects.filter(pk=self.job_id, cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+def _clean_params(params, allowed):
+    if not isinstance(params, dict):
+        raise ValueError('Job parameters must be a JSON object')
+    unknown = set(params) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    cleaned = {}
+    for name, value in params.items():
+        kind = allowed[name]
+        if kind is list:
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"'{name}' must be a list of strings")
+        elif kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"'{name}' must be true or false")
+        else:
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{name}' must be a {kind.__name__}")
+        cleaned[name] = value
+    return cleaned
+
+
+def artifacts_dir():
+    directory = getattr(settings, 'MODEL_ARTIFACTS_DIR', settings.BASE_DIR / 'detection' / 'artifacts')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def train_job(job, params, context):
+    """Train the action model on the packed dataset (see ``detection.training``)."""
+    import tensorflow as tf
+    from .dataset import SequenceDataset
+    from .training import train
+
+    params = dict(params)
+    epochs = params.get('epochs', 200)
+    dataset_path = settings.PACKED_DATASET_DIR
+    dataset = SequenceDataset.open(dataset_path)
+    # Recorded with the model: it fixes the order of its outputs
+    actions = params.setdefault('actions', dataset.actions)
+
+    class Progress(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            loss = logs.get('val_loss', logs.get('loss'))
+            message = f"Epoch {epoch + 1}/{epochs}" + (f", loss {loss:.4f}" if loss is not None else '')
+            context.progress((epoch + 1) / epochs, message)
+
+        def on_train_batch_end(self, batch, logs=None):
+            context.check_cancelled()
+
+    output_path = os.path.join(artifacts_dir(), f'action_model-job{job.pk}.keras')
+    context.progress(0.0, 'Loading dataset')
+    model, history = train(
+        dataset_path, output_path, verbose=0, callbacks=[Progress()], **params,
+    )
+    losses = history.history.get('val_loss') or history.history.get('loss') or []
+    return {
+        'model_path': str(output_path),
+        'epochs_run': len(losses),
+        'best_loss': float(min(losses)) if losses else None,
+        'actions': actions,
+        # What the model's frames have to be converted to (see detection.features)
+        'features': dataset.features,
+    }
+
+
+def export_job(job, params, context):
+    """Export a Keras landmark model to ``.npz`` and check it against Keras."""
+    from .features import HAND_FEATURE_SIZE, HAND_FEATURES, transform
+    from .model_loader import DEFAULT_NUMPY_MODEL_PATH, artifact_path
+    from .numpy_engine import export_keras_model, max_difference
+
+    if params.get('input'):
+        input_path = artifact_path(params['input'])
+    else:
+        input_path = os.path.join(settings.BASE_DIR.parent, 'hand_landmarks.keras')
+    features = params.get('features')
+    transform(features)  # Fails early on an unknown feature set
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f'Input model not found: {input_path}')
+
+    context.progress(0.1, 'Loading Keras model')
+    import tensorflow as tf
+    model = tf.keras.models.load_model(input_path)
+
+    context.progress(0.5, 'Exporting')
+    output_path = os.path.join(artifacts_dir(), f'hand_landmarks-job{job.pk}.npz')
+    metadata = {'source': os.path.basename(input_path)}
+    if features:
+        metadata['features'] = features
+    numpy_model = export_keras_model(model, output_path, metadata=metadata)
+    max_diff = max_difference(model, numpy_model)
+    if max_diff > EXPORT_TOLERANCE:
+        raise ValueError(f'Exported model does not match Keras output (max difference {max_diff:.2e})')
+
+    result = {
+        'model_path': output_path,
+        'size': os.path.getsize(output_path),
+        'max_difference': max_diff,
+        'input_shape': list(numpy_model.input_shape),
+        'features': features,
+        'activated': False,
+    }
+    if params.get('activate'):
+        expected = [HAND_FEATURE_SIZE] if features == HAND_FEATURES else [21, 3]
+        if list(numpy_model.input_shape) != expected:
+            raise ValueError(f'Only landmark models can be activated: expected input {expected}, '
+                             f'not {list(numpy_model.input_shape)}')
+        context.progress(0.9, 'Activating')
+        # Served by default from now on, also after a restart
+        os.makedirs(os.path.dirname(DEFAULT_NUMPY_MODEL_PATH), exist_ok=True)
+        partial = DEFAULT_NUMPY_MODEL_PATH + '.part'
+        shutil.copyfile(output_path, partial)
+        os.replace(partial, DEFAULT_NUMPY_MODEL_PATH)
+        result['activated'] = True
+    return result
+
+
+JOB_KINDS = {
+    'train': (train_job, TRAIN_PARAMS),
+    'export': (export_job, EXPORT_PARAMS),
+}
+
+
+def run_job(job_id):
+    """Run a claimed job to completion in this (worker) process; returns (status, result)."""
+    job = Job.objects.get(pk=job_id)
+    Job.objects.filter(pk=job_id).update(worker_pid=os.getpid())
+    context = JobContext(job_id)
+    function, _ = JOB_KINDS[job.kind]
+    try:
+        context.check_cancelled(force=True)
+        result = function(job, job.params, context)
+    except JobCancelled:
+        status, result, error = 'cancelled', {}, ''
+        logger.info(f"Job {job_id} cancelled")
+    except Exception as e:
+        status, result, error = 'failed', {}, traceback.format_exc()
+        logger.error(f"Job {job_id} failed: {str(e)}")
+    else:
+        status, error = 'succeeded', ''
+    updates = dict(status=status, result=result, error=error, finished_at=timezone.now())
+    if status == 'succeeded':
+        updates.update(progress=1.0, message='Done')
+    Job.objects.filter(pk=job_id).update(**updates)
+    return status, result
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobRunner:
+    """Dispatches queued ``Job`` rows to a pool of worker processes."""
+
+    def __init__(self, max_concurrent=1, poll_interval=2.0, nice=10, threads=2, start_grace=120.0,
+                 name='job-runner'):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.poll_interval = poll_interval
+        self.start_grace = start_grace
+        self.nice = nice
+        self.threads = threads
+        self.name = name
+        self._executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = {}
+
+    def submit(self, kind, params=None, user=None):
+        """Validate ``params`` and queue a job; raises ValueError on bad input."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        params = _clean_params(params or {}, JOB_KINDS[kind][1])
+        if params.get('input'):
+            from .model_loader import artifact_path
+            # A model of the artifacts directory, never an arbitrary server path
+            artifact_path(params['input'])
+        if user is not None and not user.is_authenticated:
+            user = None
+        job = Job.objects.create(kind=kind, params=params, user=user)
+        self.ensure_running()
+        self._wake.set()
+        return job
+
+    def cancel(self, job):
+        """Cancel a queued job now, or ask a running one to stop. Returns the refreshed job."""
+        if not Job.objects.filter(pk=job.pk, status='queued').update(
+                status='cancelled', cancel_requested=True, finished_at=timezone.now()):
+            Job.objects.filter(pk=job.pk, status='running').update(cancel_requested=True)
+        job.refresh_from_db()
+        return job
+
+    def ensure_running(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            running = list(self._running)
+        return {
+            'max_concurrent': self.max_concurrent,
+            'running_here': running,
+            'queued': Job.objects.filter(status='queued').count(),
+            'running': Job.objects.filter(status='running').count(),
+        }
+
+    def _run(self):
+        close_old_connections()
+        try:
+            self._recover()
+        except Exception as e:
+            logger.error(f"Job recovery failed: {str(e)}")
+        while True:
+            try:
+                close_old_connections()
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"Job dispatch failed: {str(e)}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _recover(self):
+        # Jobs left running by a worker that no longer exists (e.g. a server restart).
+        # A job claimed by another web process has no pid until its spawned
+        # worker has started, so it is only orphaned once that took too long
+        started_before = timezone.now() - timedelta(seconds=self.start_grace)
+        for job in Job.objects.filter(status='running'):
+            if job.worker_pid is None:
+                orphaned = job.started_at is None or job.started_at < started_before
+            else:
+                orphaned = not _pid_alive(job.worker_pid)
+            if orphaned:
+                Job.objects.filter(pk=job.pk, status='running').update(
+                    status='failed', error='Worker process exited', finished_at=timezone.now(),
+                )
+                logger.warning(f"Job {job.pk} was orphaned by its worker and marked failed")
+
+    def _dispatch(self):
+        # The cap is global: jobs running in other web processes count too
+        free = self.max_concurrent - Job.objects.filter(status='running').count()
+        for job_id in Job.objects.filter(status='queued').order_by('created_at', 'id').values_list('pk', flat=True)[:max(0, free)]:
+            if not Job.objects.filter(pk=job_id, status='queued').update(status='running', started_at=timezone.now()):
+                continue  # Claimed elsewhere or cancelled
+            logger.info(f"Starting job {job_id}")
+            future = self._pool().submit(job_worker.run, job_id)
+            with self._lock:
+                self._running[job_id] = future
+            future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id, f))
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_concurrent,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=job_worker.init_worker,
+                    initargs=(self.nice, self.threads),
+                    # A fresh process per job gives TensorFlow memory back
+                    max_tasks_per_child=1,
+                )
+            return self._executor
+
+    def _finished(self, job_id, future):
+        with self._lock:
+            self._running.pop(job_id, None)
+        close_old_connections()
+        try:
+            status, result = future.result()
+        except BrokenProcessPool as e:
+            with self._lock:
+                self._executor = None
+            self._fail(job_id, f'Worker process died: {str(e)}')
+            return
+        except Exception:
+            self._fail(job_id, traceback.format_exc())
+            return
+        finally:
+            self._wake.set()
+
+        logger.info(f"Job {job_id} {status}")
+        if status == 'succeeded' and result.get('activated'):
+            self._activate(job_id, result['model_path'])
+
+    def _fail(self, job_id, error):
+        logger.error(f"Job {job_id} failed: {error}")
+        Job.objects.filter(pk=job_id, status='running').update(
+            status='failed', error=error, finished_at=timezone.now(),
+        )
+
+    def _activate(self, job_id, model_path):
+        from .model_registry import load_landmark_model, registry
+        try:
+            version = registry.swap('landmarks', lambda: load_landmark_model(model_path))
+            job = Job.objects.get(pk=job_id)
+            Job.objects.filter(pk=job_id).update(result=dict(job.result, model_version=version))
+        except Exception as e:
+            logger.error(f"Activating the model of job {job_id} failed: {str(e)}")
+
+
+def job_info(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'params': job.params,
+        'progress': job.progress,
+        'message': job.message,
+        'result': job.result,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+job_runner = JobRunner(
+    max_concurrent=getattr(settings, 'JOBS_MAX_CONCURRENT', 1),
+    poll_interval=getattr(settings, 'JOBS_POLL_INTERVAL', 2.0),
+    nice=getattr(settings, 'JOBS_NICE', 10),
+    threads=getattr(settings, 'JOBS_TF_THREADS', 2),
+    start_grace=getattr(settings, 'JOBS_START_GRACE', 120),
+)
@@ -0,0 +1,86 @@
+"""
+Keypoint extraction from MediaPipe Holistic results.
+
+The layout matches the training data in MP_Data: pose (33 x 4), face
+(468 x 3), left hand (21 x 3) and right hand (21 x 3), 1662 values per frame.
+Missing parts are zero-filled.
+
+``KeypointExtractor`` writes straight into a preallocated float32 vector that
+is reused from frame to frame, instead of building nested Python lists and
+several temporary arrays per frame. Face and pose can be left out when the
+model does not use them (the vector is then shorter, see ``size``).
+"""
+
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+POSE_SIZE = 33 * 4
+FACE_SIZE = 468 * 3
+HAND_SIZE = 21 * 3
+KEYPOINT_SIZE = POSE_SIZE + FACE_SIZE + 2 * HAND_SIZE
+LEFT_HAND_OFFSET = POSE_SIZE + FACE_SIZE
+RIGHT_HAND_OFFSET = LEFT_HAND_OFFSET + HAND_SIZE
+
+_xyz = attrgetter('x', 'y', 'z')
+_xyzv = attrgetter('x', 'y', 'z', 'visibility')
+
+
+class KeypointExtractor:
+    """Fill a reusable float32 keypoint vector from Holistic results."""
+
+    def __init__(self, include_pose=True, include_face=True):
+        # (results attribute, number of values, per-landmark getter)
+        parts = []
+        if include_pose:
+            parts.append(('pose_landmarks', POSE_SIZE, _xyzv))
+        if include_face:
+            parts.append(('face_landmarks', FACE_SIZE, _xyz))
+        parts.append(('left_hand_landmarks', HAND_SIZE, _xyz))
+        parts.append(('right_hand_landmarks', HAND_SIZE, _xyz))
+
+        self._parts = []
+        offset = 0
+        for name, size, getter in parts:
+            self._parts.append((name, offset, offset + size, getter))
+            offset += size
+        self.size = offset
+        self.buffer = np.zeros(self.size, dtype=np.float32)
+
+    def extract(self, results, out=None):
+        """Write the keypoints of ``results`` into ``out`` (or the internal buffer) and return it.
+
+        Without ``out`` the same buffer is returned on every call, so copy it
+        if it has to outlive the next frame.
+        """
+        if out is None:
+            out = self.buffer
+        for name, start, end, getter in self._parts:
+            landmarks = getattr(results, name)
+            if landmarks:
+                out[start:end] = np.fromiter(
+                    chain.from_iterable(map(getter, landmarks.landmark)), dtype=np.float32, count=end - start
+                )
+            else:
+                out[start:end] = 0.0
+        return out
+
+
+_default_extractor = KeypointExtractor()
+
+
+def extract_keypoints(results):
+    """Extract keypoints from MediaPipe results into a new 1662-value vector."""
+    return _default_extractor.extract(results, out=np.empty(KEYPOINT_SIZE, dtype=np.float32))
+
+
+def hand_landmarks(keypoints):
+    """(M, 21, 3) array of every detected hand in a stack of 1662-value keypoint vectors."""
+    keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, KEYPOINT_SIZE)
+    hands = np.concatenate([
+        keypoints[:, LEFT_HAND_OFFSET:RIGHT_HAND_OFFSET],
+        keypoints[:, RIGHT_HAND_OFFSET:RIGHT_HAND_OFFSET + HAND_SIZE],
+    ]).reshape(-1, 21, 3)
+    # Missing hands are zero-filled
+    return hands[np.any(hands != 0, axis=(1, 2))]
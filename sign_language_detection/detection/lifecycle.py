@@ -0,0 +1,146 @@
+"""
+Startup and readiness of the serving models.
+
+``ModelLifecycle.start`` (called once the WSGI/ASGI application is created)
+loads every model of the registry in a background thread, from the local
+artifact cache only (see ``model_loader.local_model_paths``). The registry
+runs each model's warm-up before publishing it: ``warm_up`` pushes a few
+batches of every configured batch size through the model, so graph tracing,
+lazy allocations and caches happen here rather than in the first requests.
+Only when every model is loaded, warm and not the untrained fallback does
+``is_ready`` turn true; ``/app/api/health/`` and ``/app/model-status/``
+answer 503 until then.
+A failed startup is retried by the next ``start`` call, but no sooner than
+``retry_interval`` seconds later, doubling with every failure up to
+``max_retry_interval``.
+
+Load time, warm-up time and the latency of the first and of the following
+inferences per batch size are kept for ``status``.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+def _is_fallback(model):
+    info = getattr(model, 'get_model_info', None)
+    return bool(info and info().get('is_fallback'))
+
+
+def warm_up(predict_batch, input_shape, batch_sizes=(1, 16), batches=3, seed=0):
+    """Run ``batches`` batches of each size through ``predict_batch``; return latency metrics."""
+    rng = np.random.default_rng(seed)
+    metrics = {'batches': int(batches), 'first_inference_ms': {}, 'inference_ms': {}}
+    for size in batch_sizes:
+        sample = rng.random((int(size), *input_shape), dtype=np.float32)
+        timings = []
+        for _ in range(max(1, int(batches))):
+            start = time.perf_counter()
+            predict_batch(sample)
+            timings.append((time.perf_counter() - start) * 1000.0)
+        metrics['first_inference_ms'][str(size)] = timings[0]
+        metrics['inference_ms'][str(size)] = float(np.median(timings[1:])) if len(timings) > 1 else timings[0]
+    return metrics
+
+
+class ModelLifecycle:
+    """Loads and warms up the registry's models once per process and reports readiness."""
+
+    def __init__(self, registry, names=None, retry_interval=30.0, max_retry_interval=600.0,
+                 name='model-lifecycle'):
+        self.registry = registry
+        self.names = names
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.name = name
+        self.state = 'idle'
+        self.error = None
+        self.failures = 0
+        self.started_at = None
+        self.ready_at = None
+        self.startup_time = None
+        self._retry_at = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self):
+        """Start loading in the background (once, or again after a failure once the
+        retry delay has passed); returns immediately."""
+        if self._thread is not None and (self.state != 'failed' or time.monotonic() < self._retry_at):
+            return
+        with self._lock:
+            retry = self.state == 'failed' and not self._thread.is_alive() and time.monotonic() >= self._retry_at
+            if self._thread is None or retry:
+                self.state = 'loading'
+                self.error = None
+                self.started_at = time.time()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the models are ready (or ``timeout`` seconds); returns readiness."""
+        return self._ready.wait(timeout)
+
+    def status(self):
+        models = self.registry.status()
+        for name, model_status in models.items():
+            if model_status['ready']:
+                model_status['is_fallback'] = _is_fallback(self.registry.get(name))
+        return {
+            'state': self.state,
+            'ready': self.is_ready(),
+            'error': self.error,
+            'failures': self.failures,
+            'retry_in': max(0.0, self._retry_at - time.monotonic()) if self.state == 'failed' else None,
+            'started_at': self.started_at,
+            'ready_at': self.ready_at,
+            'startup_time': self.startup_time,
+            'models': models,
+        }
+
+    def _run(self):
+        start = time.perf_counter()
+        names = self.names or list(self.registry.status())
+        try:
+            for name in names:
+                # Loads and warms up the model, unless a request already did
+                model = self.registry.get(name)
+                if _is_fallback(model) and self.failures:
+                    # Left by an earlier attempt: look for the model again
+                    self.registry.swap(name)
+                    model = self.registry.get(name)
+                if _is_fallback(model):
+                    raise RuntimeError(f"Model '{name}' is the untrained fallback (no model artifact found)")
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.retry_interval * 2 ** (self.failures - 1), self.max_retry_interval)
+            self._retry_at = time.monotonic() + delay
+            self.error = str(e)
+            self.state = 'failed'
+            logger.error(f"Model startup failed (attempt {self.failures}, retrying in {delay:.0f}s): {str(e)}")
+            return
+        self.failures = 0
+        self.startup_time = time.perf_counter() - start
+        self.ready_at = time.time()
+        self.state = 'ready'
+        self._ready.set()
+        logger.info(f"Models {', '.join(names)} ready in {self.startup_time:.2f}s")
+
+
+model_lifecycle = ModelLifecycle(
+    registry,
+    retry_interval=getattr(settings, 'MODEL_STARTUP_RETRY_INTERVAL', 30),
+    max_retry_interval=getattr(settings, 'MODEL_STARTUP_MAX_RETRY_INTERVAL', 600),
+)
@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.features import TRANSFORMS
+from detection.model_loader import DEFAULT_NUMPY_MODEL_PATH
+
+
+class Command(BaseCommand):
+    help = 'Export a Keras landmark model to the .npz format used by the NumPy inference engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            default=os.path.join(settings.BASE_DIR.parent, 'hand_landmarks.keras'),
+            help='Keras model file (.keras/.h5) to export',
+        )
+        parser.add_argument(
+            '--output',
+            default=DEFAULT_NUMPY_MODEL_PATH,
+            help='Destination .npz file',
+        )
+        parser.add_argument(
+            '--features',
+            choices=sorted(TRANSFORMS),
+            help='Feature set the model was trained on (see detection.features); default raw landmarks',
+        )
+
+    def handle(self, *args, **options):
+        input_path = options['input']
+        output_path = options['output']
+
+        if not os.path.exists(input_path):
+            raise CommandError(f'Input model not found: {input_path}')
+
+        # TensorFlow is only needed to read the Keras model, not to serve it
+        import tensorflow as tf
+        from detection.numpy_engine import export_keras_model, max_difference
+
+        model = tf.keras.models.load_model(input_path)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        metadata = {'source': os.path.basename(input_path)}
+        if options['features']:
+            metadata['features'] = options['features']
+        numpy_model = export_keras_model(model, output_path, metadata=metadata)
+
+        # Check the export against Keras before anyone serves it
+        max_diff = max_difference(model, numpy_model)
+        if max_diff > 1e-4:
+            raise CommandError(f'Exported model does not match Keras output (max difference {max_diff:.2e})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {input_path} to {output_path} '
+            f'({os.path.getsize(output_path):,} bytes, max difference {max_diff:.2e})'
+        ))
@@ -0,0 +1,62 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.features import FRAME_FEATURES
+from detection.video_extraction import extract_video_keypoints
+
+
+class Command(BaseCommand):
+    help = ('Extract MediaPipe Holistic keypoints from a directory of videos '
+            '(<dir>/<action>/<clip>.mp4) into the packed dataset, using a process pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory containing the videos')
+        parser.add_argument('--output', default=str(settings.PACKED_DATASET_DIR),
+                            help='Dataset directory to create or append to')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of worker processes (one Holistic instance each)')
+        parser.add_argument('--sequence-length', type=int, default=30)
+        parser.add_argument('--stride', type=int,
+                            help='Frames between the starts of consecutive sequences (default: no overlap)')
+        parser.add_argument('--max-side', type=int, default=640,
+                            help='Downscale frames so that their longest side is at most this many pixels')
+        parser.add_argument('--action', help='Action for videos placed directly in the directory')
+        parser.add_argument('--features', action='store_true',
+                            help=f'Store {FRAME_FEATURES} features (pose + hand geometry) instead of raw keypoints')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['directory']):
+            raise CommandError(f"Not a directory: {options['directory']}")
+
+        last_report = [0.0]
+
+        def progress(stats, elapsed):
+            if elapsed - last_report[0] >= 5:
+                last_report[0] = elapsed
+                fps = stats['frames'] / elapsed
+                self.stdout.write(
+                    f"{stats['sequences']} sequences, {stats['frames']} frames, "
+                    f"{fps:.1f} fps ({fps / stats['workers']:.1f} per core)"
+                )
+
+        start = time.perf_counter()
+        stats = extract_video_keypoints(
+            options['directory'], options['output'],
+            workers=options['workers'],
+            sequence_length=options['sequence_length'],
+            stride=options['stride'],
+            max_side=options['max_side'],
+            default_action=options['action'],
+            progress=progress,
+            features=FRAME_FEATURES if options['features'] else None,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['sequences']} new sequences ({stats['frames']} frames) from {stats['videos']} videos "
+            f"in {time.perf_counter() - start:.1f}s: {stats['fps']:.1f} fps overall, "
+            f"{stats['fps_per_core']:.1f} fps per core ({stats['workers']} workers), "
+            f"{stats['worker_fps']:.1f} fps per busy core. Dataset now holds {stats['dataset_size']} sequences."
+        ))
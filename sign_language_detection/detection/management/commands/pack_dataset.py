@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.dataset import pack_mp_data
+from detection.features import FRAME_FEATURES
+
+
+class Command(BaseCommand):
+    help = 'Pack MP_Data/<action>/<sequence>/<frame>.npy files into a single memory-mapped dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(settings.KEYPOINT_DATA_DIR),
+                            help='MP_Data directory to read')
+        parser.add_argument('--output', default=str(settings.PACKED_DATASET_DIR),
+                            help='Dataset directory to create or append to')
+        parser.add_argument('--actions', nargs='+', help='Only pack these actions')
+        parser.add_argument('--sequence-length', type=int, default=30)
+        parser.add_argument('--feature-size', type=int, default=1662)
+        parser.add_argument('--features', action='store_true',
+                            help=f'Store {FRAME_FEATURES} features (pose + hand geometry) instead of raw keypoints')
+
+    def handle(self, *args, **options):
+        try:
+            dataset, added = pack_mp_data(
+                options['source'], options['output'],
+                actions=options['actions'],
+                sequence_length=options['sequence_length'],
+                feature_size=options['feature_size'],
+                features=FRAME_FEATURES if options['features'] else None,
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {added} sequences; {options['output']} now holds {len(dataset)} sequences "
+            f"of actions {', '.join(dataset.actions)} ({dataset.features or 'raw keypoints'})"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from detection.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Abort chunked uploads that have been idle longer than UPLOAD_SESSION_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Idle time in seconds (defaults to UPLOAD_SESSION_TTL)')
+
+    def handle(self, *args, **options):
+        aborted = purge_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Aborted {aborted} stale upload(s)'))
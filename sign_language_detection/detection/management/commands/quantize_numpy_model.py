@@ -0,0 +1,143 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.dataset import INDEX_FILE, SequenceDataset
+from detection.features import transform
+from detection.keypoints import hand_landmarks
+from detection.model_loader import DEFAULT_NUMPY_MODEL_PATH
+from detection.numpy_engine import NumpyModel, quantize_model
+
+
+def is_raw_dataset(path):
+    return os.path.exists(os.path.join(path, INDEX_FILE)) and SequenceDataset.open(path).features is None
+
+
+def load_calibration_hands(path):
+    """Hand landmarks of a raw packed dataset or of an MP_Data directory of .npy frames."""
+    if os.path.exists(os.path.join(path, INDEX_FILE)):
+        dataset = SequenceDataset.open(path)
+        if dataset.features is not None:
+            # Hand features are normalised; the landmarks cannot be recovered from them
+            raise CommandError(f'{path} holds {dataset.features} features, not raw keypoints: '
+                               f'calibrate on a raw packed dataset or an MP_Data directory')
+        keypoints = dataset.sequences
+    else:
+        files = sorted(glob.glob(os.path.join(path, '**', '*.npy'), recursive=True))
+        if not files:
+            raise CommandError(f'No keypoint data found in {path}')
+        keypoints = np.stack([np.load(f) for f in files])
+    return hand_landmarks(keypoints)
+
+
+def measure_latency(model, inputs, batch_size, repeats):
+    batch = inputs[:batch_size]
+    model.predict(batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000.0)
+
+
+class Command(BaseCommand):
+    help = ('Quantize an exported NumPy landmark model to int8 or float16, calibrated on MP_Data hands, '
+            'and report its accuracy, latency and memory against the float model')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', default=DEFAULT_NUMPY_MODEL_PATH,
+                            help='Float .npz model written by export_numpy_model')
+        parser.add_argument('--output', help='Destination .npz file (default: <input>-<dtype>.npz)')
+        parser.add_argument('--dtype', choices=['int8', 'float16'], default='int8')
+        parser.add_argument('--calibration', default=None,
+                            help='Raw packed dataset or MP_Data directory '
+                                 '(default: the packed dataset if it holds raw keypoints)')
+        parser.add_argument('--samples', type=int, default=2000,
+                            help='Hands used for calibration; as many more are used for evaluation')
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 64])
+        parser.add_argument('--repeats', type=int, default=200)
+        parser.add_argument('--min-agreement', type=float, default=0.99,
+                            help='Fail if fewer top-1 predictions than this match the float model')
+        parser.add_argument('--report', help='Also write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        input_path = options['input']
+        if not os.path.exists(input_path):
+            raise CommandError(f'Input model not found: {input_path} (run export_numpy_model first)')
+        dtype = options['dtype']
+        output_path = options['output'] or f'{os.path.splitext(input_path)[0]}-{dtype}.npz'
+
+        source = options['calibration']
+        if source is None:
+            packed = str(settings.PACKED_DATASET_DIR)
+            source = packed if is_raw_dataset(packed) else str(settings.KEYPOINT_DATA_DIR)
+        hands = load_calibration_hands(source)
+        if len(hands) < 2:
+            raise CommandError(f'Not enough hand landmarks in {source} to calibrate')
+        np.random.default_rng(0).shuffle(hands)
+        count = min(options['samples'], len(hands) // 2)
+        calibration, evaluation = hands[:count], hands[count:2 * count]
+
+        model = NumpyModel.load(input_path)
+        convert = transform(model.metadata.get('features'))
+        if convert is not None:
+            calibration, evaluation = convert(calibration), convert(evaluation)
+        quantized = quantize_model(model, dtype, calibration=calibration)
+        quantized.metadata['quantization']['calibration_source'] = os.path.basename(os.path.normpath(source))
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        quantized.save(output_path)
+
+        expected = model.predict(evaluation)
+        actual = quantized.predict(evaluation)
+        disagree = expected.argmax(axis=1) != actual.argmax(axis=1)
+        agreement = 1.0 - float(np.mean(disagree))
+        # How sure the float model was where the two disagree: small margins mean near-ties
+        top2 = np.sort(expected, axis=1)[:, -2:]
+        margins = top2[:, 1] - top2[:, 0]
+        report = {
+            'dtype': dtype,
+            'calibration_source': source,
+            'calibration_samples': len(calibration),
+            'evaluation_samples': len(evaluation),
+            'top1_agreement': agreement,
+            'max_disagreement_margin': float(margins[disagree].max()) if disagree.any() else 0.0,
+            'max_abs_difference': float(np.max(np.abs(expected - actual))),
+            'mean_abs_difference': float(np.mean(np.abs(expected - actual))),
+            'models': {},
+        }
+        for name, path, candidate in (('float32', input_path, model), (dtype, output_path, quantized)):
+            report['models'][name] = {
+                'path': path,
+                'file_bytes': os.path.getsize(path),
+                'weight_bytes': candidate.nbytes(),
+                'latency_ms': {
+                    str(size): measure_latency(candidate, evaluation, size, options['repeats'])
+                    for size in options['batch_sizes'] if size <= len(evaluation)
+                },
+            }
+
+        self.stdout.write(f"Calibrated on {len(calibration)} hands from {source}, "
+                          f"evaluated on {len(evaluation)}")
+        sizes = list(report['models']['float32']['latency_ms'])
+        self.stdout.write(f"{'model':<10} {'file KB':>9} {'weights KB':>11} "
+                          + ''.join(f"{f'batch {s} ms':>14}" for s in sizes))
+        for name, row in report['models'].items():
+            self.stdout.write(f"{name:<10} {row['file_bytes'] / 1024:>9.1f} {row['weight_bytes'] / 1024:>11.1f} "
+                              + ''.join(f"{row['latency_ms'][s]:>14.3f}" for s in sizes))
+        self.stdout.write(f"Top-1 agreement {agreement:.2%} (largest float top-1 margin where they differ: "
+                          f"{report['max_disagreement_margin']:.3f}), max probability difference "
+                          f"{report['max_abs_difference']:.2e} (mean {report['mean_abs_difference']:.2e})")
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if agreement < options['min_agreement']:
+            raise CommandError(f'Top-1 agreement {agreement:.2%} is below {options["min_agreement"]:.2%}; '
+                               f'{output_path} should not be served')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output_path}'))
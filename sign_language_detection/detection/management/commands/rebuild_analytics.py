@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.analytics import rebuild_user_analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute analytics totals, gesture counters and rollups from the detection history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild these users (default: all)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        rebuilt = 0
+        for user in users.iterator():
+            total = rebuild_user_analytics(user)
+            rebuilt += 1
+            self.stdout.write(f'{user.username}: {total} detections')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt analytics for {rebuilt} users'))
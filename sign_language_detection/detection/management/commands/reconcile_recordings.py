@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from detection.recordings import reconcile_recordings
+from detection.transcoding import transcode_queue
+
+
+class Command(BaseCommand):
+    help = 'Sync the recording index with the files in RECORDINGS_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transcode', action='store_true',
+                            help='Also transcode every pending recording before exiting')
+
+    def handle(self, *args, **options):
+        added, removed = reconcile_recordings()
+        self.stdout.write(self.style.SUCCESS(f'Recording index: {added} added, {removed} removed'))
+        if options['transcode']:
+            futures = transcode_queue.submit_pending()
+            done = sum(1 for future in futures if future.result() is not None)
+            self.stdout.write(self.style.SUCCESS(f'Transcoded {done} of {len(futures)} pending recordings'))
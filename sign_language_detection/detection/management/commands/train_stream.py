@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.training import train
+
+
+class Command(BaseCommand):
+    help = 'Train the action LSTM by streaming shuffled shards of the packed dataset (see pack_dataset)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=str(settings.PACKED_DATASET_DIR),
+                            help='Packed dataset directory to train on')
+        parser.add_argument('--output', default='sign_language_model.h5',
+                            help='Where the best model is checkpointed')
+        parser.add_argument('--actions', nargs='+', help='Classes, in model output order (default: all)')
+        parser.add_argument('--epochs', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=32)
+        parser.add_argument('--shard-size', type=int, default=64,
+                            help='Sequences read together from disk')
+        parser.add_argument('--shuffle-buffer', type=int, default=256,
+                            help='Sequences held in memory for shuffling')
+        parser.add_argument('--validation-split', type=float, default=0.05)
+        parser.add_argument('--patience', type=int, default=20,
+                            help='Epochs without improvement before stopping')
+        parser.add_argument('--noise', type=float, default=0.0,
+                            help='Std-dev of Gaussian jitter added to keypoints during training')
+        parser.add_argument('--log-dir', help='TensorBoard log directory')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            _, history = train(
+                options['dataset'], options['output'],
+                actions=options['actions'],
+                epochs=options['epochs'],
+                batch_size=options['batch_size'],
+                shard_size=options['shard_size'],
+                shuffle_buffer=options['shuffle_buffer'],
+                validation_split=options['validation_split'],
+                patience=options['patience'],
+                noise=options['noise'],
+                log_dir=options['log_dir'],
+                seed=options['seed'],
+                verbose=2 if options['verbosity'] > 1 else 1,
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        monitor = 'val_loss' if 'val_loss' in history.history else 'loss'
+        best = min(history.history[monitor])
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained {len(history.history[monitor])} epochs; best {monitor} {best:.4f}, saved to {options['output']}"
+        ))
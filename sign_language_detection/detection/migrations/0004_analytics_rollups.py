@@ -0,0 +1,124 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('detection', '0003_detectionhistory_useranalytics_usersettings'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='detectionhistory',
+            options={'ordering': ['-timestamp'], 'verbose_name': 'Detection History', 'verbose_name_plural': 'Detection Histories'},
+        ),
+        migrations.AlterModelOptions(
+            name='useranalytics',
+            options={'verbose_name': 'User Analytics', 'verbose_name_plural': 'User Analytics'},
+        ),
+        migrations.AlterModelOptions(
+            name='usersettings',
+            options={'verbose_name': 'User Settings', 'verbose_name_plural': 'User Settings'},
+        ),
+        migrations.RemoveField(
+            model_name='useranalytics',
+            name='accuracy_rate',
+        ),
+        migrations.RemoveField(
+            model_name='useranalytics',
+            name='last_active',
+        ),
+        migrations.RemoveField(
+            model_name='useranalytics',
+            name='most_common_gesture',
+        ),
+        migrations.RemoveField(
+            model_name='useranalytics',
+            name='session_duration',
+        ),
+        migrations.AddField(
+            model_name='useranalytics',
+            name='average_confidence',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='useranalytics',
+            name='confidence_sum',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='useranalytics',
+            name='last_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='detectionhistory',
+            name='gesture',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='detectionhistory',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='usersettings',
+            name='camera_device',
+            field=models.CharField(default='0', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='usersettings',
+            name='preferred_language',
+            field=models.CharField(default='en', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='GestureCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gesture', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyDetectionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0.0)),
+                ('day', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HourlyDetectionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0.0)),
+                ('hour', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'hour')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='gesturecount',
+            index=models.Index(fields=['user', '-count'], name='gesture_count_top_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='gesturecount',
+            unique_together={('user', 'gesture')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailydetectionrollup',
+            unique_together={('user', 'day')},
+        ),
+    ]
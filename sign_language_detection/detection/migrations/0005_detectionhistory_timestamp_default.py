@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0004_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='detectionhistory',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
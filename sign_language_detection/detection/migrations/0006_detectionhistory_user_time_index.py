@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0005_detectionhistory_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='detectionhistory',
+            options={'ordering': ['-timestamp', '-id'], 'verbose_name': 'Detection History', 'verbose_name_plural': 'Detection Histories'},
+        ),
+        migrations.AddIndex(
+            model_name='detectionhistory',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='history_user_time_idx'),
+        ),
+    ]
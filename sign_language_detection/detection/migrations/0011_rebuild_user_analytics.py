@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def rebuild_analytics(apps, schema_editor):
+    # Fills confidence_sum and the gesture/hourly/daily rollups (added in 0004)
+    # for history recorded before they were maintained. Uses the current
+    # models, as rebuild_user_analytics does; their tables are final here.
+    from django.contrib.auth import get_user_model
+    from detection.analytics import rebuild_user_analytics
+
+    DetectionHistory = apps.get_model('detection', 'DetectionHistory')
+    UserAnalytics = apps.get_model('detection', 'UserAnalytics')
+    user_ids = (set(DetectionHistory.objects.values_list('user_id', flat=True).distinct())
+                | set(UserAnalytics.objects.values_list('user_id', flat=True)))
+    for user in get_user_model().objects.filter(pk__in=user_ids).iterator():
+        rebuild_user_analytics(user)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0010_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_analytics, migrations.RunPython.noop),
+    ]
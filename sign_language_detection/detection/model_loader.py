@@ -1,29 +1,60 @@
-import kagglehub
-import tensorflow as tf
 import numpy as np
 import os
 import glob
 import cv2
-import mediapipe as mp
 import logging
 
+from django.conf import settings
+
+from .features import transform
+from .numpy_engine import NumpyModel
+from .hands_pool import hands_pool
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Exported NumPy weights (see the export_numpy_model command). When present they
+# are used instead of the Keras model so that TensorFlow is never imported.
+DEFAULT_NUMPY_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'hand_landmarks.npz')
+
+KAGGLE_MODEL_HANDLE = "vnefedov/american-sign-language-with-landmarks/keras/default"
+
+
+def artifact_path(name):
+    """Path of the model file ``name`` in settings.MODEL_ARTIFACTS_DIR.
+
+    Only a plain file name is accepted, so clients can pick a model version
+    but never point the loader at an arbitrary file on the server.
+    """
+    if not isinstance(name, str) or not name or os.path.basename(name) != name or name in ('.', '..'):
+        raise ValueError(f"Invalid model name '{name}': expected a file name in the artifacts directory")
+    directory = getattr(settings, 'MODEL_ARTIFACTS_DIR', os.path.dirname(DEFAULT_NUMPY_MODEL_PATH))
+    return os.path.join(str(directory), name)
+
+
+def local_model_paths():
+    """Local artifact cache, most preferred first: settings.MODEL_LOCAL_PATHS, then
+    models kagglehub downloaded earlier."""
+    paths = [str(p) for p in getattr(settings, 'MODEL_LOCAL_PATHS', [DEFAULT_NUMPY_MODEL_PATH])]
+    cache = os.environ.get('KAGGLEHUB_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'kagglehub'))
+    paths.append(os.path.join(cache, 'models', *KAGGLE_MODEL_HANDLE.split('/')))
+    return paths
+
+
 class SignLanguageModel:
-    def __init__(self, auto_load=True):
+    def __init__(self, auto_load=True, model_path=None, allow_download=None):
         self.model = None
-        self.model_path = None
+        self.model_path = model_path
+        # Without it only the local artifact cache is used (no network at startup)
+        self.allow_download = (getattr(settings, 'MODEL_ALLOW_DOWNLOAD', False)
+                               if allow_download is None else allow_download)
         self.is_initialized = False
-        # Initialize MediaPipe hands
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=True, 
-            max_num_hands=1, 
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Feature transform the model was trained on (None: raw landmarks)
+        self.features = None
+        # MediaPipe Hands graphs are not thread-safe; they come from a pool
+        # (one per request thread, or per stream in video mode)
+        self.hands_pool = hands_pool
         if auto_load:
             self.load_model()
 
@@ -36,14 +67,34 @@ class SignLanguageModel:
                 logger.info("Model already loaded")
                 return True
                 
-            # Download the model from Kaggle
-            logger.info("Downloading model from Kaggle...")
-            download_path = kagglehub.model_download("vnefedov/american-sign-language-with-landmarks/keras/default")
-            logger.info(f"Model downloaded to: {download_path}")
+            if self.model_path is None:
+                self.model_path = next((p for p in local_model_paths() if os.path.exists(p)), None)
             
-            # Check what files actually exist in the download path
-            model_files = self._find_model_files(download_path)
-            logger.info(f"Found model files: {model_files}")
+            if self.model_path and os.path.isfile(self.model_path):
+                # Load a specific local model version (e.g. when hot-swapping)
+                logger.info(f"Using local model at {self.model_path}")
+                download_path = self.model_path
+                model_files = [self.model_path]
+            elif self.model_path and os.path.isdir(self.model_path):
+                logger.info(f"Using cached model directory {self.model_path}")
+                download_path = self.model_path
+                is_saved_model = os.path.exists(os.path.join(self.model_path, 'saved_model.pb'))
+                model_files = [self.model_path] if is_saved_model else self._find_model_files(download_path)
+            elif not self.allow_download:
+                raise FileNotFoundError(
+                    f"No local model in {', '.join(local_model_paths())} and downloads are disabled "
+                    f"(MODEL_ALLOW_DOWNLOAD)"
+                )
+            else:
+                # Download the model from Kaggle
+                import kagglehub
+                logger.info("Downloading model from Kaggle...")
+                download_path = kagglehub.model_download(KAGGLE_MODEL_HANDLE)
+                logger.info(f"Model downloaded to: {download_path}")
+                
+                # Check what files actually exist in the download path
+                model_files = self._find_model_files(download_path)
+                logger.info(f"Found model files: {model_files}")
             
             if not model_files:
                 logger.warning(f"No model files found in {download_path}, creating fallback model")
@@ -54,11 +105,17 @@ class SignLanguageModel:
             self.model_path = model_files[0]  # Use the first found model file
             
             # Try different loading approaches based on file extension
-            if self.model_path.endswith('.h5') or self.model_path.endswith('.keras'):
+            if self.model_path.endswith('.npz'):
+                logger.info(f"Loading NumPy model from {self.model_path}")
+                self.model = NumpyModel.load(self.model_path)
+                self.features = self.model.metadata.get('features')
+            elif self.model_path.endswith('.h5') or self.model_path.endswith('.keras'):
+                import tensorflow as tf
                 logger.info(f"Loading Keras model from {self.model_path}")
                 self.model = tf.keras.models.load_model(self.model_path)
             elif os.path.isdir(self.model_path) and (os.path.exists(os.path.join(self.model_path, 'saved_model.pb')) or 
                                                     os.path.exists(os.path.join(self.model_path, 'saved_model.pbtxt'))):
+                import tensorflow as tf
                 logger.info(f"Loading SavedModel from {self.model_path}")
                 self.model = tf.saved_model.load(self.model_path)
             else:
@@ -97,6 +154,7 @@ class SignLanguageModel:
         """Create a simple fallback CNN model for sign language detection based on landmarks"""
         logger.info("Creating simple fallback model for landmarks")
         try:
+            import tensorflow as tf
             model = tf.keras.Sequential([
                 tf.keras.layers.Input(shape=(21, 3)),  # 21 landmarks with 3 coordinates each
                 tf.keras.layers.Flatten(),
@@ -119,15 +177,19 @@ class SignLanguageModel:
             logger.error(f"Error creating fallback model: {str(e)}")
             self.is_initialized = False
 
-    def extract_hand_landmarks(self, image):
-        """Extract hand landmarks from an image using MediaPipe."""
+    def extract_hand_landmarks(self, image, session=None):
+        """Extract hand landmarks from an RGB image using MediaPipe.
+
+        Consecutive frames of one client stream should pass the same
+        ``session`` so the hand is tracked instead of re-detected.
+        """
         try:
             # Convert image to RGB for MediaPipe
             if image.shape[2] == 4:  # If RGBA
                 image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
             
             # Process the image
-            results = self.hands.process(image)
+            results = self.hands_pool.process(image, session=session)
             
             # Check if any hands were detected
             if not results.multi_hand_landmarks:
@@ -150,14 +212,6 @@ class SignLanguageModel:
 
     def predict(self, image):
         try:
-            if not self.is_initialized:
-                logger.warning("Model not initialized, attempting to load...")
-                if not self.load_model():
-                    raise ValueError("Failed to initialize model")
-            
-            if self.model is None:
-                raise ValueError("Model not loaded")
-
             # Extract hand landmarks
             landmarks = self.extract_hand_landmarks(image)
             
@@ -170,32 +224,7 @@ class SignLanguageModel:
                 }
             
             # Reshape for model input (add batch dimension)
-            landmarks = np.expand_dims(landmarks, axis=0)
-            
-            # Make prediction
-            if isinstance(self.model, tf.keras.Model):
-                predictions = self.model.predict(landmarks, verbose=0)
-            else:
-                # Handle SavedModel format
-                infer = self.model.signatures["serving_default"]
-                input_name = list(infer.structured_input_signature[1].keys())[0]
-                output_name = list(infer.structured_outputs.keys())[0]
-                predictions = infer(**{input_name: landmarks})[output_name].numpy()
-            
-            # Get the predicted class and confidence
-            predicted_class = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class])
-            
-            # Map class index to sign language letter (A-Z)
-            predicted_letter = chr(predicted_class + 65)  # 65 is ASCII for 'A'
-            
-            logger.debug(f"Prediction: {predicted_letter} with confidence {confidence:.2f}")
-            
-            return {
-                'letter': predicted_letter,
-                'confidence': confidence,
-                'raw_predictions': predictions[0].tolist()
-            }
+            return self.predict_batch(np.expand_dims(landmarks, axis=0))[0]
             
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}")
@@ -206,6 +235,57 @@ class SignLanguageModel:
                 'error': str(e)
             }
 
+    def predict_batch(self, landmarks):
+        """Run one forward pass over a (N, 21, 3) batch of hand landmarks.
+
+        Returns one result dict per row, in the same order as the input.
+        Errors are raised to the caller (see ``predict`` for the safe wrapper).
+        """
+        if not self.is_initialized:
+            logger.warning("Model not initialized, attempting to load...")
+            if not self.load_model():
+                raise ValueError("Failed to initialize model")
+        
+        if self.model is None:
+            raise ValueError("Model not loaded")
+        
+        landmarks = np.asarray(landmarks, dtype=np.float32)
+        if self.features is not None:
+            # Once for the whole batch
+            landmarks = transform(self.features)(landmarks)
+        
+        # Make prediction
+        if isinstance(self.model, NumpyModel):
+            predictions = self.model.predict(landmarks)
+        elif hasattr(self.model, 'layers'):
+            # Calling the model directly avoids the per-call setup cost of
+            # model.predict(), which dominates for small batches
+            predictions = self.model(landmarks, training=False).numpy()
+        else:
+            # Handle SavedModel format
+            import tensorflow as tf
+            infer = self.model.signatures["serving_default"]
+            input_name = list(infer.structured_input_signature[1].keys())[0]
+            output_name = list(infer.structured_outputs.keys())[0]
+            predictions = infer(**{input_name: tf.constant(landmarks)})[output_name].numpy()
+        
+        # Get the predicted class and confidence for every row at once
+        predicted_classes = np.argmax(predictions, axis=1)
+        confidences = predictions[np.arange(len(predictions)), predicted_classes]
+        
+        results = []
+        for predicted_class, confidence, row in zip(predicted_classes, confidences, predictions):
+            # Map class index to sign language letter (A-Z)
+            predicted_letter = chr(int(predicted_class) + 65)  # 65 is ASCII for 'A'
+            results.append({
+                'letter': predicted_letter,
+                'confidence': float(confidence),
+                'raw_predictions': row.tolist()
+            })
+        
+        logger.debug(f"Batch prediction for {len(results)} inputs")
+        return results
+
     def get_model_info(self):
         if not self.is_initialized:
             return {
@@ -220,7 +300,9 @@ class SignLanguageModel:
             }
         
         model_type = "Unknown"
-        if isinstance(self.model, tf.keras.Model):
+        if isinstance(self.model, NumpyModel):
+            model_type = "NumPy Model"
+        elif hasattr(self.model, 'layers'):
             model_type = "Keras Model"
         elif hasattr(self.model, "signatures"):
             model_type = "SavedModel"
@@ -230,8 +312,6 @@ class SignLanguageModel:
             'model_path': self.model_path,
             'model_type': model_type,
             'is_fallback': self.model_path == "fallback_model",
-            'input_type': 'Hand Landmarks (21 points)'
+            'input_type': 'Hand Landmarks (21 points)',
+            'features': self.features
         }
-
-# Initialize model with auto_load=True to ensure it's loaded at startup
-sign_language_model = SignLanguageModel(auto_load=True) 
\ No newline at end of file
@@ -33,7 +33,7 @@ class SignLanguageModel:
             logger.error(f"Error loading model: {str(e)}")
             return False
 
-    def extract_hand_landmarks(self, image):
+    def extract_hand_landmarks(self, image, session=None):
         """Mock hand landmarks extraction."""
         try:
             # Return mock landmarks (21 points with x, y, z coordinates)
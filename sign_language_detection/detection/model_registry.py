@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each model once and shares it between threads.
+
+    Models are registered by name with a factory callable. The first call to
+    ``get`` loads the model (other threads asking for the same model wait for
+    that load instead of starting their own). ``swap`` builds a new version
+    while the current one keeps serving requests, then replaces it atomically.
+
+    A ``warmup`` callable registered with a model runs on every new version
+    before it is published, so no request pays for its first inference.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._warmups = {}
+        self._load_locks = {}
+        self._entries = {}
+        self._errors = {}
+
+    def register(self, name, factory, warmup=None):
+        """Register a factory for ``name``. The model is not loaded until first use.
+
+        ``warmup(model)`` may return a dict of metrics, reported by ``status``.
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._warmups[name] = warmup
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """Return the loaded model for ``name``, loading it on first use."""
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry['model']
+
+        load_lock = self._get_load_lock(name)
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            entry = self._entries.get(name)
+            if entry is not None:
+                return entry['model']
+            return self._load(name, self._factories[name])['model']
+
+    def warm(self, names=None):
+        """Load the given models (all registered models by default) if not loaded yet."""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error warming model '{name}': {str(e)}")
+
+    def swap(self, name, factory=None):
+        """Load a new version of ``name`` and replace the current one without downtime.
+
+        If ``factory`` is given and loads successfully it becomes the registered
+        factory for later swaps; a failing one leaves the old factory in place.
+        Returns the new version number.
+        """
+        load_lock = self._get_load_lock(name)
+        with load_lock:
+            entry = self._load(name, factory or self._factories[name])
+            if factory is not None:
+                with self._lock:
+                    self._factories[name] = factory
+        logger.info(f"Model '{name}' swapped to version {entry['version']}")
+        return entry['version']
+
+    def is_ready(self, name):
+        return name in self._entries
+
+    def version(self, name):
+        """Version of the loaded ``name`` model, 0 if it is not loaded yet."""
+        entry = self._entries.get(name)
+        return entry['version'] if entry else 0
+
+    def status(self):
+        """Return the warm/ready state of every registered model."""
+        with self._lock:
+            names = list(self._factories)
+
+        status = {}
+        for name in names:
+            entry = self._entries.get(name)
+            load_lock = self._load_locks.get(name)
+            status[name] = {
+                'ready': entry is not None,
+                'loading': bool(load_lock and load_lock.locked()),
+                'version': entry['version'] if entry else 0,
+                'loaded_at': entry['loaded_at'] if entry else None,
+                'load_time': entry['load_time'] if entry else None,
+                'warmup_time': entry['warmup_time'] if entry else None,
+                'warmup': entry['warmup'] if entry else None,
+                'last_error': self._errors.get(name),
+            }
+        return status
+
+    def _get_load_lock(self, name):
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"No model registered under '{name}'")
+            return self._load_locks[name]
+
+    def _load(self, name, factory):
+        # Caller must hold the load lock for ``name``
+        logger.info(f"Loading model '{name}'...")
+        start = time.perf_counter()
+        warmup = self._warmups.get(name)
+        try:
+            model = factory()
+            loaded = time.perf_counter()
+            metrics = warmup(model) if warmup is not None else None
+        except Exception as e:
+            self._errors[name] = str(e)
+            raise
+        finished = time.perf_counter()
+
+        previous = self._entries.get(name)
+        entry = {
+            'model': model,
+            'version': previous['version'] + 1 if previous else 1,
+            'loaded_at': time.time(),
+            'load_time': loaded - start,
+            'warmup_time': finished - loaded if warmup is not None else None,
+            'warmup': metrics,
+        }
+        # Single dict assignment, so readers see either the old or the new entry
+        self._entries[name] = entry
+        self._errors.pop(name, None)
+        logger.info(f"Model '{name}' v{entry['version']} loaded in {entry['load_time']:.2f}s"
+                    + (f", warmed up in {entry['warmup_time']:.2f}s" if warmup is not None else ''))
+        return entry
+
+
+def load_landmark_model(model_path=None):
+    """Load the landmark model, from ``model_path`` if given.
+
+    An explicit path that cannot be loaded raises instead of falling back to
+    the untrained model, so a bad swap keeps the current version serving.
+    """
+    # Imported lazily so that importing the registry does not pull in TensorFlow
+    from .model_loader import SignLanguageModel
+    if model_path is not None and not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    model = SignLanguageModel(model_path=model_path)
+    if model_path is not None and (not model.is_initialized or model.get_model_info().get('is_fallback')):
+        raise ValueError(f"Could not load model from {model_path}")
+    return model
+
+
+def warm_up_landmark_model(model):
+    from django.conf import settings
+    from .lifecycle import warm_up
+
+    return warm_up(
+        model.predict_batch, (21, 3),
+        batch_sizes=getattr(settings, 'MODEL_WARMUP_BATCH_SIZES', (1, 16)),
+        batches=getattr(settings, 'MODEL_WARMUP_BATCHES', 3),
+    )
+
+
+# Shared registry for this worker process
+registry = ModelRegistry()
+registry.register('landmarks', load_landmark_model, warmup=warm_up_landmark_model)
@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -8,11 +11,14 @@ class DetectionHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     gesture = models.CharField(max_length=50)
     confidence = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered writes keep the time the detection was made
+    timestamp = models.DateTimeField(default=timezone.now)
     video_clip = models.FileField(upload_to='detection_clips/', null=True, blank=True)
 
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
+        # Serves the per-user, newest-first history pages and their cursors
+        indexes = [models.Index(fields=['user', '-timestamp', '-id'], name='history_user_time_idx')]
         verbose_name = 'Detection History'
         verbose_name_plural = 'Detection Histories'
 
@@ -20,8 +26,14 @@ class DetectionHistory(models.Model):
         return f"{self.user.username} - {self.gesture} ({self.timestamp})"
 
 class UserAnalytics(models.Model):
+    """Running totals of a user's detections.
+
+    Maintained incrementally by ``detection.analytics.record_detections``;
+    ``update_analytics`` recomputes everything from ``DetectionHistory``.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     total_detections = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
     average_confidence = models.FloatField(default=0.0)
     last_updated = models.DateTimeField(auto_now=True)
 
@@ -29,17 +41,57 @@ class UserAnalytics(models.Model):
         verbose_name = 'User Analytics'
         verbose_name_plural = 'User Analytics'
 
+    @property
+    def accuracy_rate(self):
+        return self.average_confidence * 100
+
     def update_analytics(self):
-        self.total_detections = DetectionHistory.objects.filter(user=self.user).count()
-        if self.total_detections > 0:
-            self.average_confidence = DetectionHistory.objects.filter(
-                user=self.user
-            ).aggregate(models.Avg('confidence'))['confidence__avg']
-        self.save()
+        from .analytics import rebuild_user_analytics
+        rebuild_user_analytics(self.user)
+        self.refresh_from_db()
 
     def __str__(self):
         return f"Analytics for {self.user.username}"
 
+class GestureCount(models.Model):
+    """Number of detections of one gesture by one user."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    gesture = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = [('user', 'gesture')]
+        indexes = [models.Index(fields=['user', '-count'], name='gesture_count_top_idx')]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.gesture}: {self.count}"
+
+class DetectionRollup(models.Model):
+    """Detections of one user aggregated over a time bucket."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_confidence(self):
+        return self.confidence_sum / self.count if self.count else 0.0
+
+class HourlyDetectionRollup(DetectionRollup):
+    hour = models.DateTimeField()  # Start of the hour, UTC
+
+    class Meta:
+        unique_together = [('user', 'hour')]
+
+class DailyDetectionRollup(DetectionRollup):
+    day = models.DateField()  # In settings.TIME_ZONE
+
+    class Meta:
+        unique_together = [('user', 'day')]
+
 class UserSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     detection_sensitivity = models.FloatField(default=0.5)
@@ -55,3 +107,142 @@ class UserSettings(models.Model):
     
     def __str__(self):
         return f"Settings for {self.user.username}"
+
+class Recording(models.Model):
+    """Index of the audio files in ``settings.RECORDINGS_DIR``.
+
+    Rows are written when a recording is saved and kept in sync with the
+    directory by ``detection.recordings.reconcile_recordings``, so listings
+    never have to scan the directory or open the files.
+    """
+    SOURCE_CHOICES = [
+        ('record', 'Recorded'),
+        ('save', 'Saved from the browser'),
+        ('upload', 'Uploaded'),
+        ('scan', 'Found on disk'),
+    ]
+    TRANSCODE_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    filename = models.CharField(max_length=255, unique=True)
+    # Name of the uploaded WAV once the recording has been transcoded
+    original_filename = models.CharField(max_length=255, blank=True, db_index=True)
+    size = models.BigIntegerField(default=0)
+    duration = models.FloatField(default=0.0)
+    codec = models.CharField(max_length=10, default='wav')
+    sample_rate = models.IntegerField(null=True, blank=True)
+    channels = models.IntegerField(null=True, blank=True)
+    # Peak amplitude (0-1) per slice of the recording, for waveform previews
+    peaks = models.JSONField(default=list, blank=True)
+    transcode_status = models.CharField(max_length=10, choices=TRANSCODE_STATUS_CHOICES, default='pending')
+    transcode_error = models.TextField(blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='record')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='recording_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='recording_user_created_idx'),
+        ]
+
+    @property
+    def url(self):
+        # Through serve_audio rather than MEDIA_URL: it also resolves the WAV
+        # name handed out before the recording was transcoded
+        return reverse('serve_audio', args=[self.filename])
+
+    def __str__(self):
+        return self.filename
+
+
+class UploadSession(models.Model):
+    """A chunked recording upload in progress (see ``detection.uploads``)."""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Name the client gave the file; only its extension is kept
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    # Optional SHA-256 of the whole file, checked when the upload is finalized
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    recording = models.ForeignKey(Recording, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'], name='upload_status_updated_idx')]
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.status})"
+
+
+class UploadChunk(models.Model):
+    """A chunk of an ``UploadSession`` that has been written and verified."""
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.IntegerField()
+    size = models.IntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['session', 'index'], name='unique_upload_chunk')]
+
+
+class Job(models.Model):
+    """A training or export job run by ``detection.jobs`` in a worker process."""
+    KIND_CHOICES = [
+        ('train', 'Train action model'),
+        ('export', 'Export landmark model'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    FINISHED = ('succeeded', 'failed', 'cancelled')
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.FloatField(default=0.0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    # Polled by the worker, which stops at the next epoch or step
+    cancel_requested = models.BooleanField(default=False)
+    worker_pid = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')]
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
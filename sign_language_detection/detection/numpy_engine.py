@@ -0,0 +1,403 @@
+"""
+Pure-NumPy inference for the small landmark classifiers.
+
+``export_keras_model`` dumps a Keras Sequential model into a compact ``.npz``
+file (weights plus a JSON layer description) and ``NumpyModel`` runs the
+same forward pass with vectorized NumPy, so serving does not need to import
+TensorFlow. BatchNormalization layers are folded into the following
+Dense/LSTM kernel at export time and Dropout layers are dropped.
+
+``quantize_model`` stores the Dense/LSTM kernels as float16, or as int8 with
+one scale per output unit. Int8 Dense layers also quantize their input, with
+scales calibrated on sample inputs (or taken from each batch without
+calibration), and multiply the int8 values exactly: NumPy has no fast
+integer matmul, but float32 holds every int8 x int8 dot product of up to
+``MAX_INT8_DEPTH`` terms exactly, so BLAS does the integer arithmetic.
+
+Quantization makes model files (and downloads) smaller, not inference
+faster. Each quantized kernel is converted to float32 once, on first use,
+and kept, so a loaded model holds as much memory as the float one. float16
+models then run at float32 speed, but int8 Dense layers still round their
+inputs on every call, which makes them slower than float32 (about 1.7x for
+the 63-128-64-26 landmark MLP at batch sizes 1 and 32).
+"""
+
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Quantized models are written as version 2, which version 1 readers reject
+QUANTIZED_FORMAT_VERSION = 2
+
+# Longest int8 dot product float32 accumulates exactly (127 * 127 * n < 2 ** 24)
+MAX_INT8_DEPTH = 1040
+
+# Layers that are the identity at inference time
+_SKIPPED_LAYERS = ('InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise', 'GaussianDropout')
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+def _elu(x):
+    return np.where(x > 0, x, np.expm1(np.minimum(x, 0)))
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'elu': _elu,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+}
+
+
+def _activation_name(activation):
+    if activation is None or isinstance(activation, str):
+        return activation
+    # Keras may return a serialized dict for activations
+    if isinstance(activation, dict):
+        return activation.get('config', {}).get('name') or activation.get('class_name')
+    return getattr(activation, '__name__', str(activation))
+
+
+class NumpyModel:
+    """Forward pass of an exported model using NumPy only."""
+
+    def __init__(self, layers, weights, metadata=None):
+        self.layers = layers
+        self.weights = weights
+        self.metadata = metadata or {}
+        # float32 kernels for inference, converted once from int8/float16
+        self._float32 = {}
+        for layer in layers:
+            if layer.get('activation') not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {layer.get('activation')}")
+
+    @classmethod
+    def load(cls, path):
+        """Load a model written by ``export_keras_model``."""
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data['__config__']))
+            if config.get('format_version') not in (FORMAT_VERSION, QUANTIZED_FORMAT_VERSION):
+                raise ValueError(f"Unsupported model format version: {config.get('format_version')}")
+            weights = {key: data[key] for key in data.files if key != '__config__'}
+        return cls(config['layers'], weights, config.get('metadata'))
+
+    @property
+    def input_shape(self):
+        return tuple(self.metadata.get('input_shape', ()))
+
+    @property
+    def output_shape(self):
+        return tuple(self.metadata.get('output_shape', ()))
+
+    @property
+    def quantization(self):
+        return self.metadata.get('quantization')
+
+    def count_params(self):
+        return int(sum(w.size for key, w in self.weights.items() if not key.endswith('_qscale')))
+
+    def nbytes(self):
+        """Size of the stored weights (without the float32 copies made for inference)."""
+        return int(sum(w.nbytes for w in self.weights.values()))
+
+    def save(self, path):
+        version = QUANTIZED_FORMAT_VERSION if self.quantization else FORMAT_VERSION
+        config = {'format_version': version, 'layers': self.layers, 'metadata': self.metadata}
+        np.savez_compressed(path, __config__=np.array(json.dumps(config)), **self.weights)
+
+    def predict(self, x):
+        """Run the forward pass on a batch and return the output array."""
+        x = np.asarray(x, dtype=np.float32)
+        for i, layer in enumerate(self.layers):
+            x = getattr(self, '_' + layer['type'])(x, layer, i)
+        return x
+
+    __call__ = predict
+
+    def _w(self, i, name):
+        return self.weights.get(f'layer{i}_{name}')
+
+    def _kernel(self, i, name='kernel', dequantize=True):
+        # float32 kernel, made once. int8 kernels are scaled back unless
+        # ``dequantize`` is False, which keeps their integer values
+        key = (i, name, dequantize)
+        kernel = self._float32.get(key)
+        if kernel is None:
+            kernel = self._w(i, name)
+            if kernel.dtype == np.int8 and dequantize:
+                kernel = kernel.astype(np.float32) * self._w(i, name + '_qscale')
+            else:
+                kernel = kernel.astype(np.float32, copy=False)
+            self._float32[key] = kernel
+        return kernel
+
+    def _flatten(self, x, layer, i):
+        return x.reshape(x.shape[0], -1)
+
+    def _dense(self, x, layer, i):
+        if self._w(i, 'kernel').dtype == np.int8:
+            y = _int8_matmul(x, self._kernel(i, dequantize=False), self._w(i, 'kernel_qscale'),
+                             self._w(i, 'input_qscale'))
+        else:
+            y = x @ self._kernel(i)
+        bias = self._w(i, 'bias')
+        if bias is not None:
+            y += bias
+        return ACTIVATIONS[layer['activation']](y)
+
+    def _affine(self, x, layer, i):
+        return x * self._w(i, 'scale') + self._w(i, 'shift')
+
+    def _activation(self, x, layer, i):
+        return ACTIVATIONS[layer['activation']](x)
+
+    def _layer_norm(self, x, layer, i):
+        axes = tuple(a if a >= 0 else x.ndim + a for a in layer['axis'])
+        mean = x.mean(axis=axes, keepdims=True)
+        var = x.var(axis=axes, keepdims=True)
+        y = (x - mean) / np.sqrt(var + layer['epsilon'])
+
+        # Parameters have the shape of the normalized axes
+        shape = [x.shape[a] if a in axes else 1 for a in range(x.ndim)]
+        gamma = self._w(i, 'gamma')
+        beta = self._w(i, 'beta')
+        if gamma is not None:
+            y *= gamma.reshape(shape)
+        if beta is not None:
+            y += beta.reshape(shape)
+        return y
+
+    def _lstm(self, x, layer, i):
+        kernel = self._kernel(i)
+        recurrent = self._kernel(i, 'recurrent_kernel')
+        bias = self._w(i, 'bias')
+        activation = ACTIVATIONS[layer['activation']]
+        recurrent_activation = ACTIVATIONS[layer['recurrent_activation']]
+        units = recurrent.shape[0]
+        batch, steps = x.shape[0], x.shape[1]
+
+        # Input projections for every timestep in one matmul
+        projected = x @ kernel
+        if bias is not None:
+            projected += bias
+
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if layer['return_sequences'] else None
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent
+            # Keras gate order: input, forget, cell, output
+            gate_i = recurrent_activation(z[:, :units])
+            gate_f = recurrent_activation(z[:, units:2 * units])
+            gate_c = activation(z[:, 2 * units:3 * units])
+            gate_o = recurrent_activation(z[:, 3 * units:])
+            c = gate_f * c + gate_i * gate_c
+            h = gate_o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+
+def _int8_matmul(x, kernel, kernel_scale, input_scale=None):
+    """``x @ kernel`` with ``x`` quantized to int8 and an int8 ``kernel``.
+
+    ``kernel`` holds the int8 values as float32. A calibrated ``input_scale``
+    has one value per input feature and is already folded into ``kernel``;
+    without it ``x`` is quantized with one scale for the whole batch.
+    """
+    if input_scale is None:
+        input_scale = max(float(np.max(np.abs(x))), 1e-8) / 127
+        kernel_scale = kernel_scale * input_scale
+    quantized = x / input_scale
+    np.rint(quantized, out=quantized)
+    np.clip(quantized, -127, 127, out=quantized)
+    # Integer-valued float32 operands, so the accumulation is exact
+    y = quantized @ kernel
+    y *= kernel_scale
+    return y
+
+
+def _quantize_int8(kernel):
+    # Symmetric, one scale per output unit (last axis)
+    scale = np.max(np.abs(kernel), axis=0) / 127
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    return np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8), scale
+
+
+def quantize_model(model, dtype='int8', calibration=None, percentile=99.9):
+    """Return a copy of ``model`` with float16 or int8 Dense/LSTM kernels.
+
+    For int8, ``calibration`` is a batch of representative inputs: the input
+    scales of each Dense layer are fixed to the ``percentile`` of the absolute
+    values each input feature takes. Without it one scale is computed from
+    every batch at inference.
+    """
+    if dtype not in ('int8', 'float16'):
+        raise ValueError(f"Unsupported quantization type: {dtype}")
+    if model.quantization:
+        raise ValueError('Model is already quantized')
+
+    weights = dict(model.weights)
+    x = None if calibration is None else np.asarray(calibration, dtype=np.float32)
+    for i, layer in enumerate(model.layers):
+        names = {'dense': ['kernel'], 'lstm': ['kernel', 'recurrent_kernel']}.get(layer['type'], [])
+        for name in names:
+            key = f'layer{i}_{name}'
+            kernel = weights[key]
+            if dtype == 'float16' or (layer['type'] == 'dense' and kernel.shape[0] > MAX_INT8_DEPTH):
+                # Too deep for int8 to accumulate exactly: half precision instead
+                weights[key] = kernel.astype(np.float16)
+                continue
+            if layer['type'] == 'dense' and x is not None:
+                # One scale per input feature, so small-range features (like z)
+                # keep their resolution; folded into the kernel rows
+                limit = np.percentile(np.abs(x.reshape(-1, x.shape[-1])), percentile, axis=0)
+                input_scale = (np.maximum(limit, 1e-8) / 127).astype(np.float32)
+                weights[f'layer{i}_input_qscale'] = input_scale
+                kernel = kernel * input_scale[:, None]
+            weights[key], weights[key + '_qscale'] = _quantize_int8(kernel)
+        if x is not None:
+            # Calibrate the next layers on the float activations
+            x = getattr(model, '_' + layer['type'])(x, layer, i)
+
+    metadata = dict(model.metadata, quantization={
+        'dtype': dtype,
+        'calibrated': calibration is not None,
+        'calibration_samples': 0 if calibration is None else len(calibration),
+    })
+    return NumpyModel(model.layers, weights, metadata)
+
+
+def _fold_affine(kernel, bias, scale, shift):
+    """Fold ``x * scale + shift`` applied before ``x @ kernel + bias`` into the kernel."""
+    new_bias = shift @ kernel
+    if bias is not None:
+        new_bias = new_bias + bias
+    return scale[:, None] * kernel, new_bias
+
+
+def export_keras_model(model, output_path, metadata=None):
+    """Export a Keras Sequential model to an ``.npz`` file for ``NumpyModel``.
+
+    Supported layers: Dense, LSTM, Flatten, LayerNormalization,
+    BatchNormalization (folded), Activation and Dropout (skipped).
+    """
+    layers = []
+    weights = {}
+    pending = None  # (scale, shift) of BatchNormalization layers not folded yet
+
+    def add_layer(spec, **arrays):
+        index = len(layers)
+        layers.append(spec)
+        for name, value in arrays.items():
+            if value is not None:
+                weights[f'layer{index}_{name}'] = np.asarray(value, dtype=np.float32)
+
+    def flush_pending():
+        nonlocal pending
+        if pending is not None:
+            add_layer({'type': 'affine', 'activation': None}, scale=pending[0], shift=pending[1])
+            pending = None
+
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        config = layer.get_config()
+
+        if kind in _SKIPPED_LAYERS:
+            continue
+
+        if kind == 'BatchNormalization':
+            axis = config.get('axis', -1)
+            axis = axis[0] if isinstance(axis, (list, tuple)) and len(axis) == 1 else axis
+            if axis not in (-1, len(layer.input.shape) - 1):
+                raise ValueError(f"BatchNormalization over axis {axis} is not supported")
+            mean = layer.moving_mean.numpy()
+            var = layer.moving_variance.numpy()
+            gamma = layer.gamma.numpy() if getattr(layer, 'gamma', None) is not None else np.ones_like(mean)
+            beta = layer.beta.numpy() if getattr(layer, 'beta', None) is not None else np.zeros_like(mean)
+            scale = gamma / np.sqrt(var + config['epsilon'])
+            shift = beta - mean * scale
+            if pending is not None:
+                scale, shift = pending[0] * scale, pending[1] * scale + shift
+            pending = (scale, shift)
+            continue
+
+        if kind == 'Flatten':
+            if pending is not None:
+                # Per-feature affine becomes a per-position one after flattening
+                repeats = int(np.prod(layer.input.shape[1:-1]))
+                pending = (np.tile(pending[0], repeats), np.tile(pending[1], repeats))
+            add_layer({'type': 'flatten', 'activation': None})
+
+        elif kind == 'Dense':
+            kernel = layer.kernel.numpy()
+            bias = layer.bias.numpy() if getattr(layer, 'bias', None) is not None else None
+            if pending is not None:
+                kernel, bias = _fold_affine(kernel, bias, *pending)
+                pending = None
+            add_layer({'type': 'dense', 'activation': _activation_name(config.get('activation'))},
+                      kernel=kernel, bias=bias)
+
+        elif kind == 'LSTM':
+            kernel, recurrent, *rest = [w.numpy() for w in layer.weights]
+            bias = rest[0] if rest else None
+            if pending is not None:
+                kernel, bias = _fold_affine(kernel, bias, *pending)
+                pending = None
+            add_layer({
+                'type': 'lstm',
+                'activation': _activation_name(config.get('activation', 'tanh')),
+                'recurrent_activation': _activation_name(config.get('recurrent_activation', 'sigmoid')),
+                'return_sequences': bool(config.get('return_sequences', False)),
+            }, kernel=kernel, recurrent_kernel=recurrent, bias=bias)
+
+        elif kind == 'LayerNormalization':
+            flush_pending()
+            axis = config.get('axis', -1)
+            add_layer({
+                'type': 'layer_norm',
+                'activation': None,
+                'axis': list(axis) if isinstance(axis, (list, tuple)) else [axis],
+                'epsilon': float(config.get('epsilon', 1e-3)),
+            },
+                gamma=layer.gamma.numpy() if getattr(layer, 'gamma', None) is not None else None,
+                beta=layer.beta.numpy() if getattr(layer, 'beta', None) is not None else None)
+
+        elif kind == 'Activation':
+            flush_pending()
+            add_layer({'type': 'activation', 'activation': _activation_name(config.get('activation'))})
+
+        else:
+            raise ValueError(f"Layer type {kind} is not supported by the NumPy engine")
+
+    flush_pending()
+
+    metadata = dict(metadata or {})
+    metadata.setdefault('input_shape', [d for d in model.input_shape[1:]])
+    metadata.setdefault('output_shape', [d for d in model.output_shape[1:]])
+    numpy_model = NumpyModel(layers, weights, metadata)
+    numpy_model.save(output_path)
+    logger.info(f"Exported {len(layers)} layers ({numpy_model.count_params():,} parameters) to {output_path}")
+    return numpy_model
+
+
+def max_difference(keras_model, numpy_model, samples=32, seed=0):
+    """Largest absolute difference between the Keras and NumPy outputs on random inputs."""
+    rng = np.random.default_rng(seed)
+    sample = rng.random((samples, *keras_model.input_shape[1:]), dtype=np.float32)
+    return float(np.max(np.abs(keras_model(sample, training=False).numpy() - numpy_model.predict(sample))))
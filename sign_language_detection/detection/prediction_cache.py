@@ -0,0 +1,115 @@
+"""
+LRU + TTL cache of landmark predictions.
+
+A signer holds each letter for many frames, and those frames differ by little
+more than sensor noise and hand movement. The cache key is the landmarks
+normalised much like ``SignLanguageModel.preprocess_landmarks`` in
+``model.py`` (shifted to the bounding-box corner and divided by its size, so
+moving the hand or its distance to the camera does not change it) and
+quantised to ``step``, so near-identical frames share one forward pass.
+Unlike ``preprocess_landmarks`` all three axes are divided by the larger x/y
+extent: the z extent of a hand is tiny, and stretching it to 0-1 would turn
+depth jitter into a different key on almost every frame.
+
+Entries expire after ``ttl`` seconds, and the key includes the model version
+(``namespace``) so a hot-swapped model never serves the previous model's
+answers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def landmark_key(landmarks, step=0.05):
+    """Translation- and scale-invariant, quantised key of one (21, 3) landmark array."""
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    low = landmarks.min(axis=0)
+    scale = (landmarks.max(axis=0) - low)[:2].max() + 1e-8
+    return np.rint((landmarks - low) / (scale * step)).astype(np.int16).tobytes()
+
+
+def _copy(result):
+    # Lists (e.g. raw_predictions) too, so no two results share one
+    return {name: list(value) if isinstance(value, list) else value for name, value in result.items()}
+
+
+class PredictionCache:
+    """Thread-safe LRU of prediction results with a time to live."""
+
+    def __init__(self, max_size=4096, ttl=5.0, step=0.05, namespace=None):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.step = float(step)
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def key(self, landmarks):
+        key = landmark_key(landmarks, self.step)
+        return (self.namespace(), key) if self.namespace is not None else key
+
+    def get(self, key):
+        """Return a copy of the cached result for ``key``, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            result, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return dict(_copy(result), cached=True)
+
+    def put(self, key, result):
+        # Copied so callers can modify the result they were given
+        result = _copy(result)
+        with self._lock:
+            self._entries[key] = (result, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'step': self.step,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'expired': self._expired,
+                'evictions': self._evictions,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    def _reset_stats(self):
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
@@ -0,0 +1,165 @@
+"""
+Recording index maintenance.
+
+Every view that writes a file into ``settings.RECORDINGS_DIR`` registers it
+here (one ``stat`` and one WAV header read, at save time). Files copied into
+the directory by other means, or deleted behind the app's back, are picked up
+by ``reconcile_recordings``, which a background thread runs every
+``RECORDINGS_RECONCILE_INTERVAL`` seconds once the recordings are first
+listed (and which the ``reconcile_recordings`` command runs on demand).
+New WAV recordings are queued for transcoding (see ``detection.transcoding``).
+"""
+
+import logging
+import os
+import threading
+import wave
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Recording
+from .transcoding import content_type_for, transcode_queue
+
+logger = logging.getLogger(__name__)
+
+RECORDING_EXTENSIONS = ('.wav', '.flac', '.opus')
+
+
+def get_audio_duration(filepath):
+    """Duration of an audio file in seconds (0 if it cannot be read)."""
+    try:
+        if str(filepath).lower().endswith('.wav'):
+            with wave.open(str(filepath), 'rb') as wf:
+                return round(wf.getnframes() / float(wf.getframerate()), 2)
+        import soundfile as sf
+        return round(sf.info(str(filepath)).duration, 2)
+    except (ImportError, OSError, EOFError, RuntimeError, wave.Error) as e:
+        logger.warning(f"Error getting duration for {filepath}: {e}")
+        return 0.0
+
+
+def _codec_for(filename):
+    return os.path.splitext(filename)[1].lower().lstrip('.')
+
+
+def register_recording(filepath, user=None, source='record'):
+    """Add (or refresh) the index entry of a file in the recordings directory."""
+    stat = os.stat(filepath)
+    filename = os.path.basename(filepath)
+    codec = _codec_for(filename)
+    recording, _ = Recording.objects.update_or_create(
+        filename=filename,
+        defaults={
+            'user': user if user is not None and user.is_authenticated else None,
+            'size': stat.st_size,
+            'duration': get_audio_duration(filepath),
+            'codec': codec,
+            'transcode_status': 'pending' if codec == 'wav' else 'skipped',
+            'source': source,
+        },
+    )
+    if recording.transcode_status == 'pending':
+        transaction.on_commit(lambda: transcode_queue.submit(recording.pk))
+    return recording
+
+
+def recording_info(recording):
+    """Response representation of a ``Recording``."""
+    return {
+        'id': recording.id,
+        'filename': recording.filename,
+        'url': recording.url,
+        'duration': recording.duration,
+        'size': recording.size,
+        'codec': recording.codec,
+        'content_type': content_type_for(recording.filename),
+        'transcode_status': recording.transcode_status,
+        'peaks': recording.peaks,
+        'timestamp': recording.created_at.isoformat(),
+        'created': timezone.localtime(recording.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def reconcile_recordings(directory=None):
+    """Bring the index in line with the directory; return (added, removed)."""
+    directory = directory or settings.RECORDINGS_DIR
+    # The index is read before the directory: files are written before their
+    # row, so a recording saved (or renamed by the transcoder) in between
+    # shows up on disk rather than as an indexed row without a file
+    rows = list(Recording.objects.values_list('filename', 'original_filename').iterator())
+    indexed = {filename for filename, _ in rows}
+    # A transcoded file shares its stem with the WAV it came from; while the
+    # transcoder swaps them only one of the two may be indexed
+    indexed_stems = {os.path.splitext(name)[0] for row in rows for name in row if name}
+
+    on_disk = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(RECORDING_EXTENSIONS):
+                on_disk[entry.name] = entry
+
+    new = [
+        Recording(
+            filename=name,
+            size=entry.stat().st_size,
+            duration=get_audio_duration(entry.path),
+            codec=_codec_for(name),
+            transcode_status='pending' if _codec_for(name) == 'wav' else 'skipped',
+            source='scan',
+            created_at=timezone.make_aware(datetime.fromtimestamp(entry.stat().st_mtime)),
+        )
+        for name, entry in on_disk.items()
+        if name not in indexed and os.path.splitext(name)[0] not in indexed_stems
+    ]
+    # ignore_conflicts: a view may have registered the same file meanwhile
+    Recording.objects.bulk_create(new, ignore_conflicts=True)
+
+    # Checked again so a file written back since the scan keeps its row
+    missing = {name for name in indexed - on_disk.keys() if not os.path.exists(os.path.join(directory, name))}
+    if missing:
+        Recording.objects.filter(filename__in=missing).delete()
+
+    if new or missing:
+        logger.info(f"Recording index: {len(new)} added, {len(missing)} removed")
+    return len(new), len(missing)
+
+
+class RecordingReconciler:
+    """Background thread that periodically runs ``reconcile_recordings``."""
+
+    def __init__(self, interval=300.0, name='recording-reconciler'):
+        self.interval = interval
+        self.name = name
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_running(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                close_old_connections()
+                reconcile_recordings()
+                transcode_queue.submit_pending()
+            except Exception as e:
+                logger.error(f"Recording reconciliation failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+
+recording_reconciler = RecordingReconciler(
+    interval=getattr(settings, 'RECORDINGS_RECONCILE_INTERVAL', 300),
+)
@@ -0,0 +1,117 @@
+"""
+Constant-memory building blocks for real-time detection loops.
+
+``SequenceWindow`` keeps the last ``length`` feature vectors in a fixed NumPy
+buffer and exposes them, oldest first, as a contiguous view without copying.
+``PredictionSmoother`` turns per-frame predictions into a short sentence using
+a majority vote over recent frames, updated in O(1) per frame.
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class SequenceWindow:
+    """Fixed-size sliding window over feature vectors.
+
+    Every row is written twice, at ``i`` and ``i + length`` of a buffer twice
+    the window size, so ``buffer[pos:pos + length]`` is always the window in
+    order. Appending costs two row copies and never allocates.
+    """
+
+    def __init__(self, length, width, dtype=np.float32):
+        self.length = length
+        self.width = width
+        self._buffer = np.zeros((2 * length, width), dtype=dtype)
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def is_full(self):
+        return self._count == self.length
+
+    def append(self, values):
+        i = self._pos
+        self._buffer[i] = values
+        self._buffer[i + self.length] = values
+        self._pos = (i + 1) % self.length
+        self._count = min(self._count + 1, self.length)
+
+    def view(self):
+        """The window, oldest row first, as a (length, width) view.
+
+        Only meaningful once the window is full; it changes on the next append.
+        """
+        return self._buffer[self._pos:self._pos + self.length]
+
+    def batch(self):
+        """The window as a (1, length, width) view, ready to feed a model."""
+        return self.view()[np.newaxis]
+
+    def clear(self):
+        self._buffer[:] = 0
+        self._pos = 0
+        self._count = 0
+
+
+class PredictionSmoother:
+    """Majority vote over the last ``history`` predictions.
+
+    A label is accepted when it holds a strict majority of the recent votes
+    and the mean confidence of those votes reaches ``threshold``. Accepted
+    labels are appended to ``sentence`` (at most ``max_sentence`` entries)
+    unless they repeat the last one.
+    """
+
+    def __init__(self, history=10, threshold=0.8, max_sentence=5):
+        self.threshold = threshold
+        self.sentence = deque(maxlen=max_sentence)
+        self._votes = deque(maxlen=history)
+        self._counts = {}
+        self._confidence_sums = {}
+        self._leader = None
+
+    def update(self, label, confidence):
+        """Add one prediction; return the label if it was just appended to the sentence."""
+        votes = self._votes
+        if len(votes) == votes.maxlen:
+            old_label, old_confidence = votes[0]
+            self._counts[old_label] -= 1
+            self._confidence_sums[old_label] -= old_confidence
+        votes.append((label, confidence))
+        self._counts[label] = self._counts.get(label, 0) + 1
+        self._confidence_sums[label] = self._confidence_sums.get(label, 0.0) + confidence
+
+        # A strict majority can only change hands to the label just added
+        if self._counts[label] * 2 > len(votes):
+            self._leader = label
+
+        label, _ = self.current()
+        if label is None or (self.sentence and self.sentence[-1] == label):
+            return None
+        self.sentence.append(label)
+        return label
+
+    def current(self):
+        """(label, mean confidence) of the accepted label, or (None, 0.0)."""
+        leader = self._leader
+        if leader is None:
+            return None, 0.0
+        count = self._counts[leader]
+        if count * 2 <= len(self._votes):
+            return None, 0.0
+        confidence = self._confidence_sums[leader] / count
+        if confidence < self.threshold:
+            return None, 0.0
+        return leader, confidence
+
+    def reset(self):
+        self.sentence.clear()
+        self._votes.clear()
+        self._counts.clear()
+        self._confidence_sums.clear()
+        self._leader = None
@@ -1,3 +1,621 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import uploads
+from .batching import BatcherOverloaded, MicroBatcher, landmark_batcher, prediction_cache
+from .file_serving import serve_file
+from .jobs import job_runner
+from .lifecycle import model_lifecycle
+from .hands_pool import hands_pool
+from .model_registry import registry
+from .models import Job, Recording
+from .recordings import recording_info
+from .numpy_engine import NumpyModel, export_keras_model, quantize_model
+from .wire import BINARY_CONTENT_TYPE, encode_landmarks
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+
+@unittest.skipIf(tf is None, 'TensorFlow is required for the Keras parity tests')
+class NumpyEngineParityTests(SimpleTestCase):
+    """The NumPy engine must reproduce the Keras forward pass."""
+
+    def assertMatchesKeras(self, model, atol=1e-5):
+        inputs = np.random.RandomState(0).rand(16, *model.input_shape[1:]).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.npz')
+            export_keras_model(model, path)
+            numpy_model = NumpyModel.load(path)
+        expected = model(inputs, training=False).numpy()
+        np.testing.assert_allclose(numpy_model.predict(inputs), expected, atol=atol)
+
+    def _randomize_batch_norm(self, model):
+        rng = np.random.RandomState(1)
+        for layer in model.layers:
+            if isinstance(layer, tf.keras.layers.BatchNormalization):
+                layer.set_weights([rng.rand(*w.shape).astype(np.float32) + 0.5 for w in layer.get_weights()])
+
+    def test_fallback_dense_model(self):
+        layers = tf.keras.layers
+        model = tf.keras.Sequential([
+            layers.Input(shape=(21, 3)),
+            layers.Flatten(),
+            layers.Dense(128, activation='relu'),
+            layers.Dropout(0.2),
+            layers.Dense(64, activation='relu'),
+            layers.Dropout(0.2),
+            layers.Dense(26, activation='softmax'),
+        ])
+        self.assertMatchesKeras(model)
+
+    def test_lstm_model_with_folded_batch_norm(self):
+        layers = tf.keras.layers
+        model = tf.keras.Sequential([
+            layers.Input(shape=(21, 3)),
+            layers.LSTM(32, return_sequences=True),
+            layers.BatchNormalization(),
+            layers.LSTM(16),
+            layers.BatchNormalization(),
+            layers.Dense(32, activation='relu'),
+            layers.BatchNormalization(),
+            layers.Dense(26, activation='softmax'),
+        ])
+        self._randomize_batch_norm(model)
+        self.assertMatchesKeras(model)
+
+    def test_batch_norm_before_flatten(self):
+        layers = tf.keras.layers
+        model = tf.keras.Sequential([
+            layers.Input(shape=(21, 3)),
+            layers.BatchNormalization(),
+            layers.Flatten(),
+            layers.Dense(26, activation='softmax'),
+        ])
+        self._randomize_batch_norm(model)
+        self.assertMatchesKeras(model)
+
+    def test_hand_landmarks_model(self):
+        path = os.path.join(settings.BASE_DIR.parent, 'hand_landmarks.keras')
+        if not os.path.exists(path):
+            self.skipTest('hand_landmarks.keras not found')
+        self.assertMatchesKeras(tf.keras.models.load_model(path))
+
+
+class QuantizeModelTests(SimpleTestCase):
+    """Quantized NumPy models must agree with the float model they came from."""
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.inputs = rng.rand(500, 21, 3).astype(np.float32)
+        self.calibration = rng.rand(1000, 21, 3).astype(np.float32)
+
+    def build(self, sizes, lstm=False):
+        rng = np.random.RandomState(1)
+        layers, weights = [], {}
+        if lstm:
+            layers.append({'type': 'lstm', 'activation': 'tanh', 'recurrent_activation': 'sigmoid',
+                           'return_sequences': False})
+            weights['layer0_kernel'] = rng.randn(3, 4 * sizes[0]).astype(np.float32) * 0.5
+            weights['layer0_recurrent_kernel'] = rng.randn(sizes[0], 4 * sizes[0]).astype(np.float32) * 0.2
+            weights['layer0_bias'] = np.zeros(4 * sizes[0], dtype=np.float32)
+        else:
+            layers.append({'type': 'flatten', 'activation': None})
+        for i, (n_in, n_out) in enumerate(zip(sizes, sizes[1:]), start=1):
+            layers.append({'type': 'dense', 'activation': 'softmax' if i == len(sizes) - 1 else 'relu'})
+            weights[f'layer{i}_kernel'] = (rng.randn(n_in, n_out) / np.sqrt(n_in)).astype(np.float32)
+            weights[f'layer{i}_bias'] = rng.randn(n_out).astype(np.float32) * 0.1
+        return NumpyModel(layers, weights, {'input_shape': [21, 3]})
+
+    def assertAgrees(self, model, quantized, min_agreement, atol):
+        expected = model.predict(self.inputs)
+        actual = quantized.predict(self.inputs)
+        agreement = np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))
+        self.assertGreaterEqual(agreement, min_agreement)
+        np.testing.assert_allclose(actual, expected, atol=atol)
+
+    def test_int8_calibrated(self):
+        model = self.build([63, 128, 64, 26])
+        quantized = quantize_model(model, 'int8', calibration=self.calibration)
+        self.assertEqual(quantized.weights['layer1_kernel'].dtype, np.int8)
+        self.assertLess(quantized.nbytes(), model.nbytes() / 2)
+        self.assertAgrees(model, quantized, 0.97, 0.05)
+
+    def test_int8_uncalibrated(self):
+        model = self.build([63, 128, 64, 26])
+        self.assertAgrees(model, quantize_model(model, 'int8'), 0.95, 0.05)
+
+    def test_float16(self):
+        model = self.build([63, 128, 64, 26])
+        quantized = quantize_model(model, 'float16')
+        self.assertEqual(quantized.weights['layer1_kernel'].dtype, np.float16)
+        self.assertAgrees(model, quantized, 0.99, 1e-3)
+
+    def test_int8_lstm(self):
+        model = self.build([16, 26], lstm=True)
+        quantized = quantize_model(model, 'int8', calibration=self.calibration)
+        self.assertEqual(quantized.weights['layer0_recurrent_kernel'].dtype, np.int8)
+        self.assertAgrees(model, quantized, 0.95, 0.05)
+
+    def test_int8_matmul_is_exact(self):
+        model = self.build([63, 26])
+        quantized = quantize_model(model, 'int8', calibration=self.calibration)
+        kernel = quantized.weights['layer1_kernel'].astype(np.int32)
+        x = self.inputs.reshape(len(self.inputs), -1)
+        integers = np.clip(np.rint(x / quantized.weights['layer1_input_qscale']), -127, 127).astype(np.int32)
+        logits = (integers @ kernel) * quantized.weights['layer1_kernel_qscale'] + quantized.weights['layer1_bias']
+        expected = np.exp(logits - logits.max(axis=1, keepdims=True))
+        expected /= expected.sum(axis=1, keepdims=True)
+        np.testing.assert_allclose(quantized.predict(self.inputs), expected, rtol=1e-4, atol=1e-6)
+
+    def test_save_and_load(self):
+        model = self.build([63, 128, 64, 26])
+        quantized = quantize_model(model, 'int8', calibration=self.calibration)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model-int8.npz')
+            quantized.save(path)
+            loaded = NumpyModel.load(path)
+        self.assertEqual(loaded.quantization['dtype'], 'int8')
+        # Predicting twice uses the float32 kernels kept from the first call
+        for _ in range(2):
+            np.testing.assert_array_equal(loaded.predict(self.inputs), quantized.predict(self.inputs))
+        with self.assertRaises(ValueError):
+            quantize_model(loaded, 'int8')
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def predict_batch(self, batch):
+        self.release.wait(5)
+        return [{'letter': 'A', 'confidence': 1.0}] * len(batch)
+
+    def test_full_queue_rejects_instead_of_blocking(self):
+        batcher = MicroBatcher(self.predict_batch, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+        running = batcher.submit_async(np.zeros((21, 3)))
+        # Wait for the worker to take the first request, which then blocks
+        while batcher.stats()['queue_depth']:
+            time.sleep(0.001)
+        queued = batcher.submit_async(np.zeros((21, 3)))
+        with self.assertRaises(BatcherOverloaded):
+            batcher.submit_async(np.zeros((21, 3)))
+        self.assertEqual(batcher.stats()['rejected'], 1)
+        self.release.set()
+        self.assertEqual(running.result(5)['letter'], 'A')
+        self.assertEqual(queued.result(5)['letter'], 'A')
+
+    def test_bad_shape_is_rejected(self):
+        batcher = MicroBatcher(self.predict_batch)
+        with self.assertRaises(ValueError):
+            batcher.submit_async(np.zeros((20, 3)))
+
+
+class ServeFileTests(SimpleTestCase):
+    """Range and conditional requests of ``serve_file``."""
+
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'recording.wav')
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        self.factory = RequestFactory()
+
+    def serve(self, path=None, **headers):
+        response = serve_file(self.factory.get('/', **headers), path or self.path, content_type='audio/wav')
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.body(response), self.data)
+
+    def test_range(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.body(response), self.data[10:20])
+
+    def test_open_ended_and_suffix_ranges(self):
+        response = self.serve(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(self.body(response), self.data[1000:])
+        response = self.serve(HTTP_RANGE='bytes=-24')
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1023/{len(self.data)}')
+        self.assertEqual(self.body(response), self.data[-24:])
+        # A suffix longer than the file is the whole file
+        response = self.serve(HTTP_RANGE='bytes=-5000')
+        self.assertEqual(self.body(response), self.data)
+
+    def test_end_past_the_file_is_clamped(self):
+        response = self.serve(HTTP_RANGE='bytes=1020-5000')
+        self.assertEqual(response['Content-Range'], f'bytes 1020-1023/{len(self.data)}')
+        self.assertEqual(self.body(response), self.data[1020:])
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=1024-', 'bytes=2000-3000', 'bytes=-0'):
+            response = self.serve(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_range_of_empty_file(self):
+        empty = os.path.join(os.path.dirname(self.path), 'empty.wav')
+        open(empty, 'wb').close()
+        for header in ('bytes=-10', 'bytes=0-'):
+            response = self.serve(empty, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_malformed_invalid_or_multiple_ranges_serve_whole_file(self):
+        for header in ('bytes=a-b', 'bytes=20-10', 'bytes=0-1,5-6', 'lines=1-2'):
+            response = self.serve(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertEqual(self.body(response), self.data)
+
+    def test_if_range(self):
+        etag = self.serve()['ETag']
+        last_modified = self.serve()['Last-Modified']
+        self.assertEqual(self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=last_modified).status_code, 206)
+        # The file changed since the client's copy: it gets the whole file
+        response = self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        stale_date = 'Thu, 01 Jan 1970 00:00:00 GMT'
+        self.assertEqual(self.serve(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=stale_date).status_code, 200)
+
+    def test_conditional_get(self):
+        response = self.serve()
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.serve(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+
+class ChunkedUploadTests(TestCase):
+    """Offsets, checksums and races of ``detection.uploads``."""
+
+    data = os.urandom(2500)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        (self.tmp / 'recordings').mkdir()
+        overrides = override_settings(UPLOADS_DIR=self.tmp / 'uploads', RECORDINGS_DIR=self.tmp / 'recordings')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.session = uploads.create_session(
+            None, len(self.data), filename='take.wav', chunk_size=1000,
+            sha256=hashlib.sha256(self.data).hexdigest(),
+        )
+
+    def chunk(self, index):
+        return self.data[index * 1000:(index + 1) * 1000]
+
+    def put(self, index, body=None, digest=None):
+        body = self.chunk(index) if body is None else body
+        digest = digest or hashlib.sha256(body).hexdigest()
+        uploads.write_chunk(self.session, index, io.BytesIO(body), len(body), digest)
+
+    def test_chunks_in_any_order_land_at_their_offsets(self):
+        for index in (2, 0, 1):
+            self.put(index)
+        info = uploads.session_info(self.session)
+        self.assertEqual(info['received'], [0, 1, 2])
+        self.assertEqual(info['missing'], [])
+        recording = uploads.finalize(self.session)
+        self.assertEqual((self.tmp / 'recordings' / recording.filename).read_bytes(), self.data)
+        self.assertEqual(recording.size, len(self.data))
+
+    def test_resent_chunk_overwrites_its_range(self):
+        self.put(0, body=bytes(1000))
+        for index in (0, 1, 2):
+            self.put(index)
+        self.assertEqual(uploads.part_path(self.session).read_bytes(), self.data)
+
+    def test_last_chunk_is_shorter(self):
+        with self.assertRaises(uploads.UploadError) as error:
+            self.put(2, body=self.data[2000:] + b'x')
+        self.assertEqual(error.exception.status, 400)
+        self.put(2)
+        self.assertEqual(uploads.received_chunks(self.session), [2])
+
+    def test_index_out_of_range(self):
+        for index in (-1, 3):
+            with self.assertRaises(uploads.UploadError) as error:
+                self.put(index, body=b'x' * 500)
+            self.assertEqual(error.exception.status, 416)
+
+    def test_chunk_checksum_mismatch_is_not_recorded(self):
+        with self.assertRaises(uploads.UploadError) as error:
+            self.put(1, digest='0' * 64)
+        self.assertEqual(error.exception.status, 422)
+        self.assertEqual(uploads.received_chunks(self.session), [])
+        with self.assertRaises(uploads.UploadError) as error:
+            uploads.write_chunk(self.session, 1, io.BytesIO(self.chunk(1)), 1000, '')
+        self.assertEqual(error.exception.status, 400)
+
+    def test_truncated_body(self):
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(self.session, 0, io.BytesIO(self.chunk(0)[:10]), 1000,
+                                hashlib.sha256(self.chunk(0)).hexdigest())
+        self.assertEqual(uploads.received_chunks(self.session), [])
+
+    def test_finalize_with_missing_chunks(self):
+        self.put(0)
+        with self.assertRaises(uploads.UploadError) as error:
+            uploads.finalize(self.session)
+        self.assertEqual(error.exception.status, 409)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'open')
+
+    def test_finalize_checks_the_whole_file(self):
+        self.session.sha256 = '0' * 64
+        self.session.save()
+        for index in range(3):
+            self.put(index)
+        with self.assertRaises(uploads.UploadError) as error:
+            uploads.finalize(self.session)
+        self.assertEqual(error.exception.status, 422)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'open')
+
+    def test_failed_registration_reopens_the_upload(self):
+        for index in range(3):
+            self.put(index)
+        with mock.patch.object(uploads, 'register_recording', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                uploads.finalize(self.session)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'open')
+        self.assertEqual(uploads.part_path(self.session).read_bytes(), self.data)
+        self.assertEqual(list((self.tmp / 'recordings').iterdir()), [])
+        uploads.finalize(self.session)
+
+    def test_chunk_racing_finalize_or_abort(self):
+        # The view read the session while it was still open
+        stale = type(self.session).objects.get(pk=self.session.pk)
+        uploads.abort(self.session)
+        with self.assertRaises(uploads.UploadError) as error:
+            uploads.write_chunk(stale, 0, io.BytesIO(self.chunk(0)), 1000, hashlib.sha256(self.chunk(0)).hexdigest())
+        self.assertEqual(error.exception.status, 409)
+
+    def test_chunk_received_during_finalize_is_not_written(self):
+        for index in range(3):
+            self.put(index)
+        finalized = []
+
+        class SlowBody(io.BytesIO):
+            # The session is finalized while this chunk is still being received
+            def read(body, size=-1):
+                if not finalized:
+                    finalized.append(uploads.finalize(self.session))
+                return super().read(size)
+
+        stale = type(self.session).objects.get(pk=self.session.pk)
+        with self.assertRaises(uploads.UploadError) as error:
+            uploads.write_chunk(stale, 0, SlowBody(bytes(1000)), 1000, hashlib.sha256(bytes(1000)).hexdigest())
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual((self.tmp / 'recordings' / finalized[0].filename).read_bytes(), self.data)
+        self.assertEqual(uploads.received_chunks(self.session), [])
+
+    def test_parallel_duplicate_chunk(self):
+        with mock.patch.object(uploads.UploadChunk.objects, 'update_or_create', side_effect=IntegrityError):
+            with self.assertRaises(uploads.UploadError) as error:
+                self.put(0)
+        self.assertEqual(error.exception.status, 409)
+
+
+class DetectionApiTests(TestCase):
+    """The routed /app/api/ endpoints serve the shared, hot-swappable registry model."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model_path = os.path.join(tmp.name, 'hand_landmarks.npz')
+        rng = np.random.RandomState(0)
+        NumpyModel(
+            [{'type': 'flatten', 'activation': None}, {'type': 'dense', 'activation': 'softmax'}],
+            {'layer1_kernel': rng.randn(63, 26).astype(np.float32), 'layer1_bias': np.zeros(26, np.float32)},
+            {'input_shape': [21, 3]},
+        ).save(self.model_path)
+        overrides = override_settings(MODEL_ARTIFACTS_DIR=tmp.name, MODEL_LOCAL_PATHS=[self.model_path])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Put back whatever this process was serving before the test
+        factory, entry = registry._factories['landmarks'], registry._entries.get('landmarks')
+        self.addCleanup(registry.register, 'landmarks', factory, registry._warmups['landmarks'])
+        self.addCleanup(lambda: registry._entries.update(landmarks=entry) if entry else
+                        registry._entries.pop('landmarks', None))
+        # Cached results are keyed on the version number, which repeats across tests
+        prediction_cache.clear()
+        self.addCleanup(prediction_cache.clear)
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        User.objects.create_user('user', password='pw')
+
+    def reload(self, model=None, username='staff'):
+        self.client.login(username=username, password='pw')
+        body = json.dumps({'model': model}) if model else ''
+        response = self.client.post('/app/api/reload-model/', body, content_type='application/json')
+        self.client.logout()
+        return response
+
+    def test_health_and_status_wait_for_the_lifecycle(self):
+        registry.swap('landmarks')
+        with mock.patch.object(model_lifecycle, 'start'):
+            for ready, status in ((False, 503), (True, 200)):
+                with mock.patch.object(model_lifecycle, 'is_ready', return_value=ready):
+                    for path in ('/app/api/health/', '/app/model-status/'):
+                        response = self.client.get(path)
+                        self.assertEqual(response.status_code, status, path)
+                        self.assertEqual(response.json()['status'] in ('healthy', 'ready'), ready, path)
+
+    def test_reload_requires_staff(self):
+        self.assertEqual(self.reload('hand_landmarks.npz', username='user').status_code, 403)
+
+    def test_reload_then_detect(self):
+        response = self.reload('hand_landmarks.npz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], registry.version('landmarks'))
+        landmarks = [{'x': 0.1 * i, 'y': 0.5, 'z': 0.0} for i in range(21)]
+        response = self.client.post('/app/api/detect-sign/', json.dumps({'landmarks': landmarks}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['method'], 'landmarks')
+        info = self.client.get('/app/api/model-info/').json()
+        self.assertEqual(info['model_info']['model_path'], self.model_path)
+        self.assertFalse(info['model_info']['is_fallback'])
+
+    def test_bad_reload_keeps_serving(self):
+        version = int(self.reload().json()['version'])
+        for model in ('missing.npz', '../hand_landmarks.npz'):
+            self.assertEqual(self.reload(model).status_code, 400)
+        self.assertEqual(registry.version('landmarks'), version)
+        # The failed factory was not kept: a plain reload still works
+        self.assertEqual(self.reload().json()['version'], version + 1)
+
+    def test_overloaded_batcher_answers_503(self):
+        landmarks = [{'x': 0.0, 'y': 0.0, 'z': 0.0}] * 21
+        with mock.patch.object(landmark_batcher, 'submit_async', side_effect=BatcherOverloaded('queue is full')):
+            response = self.client.post('/app/api/detect-sign/', json.dumps({'landmarks': landmarks}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('rejected', self.client.get('/app/api/batching-stats/').json()['batching'])
+
+    def test_binary_frames_are_batched_by_the_registry_model(self):
+        registry.swap('landmarks')
+        frames = np.random.RandomState(2).rand(3, 21, 3).astype(np.float32)
+        expected = registry.get('landmarks').predict_batch(frames)
+        with mock.patch.object(landmark_batcher, 'submit_async', wraps=landmark_batcher.submit_async) as submit:
+            response = self.client.post('/app/api/detect-sign/', encode_landmarks(frames),
+                                        content_type=BINARY_CONTENT_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(submit.call_count, 3)
+        self.assertEqual(response.json()['frames'], 3)
+        self.assertEqual([r['letter'] for r in response.json()['results']], [r['letter'] for r in expected])
+
+    def detect_hand(self):
+        """Stand-in for MediaPipe: one hand, and the calls it got."""
+        hand = SimpleNamespace(landmark=[SimpleNamespace(x=0.1 * i, y=0.5, z=0.0) for i in range(21)])
+        return mock.patch.object(hands_pool, 'process',
+                                 return_value=SimpleNamespace(multi_hand_landmarks=[hand]))
+
+    @override_settings(IMAGE_MAX_SIDE=320)
+    def test_image_is_decoded_once_to_rgb_at_most_max_side(self):
+        registry.swap('landmarks')
+        bgr = np.zeros((720, 1280, 3), np.uint8)
+        bgr[..., 0] = 255  # blue
+        body = cv2.imencode('.png', bgr)[1].tobytes()
+        with self.detect_hand() as process:
+            response = self.client.post('/app/api/detect-sign/', body, content_type='image/png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['method'], 'landmarks_from_image')
+        image = process.call_args[0][0]
+        self.assertEqual(image.shape, (180, 320, 3))
+        np.testing.assert_array_equal(image[0, 0], [0, 0, 255])
+        with self.detect_hand():
+            response = self.client.post('/app/api/extract-landmarks/', b'not an image', content_type='image/png')
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_id_selects_a_tracking_session(self):
+        registry.swap('landmarks')
+        body = cv2.imencode('.png', np.zeros((48, 64, 3), np.uint8))[1].tobytes()
+        with self.detect_hand() as process:
+            self.client.post('/app/api/detect-sign/', body, content_type='image/png', HTTP_X_STREAM_ID='cam-1')
+            self.client.post('/app/api/extract-landmarks/?stream=cam-1', body, content_type='image/png')
+            self.client.post('/app/api/extract-landmarks/', body, content_type='image/png')
+        self.assertEqual([call.kwargs['session'] for call in process.call_args_list],
+                         ['127.0.0.1:cam-1', '127.0.0.1:cam-1', None])
+
+    def test_repeated_hand_shape_is_served_from_the_cache(self):
+        registry.swap('landmarks')
+        body = json.dumps({'landmarks': [{'x': 0.03 * i, 'y': 0.2, 'z': 0.0} for i in range(21)]})
+        hits = prediction_cache.stats()['hits']
+        first = self.client.post('/app/api/detect-sign/', body, content_type='application/json').json()
+        with mock.patch.object(landmark_batcher, '_queue') as queue:
+            second = self.client.post('/app/api/detect-sign/', body, content_type='application/json').json()
+        queue.put_nowait.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(prediction_cache.stats()['hits'], hits + 1)
+        self.assertIn('prediction_cache', self.client.get('/app/api/health/').json())
+
+
+class RecordingUrlTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        overrides = override_settings(RECORDINGS_DIR=self.directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_wav_url_keeps_working_after_transcoding(self):
+        (self.directory / 'take.wav').write_bytes(b'RIFF')
+        recording = Recording.objects.create(filename='take.wav', size=4)
+        url = recording_info(recording)['url']
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # What TranscodeQueue.transcode does once the compressed file is written
+        (self.directory / 'take.opus').write_bytes(b'OggS')
+        Recording.objects.filter(pk=recording.pk).update(filename='take.opus', original_filename='take.wav')
+        (self.directory / 'take.wav').unlink()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'OggS')
+        self.assertEqual(Recording.objects.get().url, '/app/api/audio/take.opus')
+
+
+class JobViewTests(TestCase):
+    """Training and export replace the served model: staff only, never cross-site."""
+
+    def setUp(self):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        User.objects.create_user('user', password='pw')
+        self.client = Client(enforce_csrf_checks=True)
+
+    def post(self, path, username='staff', csrf=True):
+        self.client.login(username=username, password='pw')
+        headers = {}
+        if csrf:
+            self.client.cookies[settings.CSRF_COOKIE_NAME] = headers['HTTP_X_CSRFTOKEN'] = 'a' * 32
+        return self.client.post(path, '{}', content_type='application/json', **headers)
+
+    def test_state_changing_job_views_require_csrf(self):
+        for path in ('/app/train/', '/app/export/', '/app/api/jobs/1/cancel/'):
+            self.assertEqual(self.post(path, csrf=False).status_code, 403, path)
+
+    def test_jobs_are_staff_only(self):
+        with mock.patch.object(job_runner, 'submit') as submit:
+            response = self.post('/app/train/', username='user')
+            self.assertEqual(response.json()['error'], 'Staff access required')
+            submit.assert_not_called()
+            submit.return_value = Job.objects.create(kind='train', params={})
+            self.assertEqual(self.post('/app/train/').status_code, 202)
@@ -0,0 +1,147 @@
+"""
+Streaming training of the action LSTM from a packed ``SequenceDataset``.
+
+Instead of materialising every (30, 1662) sequence as one big array, the
+training indices are split into shards of ``shard_size`` sequences (sorted,
+so each shard is a near-contiguous read of the memory-mapped data file).
+Every epoch the shard order is shuffled, shards are read by parallel
+``tf.data`` workers, their sequences are mixed in a ``shuffle_buffer`` and
+augmented in parallel, and batches are prefetched while the model trains.
+Only the shards being read, the shuffle buffer and the prefetched batches
+are held in memory, whatever the size of the dataset.
+
+Training stops early once the validation loss has not improved for
+``patience`` epochs, and the best weights so far are checkpointed after
+every improvement.
+
+TensorFlow is imported inside the functions so that importing this module
+(and the Django app) stays cheap.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+from .dataset import SequenceDataset
+
+logger = logging.getLogger(__name__)
+
+
+def split_indices(labels, validation_split=0.05, seed=0):
+    """Shuffle the labelled indices (label >= 0) into sorted (train, validation) arrays."""
+    indices = np.flatnonzero(labels >= 0)
+    rng = np.random.default_rng(seed)
+    rng.shuffle(indices)
+    count = int(round(len(indices) * validation_split))
+    if validation_split > 0 and len(indices) > 1:
+        count = max(1, count)
+    return np.sort(indices[count:]), np.sort(indices[:count])
+
+
+def make_tf_dataset(dataset, indices, labels, num_classes, batch_size=32, shard_size=64,
+                    shuffle_buffer=256, shuffle=True, noise=0.0, seed=None):
+    """``tf.data.Dataset`` of (sequences, one-hot labels) batches streamed from ``dataset``."""
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+    sequences = dataset.sequences
+    indices = np.asarray(indices, dtype=np.int64)
+    shards = [indices[start:start + shard_size] for start in range(0, len(indices), shard_size)]
+    shard_ids = tf.data.Dataset.range(len(shards))
+    if shuffle:
+        shard_ids = shard_ids.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+
+    def read_shard(shard_id):
+        shard = shards[int(shard_id)]
+        # Fancy indexing a memmap copies just these rows
+        return np.asarray(sequences[shard]), labels[shard]
+
+    def load(shard_id):
+        x, y = tf.numpy_function(read_shard, [shard_id], (tf.float32, tf.int64))
+        x = tf.ensure_shape(x, (None, dataset.sequence_length, dataset.feature_size))
+        return tf.data.Dataset.from_tensor_slices((x, tf.ensure_shape(y, (None,))))
+
+    stream = shard_ids.interleave(
+        load, cycle_length=autotune, num_parallel_calls=autotune, deterministic=not shuffle,
+    )
+    if shuffle:
+        stream = stream.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    def prepare(x, y):
+        if noise > 0:
+            # Jitter the detected keypoints only; missing parts stay zero
+            x = x + tf.random.normal(tf.shape(x), stddev=noise) * tf.cast(x != 0, x.dtype)
+        return x, tf.one_hot(y, num_classes, dtype=tf.float32)
+
+    batches = -(-len(indices) // batch_size)
+    return (stream
+            .map(prepare, num_parallel_calls=autotune, deterministic=not shuffle)
+            .batch(batch_size)
+            # Not inferable through numpy_function; Keras uses it for progress and epoch ends
+            .apply(tf.data.experimental.assert_cardinality(batches))
+            .prefetch(autotune))
+
+
+def build_model(num_classes, sequence_length=30, feature_size=1662):
+    """The action recognition LSTM of ``sign_language_detection.py``."""
+    from tensorflow.keras.layers import LSTM, Dense, Input
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Input(shape=(sequence_length, feature_size)),
+        LSTM(64, return_sequences=True, activation='relu'),
+        LSTM(128, return_sequences=True, activation='relu'),
+        LSTM(64, return_sequences=False, activation='relu'),
+        Dense(64, activation='relu'),
+        Dense(32, activation='relu'),
+        Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def train(dataset_path, output_path, actions=None, model=None, epochs=200, batch_size=32,
+          shard_size=64, shuffle_buffer=256, validation_split=0.05, patience=20, noise=0.0,
+          log_dir=None, seed=0, verbose=1, callbacks=None):
+    """Train on the packed dataset at ``dataset_path`` and save the best model to ``output_path``.
+
+    ``actions`` fixes the class order (all actions of the dataset by default),
+    and ``callbacks`` are extra Keras callbacks (e.g. progress reporting).
+    Returns (model, history).
+    """
+    import tensorflow as tf
+
+    dataset = SequenceDataset.open(dataset_path)
+    actions = list(actions) if actions is not None else dataset.actions
+    labels = dataset.labels_for(actions)
+    train_idx, val_idx = split_indices(labels, validation_split, seed)
+    if len(train_idx) == 0:
+        raise ValueError(f'No sequences of actions {actions} in {dataset_path}')
+
+    options = dict(batch_size=batch_size, shard_size=shard_size, shuffle_buffer=shuffle_buffer)
+    train_data = make_tf_dataset(dataset, train_idx, labels, len(actions), noise=noise, seed=seed, **options)
+    val_data = None
+    if len(val_idx):
+        val_data = make_tf_dataset(dataset, val_idx, labels, len(actions), shuffle=False, **options)
+    monitor = 'val_loss' if val_data is not None else 'loss'
+
+    if model is None:
+        model = build_model(len(actions), dataset.sequence_length, dataset.feature_size)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=patience, restore_best_weights=True),
+        tf.keras.callbacks.ModelCheckpoint(output_path, monitor=monitor, save_best_only=True),
+    ] + list(callbacks or [])
+    if log_dir:
+        callbacks.append(tf.keras.callbacks.TensorBoard(log_dir=log_dir))
+
+    logger.info(f"Training on {len(train_idx)} sequences ({len(val_idx)} for validation) of {actions}, "
+                f"{dataset.feature_size} {dataset.features or 'raw keypoint'} values per frame")
+    # Shuffling is done by the input pipeline
+    history = model.fit(train_data, validation_data=val_data, epochs=epochs, callbacks=callbacks,
+                        shuffle=False, verbose=verbose)
+    # The checkpoint holds the best epoch, which may not be the last one
+    model.load_weights(output_path)
+    return model, history
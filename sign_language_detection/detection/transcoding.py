@@ -0,0 +1,215 @@
+"""
+Background transcoding of recordings.
+
+Uploaded recordings arrive as uncompressed WAV (the desktop recorders write
+44.1 kHz stereo int16). Each new recording is queued on a small thread pool
+that downmixes it to mono, resamples it to a speech rate, encodes it with
+Opus (through libsndfile, or ffmpeg if that is what is available) or FLAC,
+and computes a waveform peak summary for the UI. The result replaces the WAV
+in the recording index; the upload request itself only queues the job.
+
+soundfile and scipy are optional: without them recordings are kept as WAV
+and marked as skipped.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from math import gcd
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Recording
+
+logger = logging.getLogger(__name__)
+
+CODEC_EXTENSIONS = {'opus': '.opus', 'flac': '.flac'}
+CONTENT_TYPES = {'.wav': 'audio/wav', '.flac': 'audio/flac', '.opus': 'audio/ogg'}
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def content_type_for(filename):
+    return CONTENT_TYPES.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+
+
+def opus_backend():
+    """'soundfile' or 'ffmpeg' if Opus can be written locally, else None."""
+    try:
+        import soundfile as sf
+        if 'OPUS' in sf.available_subtypes('OGG'):
+            return 'soundfile'
+    except (ImportError, OSError):
+        pass
+    return 'ffmpeg' if shutil.which('ffmpeg') else None
+
+
+def choose_codec(preferred='auto'):
+    if preferred == 'auto':
+        return 'opus' if opus_backend() else 'flac'
+    if preferred not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown codec: {preferred}. Use auto, opus or flac")
+    return preferred
+
+
+def read_mono(path):
+    """Return (float32 mono samples, sample rate, original channel count)."""
+    import soundfile as sf
+
+    data, rate = sf.read(str(path), dtype='float32', always_2d=True)
+    return data.mean(axis=1, dtype=np.float32), rate, data.shape[1]
+
+
+def resample(samples, rate, target_rate):
+    if rate == target_rate:
+        return samples
+    from scipy.signal import resample_poly
+
+    factor = gcd(rate, target_rate)
+    return resample_poly(samples, target_rate // factor, rate // factor).astype(np.float32)
+
+
+def waveform_peaks(samples, count=200):
+    """Peak absolute amplitude of ``count`` equal slices of ``samples``."""
+    if len(samples) == 0:
+        return []
+    count = min(count, len(samples))
+    usable = len(samples) - len(samples) % count
+    peaks = np.abs(samples[:usable]).reshape(count, -1).max(axis=1)
+    return [round(float(p), 3) for p in np.clip(peaks, 0.0, 1.0)]
+
+
+def encode(samples, rate, path, codec, bitrate=24000):
+    if codec == 'flac':
+        import soundfile as sf
+        sf.write(str(path), samples, rate, format='FLAC', subtype='PCM_16')
+    elif opus_backend() == 'soundfile':
+        import soundfile as sf
+        sf.write(str(path), samples, rate, format='OGG', subtype='OPUS')
+    else:
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-f', 'f32le', '-ar', str(rate), '-ac', '1',
+             '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', str(bitrate), '-f', 'ogg', str(path)],
+            input=np.ascontiguousarray(samples, dtype='<f4').tobytes(), check=True, capture_output=True,
+        )
+
+
+def transcode_file(source, destination, codec='flac', sample_rate=16000, peak_count=200, bitrate=24000):
+    """Mono-downmix, resample and encode ``source`` into ``destination``; return its metadata."""
+    samples, rate, channels = read_mono(source)
+    # Never upsample, but Opus only takes a few fixed rates
+    target_rate = min(rate, sample_rate)
+    if codec == 'opus':
+        target_rate = next((r for r in OPUS_SAMPLE_RATES if r >= target_rate), OPUS_SAMPLE_RATES[-1])
+    samples = resample(samples, rate, target_rate)
+    encode(samples, target_rate, destination, codec, bitrate)
+    return {
+        'codec': codec,
+        'sample_rate': target_rate,
+        'channels': 1,
+        'source_channels': channels,
+        'duration': round(len(samples) / float(target_rate), 2),
+        'size': os.path.getsize(destination),
+        'peaks': waveform_peaks(samples, peak_count),
+    }
+
+
+class TranscodeQueue:
+    """Thread pool that transcodes pending recordings in the background."""
+
+    def __init__(self, workers=2, codec='auto', sample_rate=16000, peak_count=200, bitrate=24000,
+                 keep_original=False, enabled=True):
+        self.workers = workers
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.peak_count = peak_count
+        self.bitrate = bitrate
+        self.keep_original = keep_original
+        self.enabled = enabled
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, recording_id):
+        """Queue a recording; returns immediately. Returns the Future, or None if not queued."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if recording_id in self._in_flight:
+                return None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='transcode')
+            self._in_flight.add(recording_id)
+        return self._executor.submit(self._run, recording_id)
+
+    def submit_pending(self):
+        """Queue every recording still waiting to be transcoded (e.g. after a restart)."""
+        pending = Recording.objects.filter(transcode_status='pending').values_list('pk', flat=True)
+        return [future for future in map(self.submit, list(pending)) if future is not None]
+
+    def _run(self, recording_id):
+        close_old_connections()
+        try:
+            self.transcode(recording_id)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._in_flight.discard(recording_id)
+
+    def transcode(self, recording_id):
+        # Claim the row so no other worker or process transcodes it too
+        if not Recording.objects.filter(pk=recording_id, transcode_status='pending').update(transcode_status='running'):
+            return None
+        recording = Recording.objects.get(pk=recording_id)
+        directory = settings.RECORDINGS_DIR
+        source = directory / recording.filename
+        if source.suffix.lower() != '.wav':
+            Recording.objects.filter(pk=recording_id).update(transcode_status='skipped')
+            return None
+
+        partial = None
+        try:
+            codec = choose_codec(self.codec)
+            destination = source.with_suffix(CODEC_EXTENSIONS[codec])
+            # Not an audio extension, so the reconciler ignores it while it is written
+            partial = destination.with_name(destination.name + '.part')
+            result = transcode_file(source, partial, codec, self.sample_rate, self.peak_count, self.bitrate)
+            os.replace(partial, destination)
+            Recording.objects.filter(pk=recording_id).update(
+                filename=destination.name,
+                original_filename=recording.filename,
+                size=result['size'],
+                codec=codec,
+                sample_rate=result['sample_rate'],
+                channels=result['channels'],
+                peaks=result['peaks'],
+                transcode_status='done',
+                transcode_error='',
+            )
+            if not self.keep_original:
+                os.remove(source)
+            logger.info(f"Transcoded {recording.filename}: {recording.size} -> {result['size']} bytes ({codec})")
+            return result
+        except ImportError as e:
+            Recording.objects.filter(pk=recording_id).update(transcode_status='skipped', transcode_error=str(e))
+        except Exception as e:
+            logger.error(f"Transcoding {recording.filename} failed: {str(e)}")
+            Recording.objects.filter(pk=recording_id).update(transcode_status='failed', transcode_error=str(e))
+            if partial is not None and os.path.exists(partial):
+                os.remove(partial)
+        return None
+
+
+transcode_queue = TranscodeQueue(
+    workers=getattr(settings, 'RECORDINGS_TRANSCODE_WORKERS', 2),
+    codec=getattr(settings, 'RECORDINGS_TRANSCODE_CODEC', 'auto'),
+    sample_rate=getattr(settings, 'RECORDINGS_TRANSCODE_SAMPLE_RATE', 16000),
+    peak_count=getattr(settings, 'RECORDINGS_WAVEFORM_PEAKS', 200),
+    bitrate=getattr(settings, 'RECORDINGS_OPUS_BITRATE', 24000),
+    keep_original=getattr(settings, 'RECORDINGS_KEEP_ORIGINAL', False),
+    enabled=getattr(settings, 'RECORDINGS_TRANSCODE', True),
+)
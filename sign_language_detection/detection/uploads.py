@@ -0,0 +1,233 @@
+"""
+Chunked, resumable recording uploads.
+
+A client opens an ``UploadSession`` with the total size, PUTs the chunks
+(in any order, in parallel, and again after a dropped connection) and then
+finalizes the session. Each chunk is streamed from the request into a
+temporary file under ``settings.UPLOADS_DIR`` in ``BLOCK_SIZE`` reads and its
+SHA-256 is checked against the ``X-Chunk-Sha256`` header. Only then is it
+copied into its place in the preallocated ``.part`` file and recorded, in one
+transaction that first touches the session row while it is still open. That
+row lock is what finalize and abort take to change the status, so no chunk
+can land in the file once either has started. Finalizing renames the part
+file into ``settings.RECORDINGS_DIR``, which is atomic as long as both
+directories are on the same filesystem (both live under MEDIA_ROOT by
+default), and registers the recording.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import UploadChunk, UploadSession
+from .recordings import RECORDING_EXTENSIONS, register_recording
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A request the upload protocol cannot accept; ``status`` is the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def part_path(session):
+    return settings.UPLOADS_DIR / f'{session.id}.part'
+
+
+def create_session(user, size, filename='', chunk_size=None, sha256=''):
+    """Open an upload of ``size`` bytes and preallocate its part file."""
+    max_size = getattr(settings, 'UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+    max_chunk = getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 ** 2)
+    try:
+        size = int(size)
+        chunk_size = int(chunk_size or getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 ** 2))
+    except (TypeError, ValueError):
+        raise UploadError('size and chunk_size must be integers')
+    if not 0 < size <= max_size:
+        raise UploadError(f'size must be between 1 and {max_size} bytes', status=413 if size > 0 else 400)
+    if not 0 < chunk_size <= max_chunk:
+        raise UploadError(f'chunk_size must be between 1 and {max_chunk} bytes')
+    sha256 = (sha256 or '').lower()
+    if sha256 and len(sha256) != 64:
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+
+    session = UploadSession.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        filename=os.path.basename(filename or '')[:255],
+        size=size,
+        chunk_size=chunk_size,
+        sha256=sha256,
+    )
+    settings.UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(part_path(session), 'wb') as f:
+        # Sparse on most filesystems; chunks are written at their offsets
+        f.truncate(size)
+    return session
+
+
+def received_chunks(session):
+    return sorted(session.chunks.values_list('index', flat=True))
+
+
+def session_info(session):
+    """Response representation of an ``UploadSession``."""
+    received = received_chunks(session)
+    done = set(received)
+    return {
+        'id': str(session.id),
+        'status': session.status,
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'received': received,
+        'missing': [i for i in range(session.chunk_count) if i not in done],
+        'recording_id': session.recording_id,
+    }
+
+
+def write_chunk(session, index, stream, length, digest):
+    """Stream chunk ``index`` from ``stream`` into the part file and record it.
+
+    ``length`` is the request's Content-Length and ``digest`` the expected
+    hex SHA-256 of the chunk. Nothing is recorded if either does not match,
+    so the client can simply send the chunk again.
+    """
+    if session.status != 'open':
+        raise UploadError(f'Upload is {session.status}', status=409)
+    if not 0 <= index < session.chunk_count:
+        raise UploadError(f'Chunk index must be between 0 and {session.chunk_count - 1}', status=416)
+    if not digest:
+        raise UploadError('Missing X-Chunk-Sha256 header')
+
+    offset = index * session.chunk_size
+    expected = min(session.chunk_size, session.size - offset)
+    if length != expected:
+        raise UploadError(f'Chunk {index} must be {expected} bytes, got {length}')
+
+    hasher = hashlib.sha256()
+    written = 0
+    # Received outside the lock, so parallel chunks of one upload (and slow
+    # clients) only wait for each other during the local copy below
+    with tempfile.TemporaryFile(dir=settings.UPLOADS_DIR) as spool:
+        while written < expected:
+            block = stream.read(min(BLOCK_SIZE, expected - written))
+            if not block:
+                break
+            hasher.update(block)
+            spool.write(block)
+            written += len(block)
+
+        if written != expected:
+            raise UploadError(f'Chunk {index} ended after {written} of {expected} bytes')
+        if hasher.hexdigest() != digest.lower():
+            raise UploadError(f'Chunk {index} failed its SHA-256 check', status=422)
+
+        try:
+            with transaction.atomic():
+                # Locks the session row until the chunk is recorded; finalize
+                # and abort wait for it, and a chunk arriving after them is refused
+                if not UploadSession.objects.filter(pk=session.pk, status='open').update(updated_at=timezone.now()):
+                    raise UploadError('Upload is no longer open', status=409)
+                _copy_chunk(spool, part_path(session), offset)
+                UploadChunk.objects.update_or_create(
+                    session=session, index=index, defaults={'size': written, 'sha256': hasher.hexdigest()},
+                )
+        except IntegrityError:
+            # A parallel PUT of the same chunk recorded it first
+            raise UploadError(f'Chunk {index} is being written by another request', status=409)
+
+
+def _copy_chunk(spool, path, offset):
+    spool.seek(0)
+    try:
+        fd = os.open(path, os.O_WRONLY)
+    except FileNotFoundError:
+        raise UploadError('Upload is no longer open', status=409)
+    try:
+        # pwrite at absolute offsets, so chunks never share a file position
+        for block in iter(lambda: spool.read(BLOCK_SIZE), b''):
+            os.pwrite(fd, block, offset)
+            offset += len(block)
+    finally:
+        os.close(fd)
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def finalize(session):
+    """Move a fully received upload into the recordings directory; return its ``Recording``."""
+    # Claim the session so concurrent finalize calls cannot both rename it; this
+    # waits for chunks being copied in, and no chunk is written after it
+    if not UploadSession.objects.filter(pk=session.pk, status='open').update(status='finalizing'):
+        session.refresh_from_db()
+        raise UploadError(f'Upload is {session.status}', status=409)
+    try:
+        missing = session.chunk_count - session.chunks.count()
+        if missing:
+            raise UploadError(f'{missing} chunk(s) missing', status=409)
+        source = part_path(session)
+        if session.sha256 and _file_sha256(source) != session.sha256:
+            raise UploadError('Upload failed its SHA-256 check', status=422)
+
+        extension = os.path.splitext(session.filename)[1].lower()
+        if extension not in RECORDING_EXTENSIONS:
+            extension = '.wav'
+        destination = settings.RECORDINGS_DIR / f'upload_{session.id}{extension}'
+        os.replace(source, destination)
+        try:
+            recording = register_recording(destination, session.user, source='upload')
+        except Exception:
+            # Put the file back so the client can finalize again
+            os.replace(destination, source)
+            raise
+    except Exception:
+        UploadSession.objects.filter(pk=session.pk).update(status='open')
+        raise
+
+    session.status = 'complete'
+    session.recording = recording
+    session.save(update_fields=['status', 'recording', 'updated_at'])
+    session.chunks.all().delete()
+    return recording
+
+
+def abort(session):
+    if session.status == 'complete':
+        raise UploadError('Upload is already complete', status=409)
+    UploadSession.objects.filter(pk=session.pk).update(status='aborted', updated_at=timezone.now())
+    session.status = 'aborted'
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads(max_age=None):
+    """Abort uploads that have not received a chunk in ``max_age`` seconds; return how many."""
+    max_age = max_age if max_age is not None else getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 60 * 60)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stale = list(UploadSession.objects.filter(status='open', updated_at__lt=cutoff))
+    for session in stale:
+        abort(session)
+    # Finished sessions are only kept so clients can poll them for a while
+    UploadSession.objects.filter(status__in=['complete', 'aborted'], updated_at__lt=cutoff).delete()
+    if stale:
+        logger.info(f"Aborted {len(stale)} stale upload(s)")
+    return len(stale)
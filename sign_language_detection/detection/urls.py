@@ -3,7 +3,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth.decorators import login_required
 from . import views
-from . import api_views_simple
+from . import api_views
 
 # API endpoints
 api_patterns = [
@@ -12,13 +12,26 @@ api_patterns = [
     path('get_recordings/', views.get_recordings, name='get_recordings'),
     path('delete_recording/', views.delete_recording, name='delete_recording'),
     path('audio/<str:filename>', views.serve_audio, name='serve_audio'),
+    # Chunked, resumable uploads (see detection.uploads)
+    path('uploads/', views.upload_init, name='upload_init'),
+    path('uploads/<uuid:upload_id>/', views.upload_session, name='upload_session'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
+    # Background training and export jobs (see detection.jobs)
+    path('jobs/', views.jobs_list, name='jobs_list'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/cancel/', views.job_cancel, name='job_cancel'),
     path('model_info/', views.model_info, name='model_info'),
-    # New simplified API endpoints
-    path('health/', api_views_simple.health_check, name='api_health'),
-    path('model-info/', api_views_simple.model_info, name='api_model_info'),
-    path('detect-sign/', api_views_simple.DetectSignView.as_view(), name='api_detect_sign'),
-    path('extract-landmarks/', api_views_simple.extract_landmarks, name='api_extract_landmarks'),
-    path('gesture-classes/', api_views_simple.get_gesture_classes, name='api_gesture_classes'),
+    path('history/', views.history_api, name='api_history'),
+    path('history/export/', views.history_export, name='api_history_export'),
+    # Detection API, served by the shared model registry (see detection.model_registry)
+    path('health/', api_views.health_check, name='api_health'),
+    path('model-info/', api_views.model_info, name='api_model_info'),
+    path('detect-sign/', api_views.DetectSignView.as_view(), name='api_detect_sign'),
+    path('extract-landmarks/', api_views.extract_landmarks, name='api_extract_landmarks'),
+    path('gesture-classes/', api_views.get_gesture_classes, name='api_gesture_classes'),
+    path('batching-stats/', api_views.batching_stats, name='api_batching_stats'),
+    path('reload-model/', api_views.reload_model, name='api_reload_model'),
 ]
 
 # Main URL patterns
@@ -0,0 +1,193 @@
+"""
+Parallel keypoint extraction for offline video corpora.
+
+A reader thread decodes videos and cuts them into sequences of consecutive
+frames. Each sequence is processed by a worker process that owns its own
+MediaPipe Holistic instance, and the resulting (sequence_length, 1662)
+keypoints (or their ``frame_features``) are appended to a
+``SequenceDataset``. Every sequence is recorded
+with its source (``<video>#<index>``), so an interrupted run picks up where
+it stopped.
+"""
+
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .dataset import SequenceDataset
+from .features import FRAME_FEATURE_SIZE, frame_features
+from .keypoints import KEYPOINT_SIZE, KeypointExtractor
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+_holistic = None
+_extractor = KeypointExtractor()
+
+
+def _init_worker(min_detection_confidence, min_tracking_confidence):
+    # One Holistic graph per worker process, reused for every sequence. It runs
+    # in video mode: frames within a sequence are consecutive so tracking is
+    # used between them, and a sequence from another video simply makes the
+    # first frame fall back to full detection.
+    global _holistic
+    import mediapipe as mp
+    _holistic = mp.solutions.holistic.Holistic(
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+    )
+
+
+def _process_sequence(frames):
+    """Run Holistic over consecutive RGB frames and return their keypoints."""
+    start = time.process_time()
+    keypoints = np.empty((len(frames), KEYPOINT_SIZE), dtype=np.float32)
+    for i, frame in enumerate(frames):
+        _extractor.extract(_holistic.process(frame), out=keypoints[i])
+    return keypoints, time.process_time() - start
+
+
+def find_videos(directory, extensions=VIDEO_EXTENSIONS):
+    """Return (relative path, action) for every video under ``directory``.
+
+    The action is the name of the video's parent directory
+    (``<directory>/<action>/<clip>.mp4``).
+    """
+    videos = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                relative = os.path.relpath(os.path.join(dirpath, filename), directory)
+                action = os.path.basename(dirpath) if dirpath != directory else None
+                videos.append((relative.replace(os.sep, '/'), action))
+    return sorted(videos)
+
+
+def _read_sequences(directory, videos, dataset, sequence_length, stride, max_side, out_queue, stop):
+    """Reader thread: decode videos into (source, action, frames) sequences."""
+    import cv2
+
+    try:
+        for relative, action in videos:
+            if stop.is_set():
+                break
+            cap = cv2.VideoCapture(os.path.join(directory, relative))
+            frames, index, skipped = [], 0, 0
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                height, width = frame.shape[:2]
+                if max_side and max(height, width) > max_side:
+                    scale = max_side / float(max(height, width))
+                    frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+                if len(frames) == sequence_length:
+                    source = f'{relative}#{index}'
+                    if dataset.has_source(source):
+                        skipped += 1
+                    else:
+                        out_queue.put((source, action, np.stack(frames)))
+                    index += 1
+                    frames = frames[stride:] if stride < sequence_length else []
+            cap.release()
+            if skipped:
+                logger.info(f'{relative}: skipped {skipped} sequences already in the dataset')
+    finally:
+        out_queue.put(None)
+
+
+def extract_video_keypoints(directory, output_path, workers=None, sequence_length=30, stride=None,
+                            max_side=640, default_action=None, flush_every=32, progress=None,
+                            min_detection_confidence=0.5, min_tracking_confidence=0.5, features=None):
+    """Extract keypoints for every video under ``directory`` into the dataset at ``output_path``.
+
+    ``stride`` is the number of frames between the starts of consecutive
+    sequences (defaults to ``sequence_length``, i.e. no overlap). With
+    ``features=FRAME_FEATURES`` the keypoints are stored as frame features.
+    Returns a dict with throughput statistics.
+    """
+    workers = workers or os.cpu_count() or 1
+    stride = stride or sequence_length
+    feature_size = FRAME_FEATURE_SIZE if features else KEYPOINT_SIZE
+    dataset = SequenceDataset.create(output_path, sequence_length, feature_size, features=features)
+
+    videos = []
+    for relative, action in find_videos(directory):
+        action = action or default_action
+        if action is None:
+            logger.warning(f'Skipping {relative}: no action directory and no default action')
+            continue
+        videos.append((relative, action))
+
+    # Bounded so the reader cannot run far ahead of the workers
+    sequences = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_read_sequences,
+        args=(directory, videos, dataset, sequence_length, stride, max_side, sequences, stop),
+        daemon=True,
+    )
+
+    pending = {}
+    buffered = {}
+    stats = {'videos': len(videos), 'sequences': 0, 'frames': 0, 'worker_cpu_s': 0.0, 'workers': workers}
+
+    def flush(action=None):
+        for name in ([action] if action else list(buffered)):
+            rows = buffered.pop(name, None)
+            if rows:
+                sequences = np.stack([r[1] for r in rows])
+                if features:
+                    sequences = frame_features(sequences)
+                dataset.append(sequences, name, [r[0] for r in rows])
+
+    def collect(done):
+        for future in done:
+            source, action = pending.pop(future)
+            keypoints, cpu_time = future.result()
+            buffered.setdefault(action, []).append((source, keypoints))
+            stats['sequences'] += 1
+            stats['frames'] += len(keypoints)
+            stats['worker_cpu_s'] += cpu_time
+            if len(buffered[action]) >= flush_every:
+                flush(action)
+            if progress:
+                progress(stats, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    reader.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(min_detection_confidence, min_tracking_confidence)) as pool:
+            while True:
+                item = sequences.get()
+                if item is None:
+                    break
+                source, action, frames = item
+                pending[pool.submit(_process_sequence, frames)] = (source, action)
+                # Keep at most two sequences in flight per worker
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(list(pending))
+    finally:
+        stop.set()
+        # Whatever finished is kept, so a re-run resumes from here
+        flush()
+        reader.join(timeout=5)
+
+    elapsed = time.perf_counter() - start
+    stats['elapsed_s'] = elapsed
+    stats['fps'] = stats['frames'] / elapsed if elapsed else 0.0
+    stats['fps_per_core'] = stats['fps'] / workers
+    stats['worker_fps'] = stats['frames'] / stats['worker_cpu_s'] if stats['worker_cpu_s'] else 0.0
+    stats['dataset_size'] = len(dataset)
+    return stats
@@ -1,9 +1,10 @@
-from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse, HttpResponseNotFound
+from django.shortcuts import get_object_or_404, render, redirect
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotFound, StreamingHttpResponse
 import numpy as np
 import json
+import logging
 import sounddevice as sd
-import wave
 import time
 import os
 from django.views.decorators.csrf import csrf_exempt
@@ -14,61 +15,49 @@ from django.views.decorators.http import require_http_methods
 import base64
 import cv2
 from .model_loader_simple import sign_language_model
-import threading
-import traceback
 import uuid
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from .models import DetectionHistory, UserAnalytics, UserSettings
+from .models import Job, Recording, UploadSession, UserAnalytics, UserSettings
+from .recordings import recording_info, recording_reconciler, register_recording
+from .analytics import daily_confidence, top_gestures
+from .history import filter_history, iter_csv, iter_ndjson, page_size, paginate, serialize as serialize_detection
+from .wire import decode_landmarks, is_binary_request
+from .file_serving import serve_file
+from .transcoding import content_type_for
+from . import uploads
+from .jobs import job_info, job_runner
+from .lifecycle import model_lifecycle
+from .model_registry import registry
 # Commented out TensorFlow-based model import to avoid import error
 # from .model import SignLanguageModel
-from django.db.models import Count, Avg
+from django.db.models import Q
 
-# Initialize model in a separate thread to avoid blocking the server
-def initialize_model():
-    try:
-        sign_language_model.load_model()
-        print("Model initialization complete")
-    except Exception as e:
-        print(f"Error initializing model: {str(e)}")
-        print(traceback.format_exc())
-
-# Start model initialization in background
-threading.Thread(target=initialize_model).start()
+logger = logging.getLogger(__name__)
 
 # Use the simplified model instead of TensorFlow-based model
 # model = SignLanguageModel()
 
-def get_audio_duration(filepath):
-    """Get the duration of a WAV file in seconds."""
-    try:
-        with wave.open(filepath, "rb") as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            duration = frames / float(rate)
-            return round(duration, 2)
-    except Exception as e:
-        print(f"Error getting duration for {filepath}: {e}")
-        return 0
+RECORDINGS_PAGE_SIZE = 50
+RECORDINGS_MAX_PAGE_SIZE = 200
 
-def get_recording_info(filepath):
-    """Get information about a recording file."""
+def recordings_page(request):
+    """The requested page of the recording index, newest first."""
+    recording_reconciler.ensure_running()
     try:
-        filename = os.path.basename(filepath)
-        duration = get_audio_duration(filepath)
-        timestamp = filename.split('_')[1].split('.')[0]
-        return {
-            'filename': filename,
-            'duration': duration,
-            'timestamp': timestamp,
-            'url': f'/media/recordings/{filename}',
-            'filepath': str(filepath),
-            'exists': os.path.exists(filepath),
-            'size': os.path.getsize(filepath)
-        }
-    except Exception as e:
-        print(f"Error getting info for {filepath}: {e}")
-        return None
+        per_page = min(max(int(request.GET.get('page_size', RECORDINGS_PAGE_SIZE)), 1), RECORDINGS_MAX_PAGE_SIZE)
+    except ValueError:
+        per_page = RECORDINGS_PAGE_SIZE
+    return Paginator(Recording.objects.all(), per_page).get_page(request.GET.get('page'))
+
+def recordings_payload(page):
+    return {
+        'recordings': [recording_info(recording) for recording in page],
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'total': page.paginator.count,
+        'has_next': page.has_next(),
+    }
 
 @csrf_exempt
 def record_audio(request):
@@ -100,17 +89,12 @@ def record_audio(request):
                     "error": f"Error saving audio file: {str(e)}"
                 }, status=500)
 
-            # Get recording info
-            recording_info = get_recording_info(filepath)
-            if not recording_info:
-                return JsonResponse({
-                    "success": False,
-                    "error": "Failed to process recording"
-                }, status=500)
+            # Index the recording so listings do not have to read the file
+            recording = register_recording(filepath, request.user, source='record')
 
             return JsonResponse({
                 "success": True,
-                "recording": recording_info
+                "recording": recording_info(recording)
             })
 
         except Exception as e:
@@ -124,77 +108,125 @@ def record_audio(request):
         "error": "Invalid request method"
     }, status=405)
 
+def _get_upload(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    # Anonymous uploads are reachable by id only; others only by their owner
+    if session.user_id is not None and session.user_id != request.user.id:
+        raise Http404("Upload not found")
+    return session
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_init(request):
+    """Open a chunked upload: JSON {size, filename?, chunk_size?, sha256?}"""
+    try:
+        data = json.loads(request.body or b'{}')
+        session = uploads.create_session(
+            request.user, data.get('size'), filename=data.get('filename', ''),
+            chunk_size=data.get('chunk_size'), sha256=data.get('sha256', ''),
+        )
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'upload': uploads.session_info(session)}, status=201)
+
+@csrf_exempt
+@require_http_methods(["GET", "DELETE"])
+def upload_session(request, upload_id):
+    """Upload progress (received and missing chunks), or abort it with DELETE"""
+    session = _get_upload(request, upload_id)
+    if request.method == 'DELETE':
+        try:
+            uploads.abort(session)
+        except uploads.UploadError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'upload': uploads.session_info(session)})
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def upload_chunk(request, upload_id, index):
+    """Write one chunk; the raw request body is streamed to disk, never read whole"""
+    session = _get_upload(request, upload_id)
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        uploads.write_chunk(session, index, request, length, request.META.get('HTTP_X_CHUNK_SHA256', ''))
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({'index': index, 'received': True})
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_complete(request, upload_id):
+    """Finalize a chunked upload into a recording"""
+    session = _get_upload(request, upload_id)
+    try:
+        recording = uploads.finalize(session)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e), 'upload': uploads.session_info(session)}, status=e.status)
+    return JsonResponse({'success': True, 'recording': recording_info(recording)})
+
 @csrf_exempt
 def get_recordings(request):
     try:
-        recordings_dir = settings.RECORDINGS_DIR
-        print(f"Looking for recordings in: {recordings_dir}")
-        
-        if not recordings_dir.exists():
-            print(f"Creating recordings directory: {recordings_dir}")
-            recordings_dir.mkdir(parents=True, exist_ok=True)
-        
-        recordings = []
-        for filepath in recordings_dir.glob("*.wav"):
-            recording_info = get_recording_info(filepath)
-            if recording_info:
-                recordings.append(recording_info)
-        
-        # Sort recordings by timestamp (newest first)
-        recordings.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        response_data = {
+        page = recordings_page(request)
+        payload = recordings_payload(page)
+        return JsonResponse({
             'success': True,
-            'recordings': recordings,
-            'message': f"Found {len(recordings)} recordings" if recordings else "No recordings found",
-            'debug_info': {
-                'directory': str(recordings_dir),
-                'wav_count': len(recordings)
-            }
-        }
-        
-        print(f"Response data: {response_data}")
-        return JsonResponse(response_data)
+            **payload,
+            'message': f"Found {payload['total']} recordings" if payload['total'] else "No recordings found",
+        })
         
     except Exception as e:
         error_msg = str(e)
-        print(f"Error in get_recordings: {error_msg}")
+        logger.error(f"Error in get_recordings: {error_msg}")
         return JsonResponse({
             'success': False,
             'error': error_msg,
-            'recordings': [],
-            'debug_info': {
-                'error_type': type(e).__name__,
-                'error_msg': error_msg,
-                'recordings_dir': str(settings.RECORDINGS_DIR)
-            }
+            'recordings': []
         })
 
 @csrf_exempt
-def delete_recording(request):
+def delete_recording(request, recording_id=None):
     """
-    Handle deleting audio recordings
+    Handle deleting audio recordings, by filename (JSON body) or by id (URL)
     """
     if request.method == 'POST':
         try:
-            # Parse the JSON data from the request
-            data = json.loads(request.body)
-            
-            # Get the filename from the data
-            filename = data.get('filename')
+            if recording_id is not None:
+                recording = Recording.objects.filter(pk=recording_id).first()
+                if recording is None:
+                    return JsonResponse({"success": False, "error": "Recording not found"})
+                filename = recording.filename
+            else:
+                # Parse the JSON data from the request
+                data = json.loads(request.body)
+                
+                # Get the filename from the data
+                filename = data.get('filename')
             
             if not filename:
                 return JsonResponse({"success": False, "error": "No filename provided"})
             
-            # Define the file path
+            # Define the file path (basename only, so it cannot leave the directory)
+            filename = os.path.basename(filename)
+            # A transcoded recording may still be referred to by its WAV name
+            recordings = Recording.objects.filter(Q(filename=filename) | Q(original_filename=filename))
+            recording = recordings.first()
+            if recording is not None:
+                filename = recording.filename
             file_path = settings.RECORDINGS_DIR / filename
             
             # Check if the file exists
             if not file_path.exists():
+                recordings.delete()
                 return JsonResponse({"success": False, "error": "File not found"})
             
-            # Delete the file
+            # Delete the file (and a kept original) and its index entry
             file_path.unlink()
+            if recording is not None and recording.original_filename:
+                (settings.RECORDINGS_DIR / recording.original_filename).unlink(missing_ok=True)
+            recordings.delete()
             
             # Return success response
             return JsonResponse({"success": True})
@@ -207,14 +239,24 @@ def delete_recording(request):
 @csrf_exempt
 def serve_audio(request, filename):
     try:
+        # basename only, so the name cannot point outside the recordings directory
+        filename = os.path.basename(filename)
         filepath = settings.RECORDINGS_DIR / filename
         if not filepath.exists():
-            return HttpResponseNotFound("Audio file not found")
-            
-        with open(filepath, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='audio/wav')
-            response['Content-Disposition'] = f'inline; filename="{filename}"'
-            return response
+            # Links to a recording made before it was transcoded use the WAV name
+            recording = Recording.objects.filter(original_filename=filename).first()
+            if recording is None:
+                return HttpResponseNotFound("Audio file not found")
+            filename = recording.filename
+            filepath = settings.RECORDINGS_DIR / filename
+            if not filepath.exists():
+                return HttpResponseNotFound("Audio file not found")
+        
+        # Streamed from disk with Range and conditional GET support
+        return serve_file(
+            request, filepath, content_type=content_type_for(filename), filename=filename,
+            max_age=getattr(settings, 'RECORDINGS_CACHE_MAX_AGE', 0),
+        )
     except Exception as e:
         return HttpResponse(str(e), status=500)
 
@@ -231,8 +273,24 @@ def predict(request):
     if request.method == 'POST':
         try:
             # Parse landmarks from request
-            data = json.loads(request.body)
-            landmarks = data.get('landmarks', [])
+            if is_binary_request(request):
+                try:
+                    frames = decode_landmarks(request.body)
+                except ValueError as e:
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                if len(frames) > 1:
+                    results = [sign_language_model.predict(frame) for frame in frames]
+                    return JsonResponse({
+                        'predictions': [
+                            {'prediction': r.get('letter', '?'), 'confidence': float(r.get('confidence', 0.0))}
+                            for r in results
+                        ],
+                        'model_info': results[-1].get('model_type', 'Simplified Model')
+                    })
+                landmarks = frames[0]
+            else:
+                data = json.loads(request.body)
+                landmarks = data.get('landmarks', [])
             
             # Make prediction using the simplified model
             result = sign_language_model.predict(landmarks)
@@ -296,7 +354,7 @@ def save_audio(request):
             filename = f"{uuid.uuid4()}.wav"
             
             # Define the directory to save recordings
-            recordings_dir = os.path.join(settings.MEDIA_ROOT, 'recordings')
+            recordings_dir = settings.RECORDINGS_DIR
             
             # Create the directory if it doesn't exist
             if not os.path.exists(recordings_dir):
@@ -309,14 +367,12 @@ def save_audio(request):
             with open(file_path, 'wb+') as destination:
                 for chunk in audio_file.chunks():
                     destination.write(chunk)
+            recording = register_recording(file_path, request.user, source='save')
             
             # Return success response with the file info
             return JsonResponse({
                 "success": True,
-                "recording": {
-                    "filename": filename,
-                    "url": f"/media/recordings/{filename}"
-                }
+                "recording": recording_info(recording)
             })
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)})
@@ -326,63 +382,85 @@ def save_audio(request):
 
 def fetch_recordings(request):
     """
-    Fetch all recordings for a user
+    Fetch a page of recordings, newest first
     """
-    recordings_dir = os.path.join(settings.MEDIA_ROOT, 'recordings')
-    
-    # Create the directory if it doesn't exist
-    if not os.path.exists(recordings_dir):
-        os.makedirs(recordings_dir)
-    
-    recordings = []
-    
-    # Get all files in the recordings directory
-    for filename in os.listdir(recordings_dir):
-        if filename.endswith('.wav'):
-            file_path = os.path.join(recordings_dir, filename)
-            
-            # Get file creation time
-            creation_time = os.path.getctime(file_path)
-            created_date = datetime.fromtimestamp(creation_time)
-            
-            recordings.append({
-                "filename": filename,
-                "url": f"/media/recordings/{filename}",
-                "created": created_date.strftime("%Y-%m-%d %H:%M:%S")
-            })
-    
-    # Sort recordings by creation time (newest first)
-    recordings.sort(key=lambda x: x["created"], reverse=True)
-    
-    return JsonResponse({"success": True, "recordings": recordings})
+    return JsonResponse({"success": True, **recordings_payload(recordings_page(request))})
 
 @login_required
 def analytics_view(request):
     user_analytics, created = UserAnalytics.objects.get_or_create(user=request.user)
     
-    # Get detection statistics
-    detection_history = DetectionHistory.objects.filter(user=request.user)
-    total_detections = detection_history.count()
-    
-    # Calculate most common gestures
-    common_gestures = detection_history.values('gesture').annotate(
-        count=Count('gesture')).order_by('-count')[:5]
-    
-    # Calculate accuracy over time
-    accuracy_data = list(detection_history.values('timestamp', 'confidence'))
-    
+    # Everything comes from the incrementally maintained aggregates, so the
+    # page costs the same however many detections the user has
     context = {
         'user_analytics': user_analytics,
-        'total_detections': total_detections,
-        'common_gestures': common_gestures,
-        'accuracy_data': json.dumps(accuracy_data),
+        'total_detections': user_analytics.total_detections,
+        'common_gestures': json.dumps(top_gestures(request.user)),
+        'accuracy_data': json.dumps(daily_confidence(request.user)),
     }
     return render(request, 'detection/analytics.html', context)
 
 @login_required
 def history_view(request):
-    history = DetectionHistory.objects.filter(user=request.user)
-    return render(request, 'detection/history.html', {'history': history})
+    try:
+        history, next_cursor = paginate(
+            filter_history(request.user, request.GET),
+            request.GET.get('cursor'), page_size(request.GET.get('limit')),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    # Keep the current filters when following the next-page link
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    filters = params.urlencode()
+    next_url = None
+    if next_cursor:
+        params['cursor'] = next_cursor
+        next_url = '?' + params.urlencode()
+
+    return render(request, 'detection/history.html', {
+        'history': history,
+        'next_url': next_url,
+        'first_url': '?' + filters if request.GET.get('cursor') else None,
+        'filters': filters,
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def history_api(request):
+    """One page of the user's detection history as JSON, newest first."""
+    try:
+        history, next_cursor = paginate(
+            filter_history(request.user, request.GET),
+            request.GET.get('cursor'), page_size(request.GET.get('limit')),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'results': [serialize_detection(detection) for detection in history],
+        'next_cursor': next_cursor,
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def history_export(request):
+    """Stream the user's (filtered) detection history as CSV or NDJSON."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return JsonResponse({'error': 'Invalid format. Use csv or ndjson.'}, status=400)
+    try:
+        history = filter_history(request.user, request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if export_format == 'csv':
+        response = StreamingHttpResponse(iter_csv(history), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(iter_ndjson(history), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="detection_history.{export_format}"'
+    return response
 
 @login_required
 def settings_view(request):
@@ -458,7 +536,7 @@ def upload_recording(request):
             
             audio_file = request.FILES['audio']
             filename = f"upload_{uuid.uuid4()}.wav"
-            recordings_dir = os.path.join(settings.MEDIA_ROOT, 'recordings')
+            recordings_dir = settings.RECORDINGS_DIR
             
             if not os.path.exists(recordings_dir):
                 os.makedirs(recordings_dir)
@@ -468,82 +546,108 @@ def upload_recording(request):
             with open(file_path, 'wb+') as destination:
                 for chunk in audio_file.chunks():
                     destination.write(chunk)
+            recording = register_recording(file_path, request.user, source='upload')
             
             return JsonResponse({
                 "success": True,
+                "id": recording.id,
                 "filename": filename,
-                "url": f"/media/recordings/{filename}"
+                "url": recording.url
             })
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)})
     return JsonResponse({"success": False, "error": "Invalid request method"})
 
-@csrf_exempt
+def _submit_job(request, kind):
+    # Jobs load model files and can replace the served model
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    try:
+        params = json.loads(request.body or b'{}')
+        job = job_runner.submit(kind, params, request.user)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'job': job_info(job)}, status=202)
+
+def _get_job(request, job_id):
+    if not request.user.is_authenticated:
+        raise Http404("Job not found")
+    # Picks up jobs left queued by a restart
+    job_runner.ensure_running()
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(user=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+@require_http_methods(["POST"])
 def train_model(request):
-    """Train the model (mock implementation)"""
-    return JsonResponse({
-        'success': True,
-        'message': 'Training not available in simplified mode',
-        'status': 'mock'
-    })
+    """Queue a training job: JSON {epochs?, batch_size?, actions?, ...}; poll /api/jobs/<id>/
 
-@csrf_exempt
+    Staff only, and a CSRF token is required like for any state-changing form.
+    """
+    return _submit_job(request, 'train')
+
+@require_http_methods(["POST"])
 def export_model(request):
-    """Export the model (mock implementation)"""
-    return JsonResponse({
-        'success': True,
-        'message': 'Export not available in simplified mode',
-        'status': 'mock'
-    })
+    """Queue an export of a Keras landmark model to NumPy: JSON {input?, activate?, features?}
+
+    ``input`` is a file name in MODEL_ARTIFACTS_DIR (e.g. a trained model).
+    """
+    return _submit_job(request, 'export')
+
+@login_required
+@require_http_methods(["GET"])
+def jobs_list(request):
+    """The user's most recent jobs (all users' for staff), optionally ?status=..."""
+    job_runner.ensure_running()
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(user=request.user)
+    if request.GET.get('status'):
+        jobs = jobs.filter(status=request.GET['status'])
+    return JsonResponse({'jobs': [job_info(job) for job in jobs[:50]]})
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def job_detail(request, job_id):
+    """Status and progress of one job"""
+    return JsonResponse({'job': job_info(_get_job(request, job_id))})
+
+@require_http_methods(["POST"])
+def job_cancel(request, job_id):
+    """Cancel a queued job, or stop a running one at its next step (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    job = _get_job(request, job_id)
+    if job.is_finished:
+        return JsonResponse({'error': f'Job already {job.status}', 'job': job_info(job)}, status=409)
+    return JsonResponse({'job': job_info(job_runner.cancel(job))})
 
 def recordings_list(request):
-    """List all recordings"""
+    """List recordings, one page at a time"""
     try:
-        recordings_dir = os.path.join(settings.MEDIA_ROOT, 'recordings')
-        recordings = []
-        
-        if os.path.exists(recordings_dir):
-            for filename in os.listdir(recordings_dir):
-                if filename.endswith('.wav'):
-                    file_path = os.path.join(recordings_dir, filename)
-                    creation_time = os.path.getctime(file_path)
-                    created_date = datetime.fromtimestamp(creation_time)
-                    
-                    recordings.append({
-                        "id": hash(filename) % 10000,  # Simple ID generation
-                        "filename": filename,
-                        "url": f"/media/recordings/{filename}",
-                        "created": created_date.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-        
-        return render(request, 'detection/recordings_list.html', {'recordings': recordings})
+        return render(request, 'detection/recordings_list.html', {'page': recordings_page(request)})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 def recording_detail(request, recording_id):
     """Show details of a specific recording"""
-    try:
-        recordings_dir = os.path.join(settings.MEDIA_ROOT, 'recordings')
-        # This is a simplified implementation
-        # In a real app, you'd store recording metadata in the database
-        
-        context = {
-            'recording_id': recording_id,
-            'message': 'Recording details not fully implemented in simplified mode'
-        }
-        return render(request, 'detection/recording_detail.html', context)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    recording = get_object_or_404(Recording, pk=recording_id)
+    return render(request, 'detection/recording_detail.html', {
+        'recording': recording,
+        'info': recording_info(recording),
+    })
 
 @csrf_exempt
 def model_status(request):
-    """Get current model status"""
+    """Get current model status; 503 until the served models are loaded and warmed up"""
     try:
-        info = sign_language_model.get_model_info()
+        model_lifecycle.start()
+        ready = model_lifecycle.is_ready()
+        lifecycle = model_lifecycle.status()
         return JsonResponse({
             'success': True,
-            'status': 'ready' if info.get('ready') else 'loading',
-            'model_info': info
-        })
+            'status': 'ready' if ready else lifecycle['state'],
+            'model_info': registry.get('landmarks').get_model_info() if ready else None,
+            'lifecycle': lifecycle
+        }, status=200 if ready else 503)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
@@ -0,0 +1,41 @@
+"""
+Binary landmark wire format.
+
+A request body with ``Content-Type: application/octet-stream`` carries packed
+little-endian float32 landmarks of shape (frames, 21, 3), i.e. 252 bytes per
+frame in x, y, z order. It is read with ``np.frombuffer`` without copying.
+"""
+
+import numpy as np
+
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+
+LANDMARK_DTYPE = np.dtype('<f4')
+LANDMARKS_PER_FRAME = 21
+FRAME_BYTES = LANDMARKS_PER_FRAME * 3 * LANDMARK_DTYPE.itemsize
+
+
+def is_binary_request(request):
+    return request.content_type == BINARY_CONTENT_TYPE
+
+
+def decode_landmarks(buffer):
+    """Return a read-only (frames, 21, 3) float32 view of ``buffer``.
+
+    Raises ``ValueError`` if the buffer is empty or not a whole number of frames.
+    """
+    size = len(buffer)
+    if size == 0 or size % FRAME_BYTES:
+        raise ValueError(
+            f'Invalid binary landmarks: expected a multiple of {FRAME_BYTES} bytes '
+            f'(21 x 3 float32 per frame), got {size}'
+        )
+    return np.frombuffer(buffer, dtype=LANDMARK_DTYPE).reshape(-1, LANDMARKS_PER_FRAME, 3)
+
+
+def encode_landmarks(landmarks):
+    """Pack a (21, 3) or (frames, 21, 3) array into the binary wire format."""
+    landmarks = np.asarray(landmarks, dtype=LANDMARK_DTYPE)
+    if landmarks.shape[-2:] != (LANDMARKS_PER_FRAME, 3):
+        raise ValueError(f'Expected (frames, 21, 3) landmarks, got {landmarks.shape}')
+    return landmarks.tobytes()
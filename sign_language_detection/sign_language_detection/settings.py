@@ -26,6 +26,110 @@ RECORDINGS_DIR = Path(MEDIA_ROOT) / 'recordings'
 # Ensure directories exist
 RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
 
+# The recording index is re-synced with RECORDINGS_DIR this often (seconds)
+# in the background, to pick up files added or removed outside the app
+RECORDINGS_RECONCILE_INTERVAL = 300
+
+# Recordings are never rewritten in place, so browsers may cache them for long
+RECORDINGS_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# New WAV recordings are transcoded in the background: downmixed to mono,
+# resampled and encoded as Opus ('auto' falls back to FLAC when no Opus
+# encoder is available). The WAV is removed unless RECORDINGS_KEEP_ORIGINAL;
+# recording URLs point at serve_audio, which maps the WAV name to the new file.
+RECORDINGS_TRANSCODE = True
+RECORDINGS_TRANSCODE_CODEC = 'auto'
+RECORDINGS_TRANSCODE_SAMPLE_RATE = 16000
+RECORDINGS_TRANSCODE_WORKERS = 2
+# Target Opus bitrate when encoding through ffmpeg (libsndfile picks its own)
+RECORDINGS_OPUS_BITRATE = 24000
+RECORDINGS_KEEP_ORIGINAL = False
+# Number of peak values stored per recording for drawing its waveform
+RECORDINGS_WAVEFORM_PEAKS = 200
+
+# Chunked uploads are assembled here and renamed into RECORDINGS_DIR, so keep
+# both on the same filesystem. Sessions idle for UPLOAD_SESSION_TTL seconds
+# are aborted by the purge_uploads command.
+UPLOADS_DIR = Path(MEDIA_ROOT) / 'uploads'
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# Images sent for landmark extraction are scaled down so that their longer
+# side is at most this many pixels (0 keeps the original size)
+IMAGE_MAX_SIDE = 640
+
+# MediaPipe Hands graphs (one per request thread, and one in tracking mode
+# per client stream sending X-Stream-Id) are closed after this many idle
+# seconds; at most HANDS_POOL_MAX_SESSIONS stream graphs are kept
+HANDS_POOL_IDLE_TIMEOUT = 60
+HANDS_POOL_MAX_SESSIONS = 32
+
+
+# Keypoint training data: one .npy per frame as recorded by the collection
+# script, and the consolidated memory-mapped dataset built from it
+KEYPOINT_DATA_DIR = BASE_DIR.parent / 'MP_Data'
+PACKED_DATASET_DIR = BASE_DIR.parent / 'MP_Data.packed'
+
+# Training and export jobs run in worker processes started from the web
+# process, at most JOBS_MAX_CONCURRENT at a time across all web processes.
+# Workers run at nice level JOBS_NICE with JOBS_TF_THREADS TensorFlow threads
+# so detection requests keep their CPU; trained and exported models are
+# written to MODEL_ARTIFACTS_DIR. Only staff users can start or cancel jobs.
+# A running job whose worker has not reported its pid within
+# JOBS_START_GRACE seconds is considered orphaned
+JOBS_MAX_CONCURRENT = 1
+JOBS_POLL_INTERVAL = 2
+JOBS_NICE = 10
+JOBS_TF_THREADS = 2
+JOBS_START_GRACE = 120
+MODEL_ARTIFACTS_DIR = BASE_DIR / 'detection' / 'artifacts'
+
+# Dynamic batching for landmark detection requests: concurrent requests are
+# grouped into one forward pass of up to DETECTION_BATCH_MAX_SIZE inputs,
+# waiting at most DETECTION_BATCH_MAX_WAIT_MS for the batch to fill. A
+# request gives up after DETECTION_BATCH_TIMEOUT seconds without a result
+DETECTION_BATCH_MAX_SIZE = 16
+DETECTION_BATCH_MAX_WAIT_MS = 3
+DETECTION_BATCH_TIMEOUT = 30
+
+# Serving models are loaded at startup from the first of MODEL_LOCAL_PATHS
+# that exists (then from the kagglehub cache), never downloaded unless
+# MODEL_ALLOW_DOWNLOAD. Before a model version serves requests it runs
+# MODEL_WARMUP_BATCHES batches of each of MODEL_WARMUP_BATCH_SIZES. Startup
+# counts as failed while a model is the untrained fallback, and is retried
+# after MODEL_STARTUP_RETRY_INTERVAL seconds, doubling with every failure up
+# to MODEL_STARTUP_MAX_RETRY_INTERVAL.
+MODEL_LOCAL_PATHS = [
+    BASE_DIR / 'detection' / 'artifacts' / 'hand_landmarks.npz',
+    BASE_DIR.parent / 'hand_landmarks.keras',
+]
+MODEL_ALLOW_DOWNLOAD = False
+MODEL_WARMUP_BATCHES = 3
+MODEL_WARMUP_BATCH_SIZES = [1, DETECTION_BATCH_MAX_SIZE]
+MODEL_STARTUP_RETRY_INTERVAL = 30
+MODEL_STARTUP_MAX_RETRY_INTERVAL = 600
+
+# Predictions are cached by hand shape (landmarks normalised to their
+# bounding box, quantised to PREDICTION_CACHE_STEP of its size) so frames of a
+# held letter skip inference. A coarser step hits more often but lets more
+# frames near a decision boundary reuse a neighbour's letter. The cache sits in
+# front of the landmark batcher, so it serves /app/api/detect-sign/ and the
+# /ws/detection/ stream alike.
+# PREDICTION_CACHE_SIZE = 0 disables the cache.
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL = 5.0
+PREDICTION_CACHE_STEP = 0.05
+
+# Detections of signed-in users are written to DetectionHistory in the
+# background: up to DETECTION_EVENTS_FLUSH_SIZE rows per bulk insert, at most
+# DETECTION_EVENTS_FLUSH_INTERVAL_MS after they were made. Events beyond
+# DETECTION_EVENTS_QUEUE_SIZE pending ones are dropped
+DETECTION_EVENTS_FLUSH_SIZE = 200
+DETECTION_EVENTS_FLUSH_INTERVAL_MS = 1000
+DETECTION_EVENTS_QUEUE_SIZE = 10000
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -49,6 +153,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'corsheaders',
+    'channels',
     'detection',
     'accounts',
 ]
@@ -87,6 +192,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'sign_language_detection.wsgi.application'
 
+# WebSocket endpoints (streaming detection) are served through Channels
+ASGI_APPLICATION = 'sign_language_detection.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
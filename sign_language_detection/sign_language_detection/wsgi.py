@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sign_language_detection.settings')
 
 application = get_wsgi_application()
+
+# Load and warm up the models now; /app/api/health/ answers 503 until they are ready
+from detection.lifecycle import model_lifecycle
+
+model_lifecycle.start()
@@ -1,3 +1,8 @@
+import os
+import queue
+import sys
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
 import cv2
@@ -9,6 +14,12 @@ from tkinter import scrolledtext
 import sounddevice as sd
 import wave
 
+# Shared keypoint tooling lives in the Django app's detection package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sign_language_detection'))
+from detection.features import FRAME_FEATURE_SIZE, frame_features
+from detection.keypoints import KeypointExtractor
+from detection.streaming import PredictionSmoother, SequenceWindow
+
 # Load the trained model
 model = load_model('sign_language_model.h5')
 
@@ -20,6 +31,108 @@ mp_drawing = mp.solutions.drawing_utils  # Drawing utilities
 actions = np.array(['hello', 'thanks', 'iloveyou'])
 threshold = 0.8
 
+
+class FPSMeter:
+    """Exponentially smoothed events-per-second counter."""
+
+    def __init__(self, smoothing=0.9):
+        self.smoothing = smoothing
+        self.fps = 0.0
+        self._last = None
+
+    def tick(self):
+        now = time.perf_counter()
+        if self._last is not None and now > self._last:
+            rate = 1.0 / (now - self._last)
+            self.fps = rate if self.fps == 0.0 else self.smoothing * self.fps + (1 - self.smoothing) * rate
+        self._last = now
+
+
+class DetectionWorker(threading.Thread):
+    """Capture frames and run Holistic + the action model off the Tk thread.
+
+    One Holistic instance is kept for the whole session so its graph is only
+    built once and landmarks are tracked between frames. Annotated frames are
+    handed to the UI through a small queue; when the UI falls behind the
+    oldest frame is dropped, so what is shown is never more than a couple of
+    frames old.
+    """
+
+    def __init__(self, camera_index=0, queue_size=2):
+        super().__init__(daemon=True)
+        self.camera_index = camera_index
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.keypoint_extractor = KeypointExtractor()
+        self.capture_fps = FPSMeter()
+        self.inference_fps = FPSMeter()
+        self.dropped = 0
+        # sign_language_detection.py trains on frame_features; models trained
+        # before it did take the raw keypoints
+        width = model.input_shape[-1]
+        if width not in (FRAME_FEATURE_SIZE, self.keypoint_extractor.size):
+            raise ValueError(f"Model expects {width} values per frame, neither frame features "
+                             f"({FRAME_FEATURE_SIZE}) nor raw keypoints ({self.keypoint_extractor.size})")
+        self.features = width == FRAME_FEATURE_SIZE
+        self.window = SequenceWindow(30, width)
+        self.smoother = PredictionSmoother(history=10, threshold=threshold, max_sentence=5)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.camera_index)
+        try:
+            with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5) as holistic:
+                while not self.stop_event.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    self.capture_fps.tick()
+
+                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    rgb.flags.writeable = False
+                    results = holistic.process(rgb)
+                    rgb.flags.writeable = True
+                    self.draw_landmarks(rgb, results)
+                    keypoints = self.keypoint_extractor.extract(results)
+                    self.update_sentence(frame_features(keypoints) if self.features else keypoints)
+                    self.inference_fps.tick()
+
+                    self.publish((rgb, ' '.join(self.smoother.sentence)))
+        finally:
+            cap.release()
+
+    def publish(self, item):
+        # Drop the stalest frame rather than blocking the capture loop
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def update_sentence(self, frame):
+        self.window.append(frame)
+        if not self.window.is_full:
+            return
+
+        # A direct call avoids the per-call setup cost of model.predict
+        res = model(self.window.batch(), training=False).numpy()[0]
+        best = np.argmax(res)
+        self.smoother.update(actions[best], float(res[best]))
+
+    @staticmethod
+    def draw_landmarks(image, results):
+        mp_drawing.draw_landmarks(image, results.face_landmarks, mp_holistic.FACEMESH_TESSELATION)
+        mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_holistic.POSE_CONNECTIONS)
+        mp_drawing.draw_landmarks(image, results.left_hand_landmarks, mp_holistic.HAND_CONNECTIONS)
+        mp_drawing.draw_landmarks(image, results.right_hand_landmarks, mp_holistic.HAND_CONNECTIONS)
+
 # Initialize the main window
 class SignLanguageApp:
     def __init__(self, root):
@@ -40,6 +153,10 @@ class SignLanguageApp:
         self.action_label = ttk.Label(self.video_frame, text='Detected Action: None', font=('Helvetica', 16), background='#f0f0f0')
         self.action_label.pack(padx=10, pady=10)
 
+        # Measured capture / inference / display rates
+        self.fps_label = ttk.Label(self.video_frame, text='', font=('Helvetica', 10), background='#f0f0f0')
+        self.fps_label.pack(padx=10)
+
         # Create a frame for audio controls
         self.audio_frame = ttk.Frame(self.root, padding='10', style='My.TFrame')
         self.audio_frame.pack(fill='x', padx=10, pady=10)
@@ -63,12 +180,10 @@ class SignLanguageApp:
         self.stop_button = ttk.Button(self.control_frame, text='Stop Detection', command=self.stop_detection, style='My.TButton')
         self.stop_button.pack(side='right', padx=10, pady=10)
 
-        # Initialize video capture
-        self.cap = None
+        # Capture and inference run in a DetectionWorker thread
+        self.worker = None
         self.running = False
-        self.sequence = []
-        self.sentence = []
-        self.predictions = []
+        self.display_fps = FPSMeter()
 
         # Audio recording state
         self.recording = False
@@ -82,73 +197,55 @@ class SignLanguageApp:
 
     def start_detection(self):
         if not self.running:
-            self.cap = cv2.VideoCapture(0)
+            self.worker = DetectionWorker()
+            self.worker.start()
             self.running = True
             self.update_frame()
 
     def stop_detection(self):
         if self.running:
             self.running = False
-            self.cap.release()
+            self.worker.stop()
+            self.worker.join(timeout=2)
+            self.worker = None
             self.video_label.config(image='')
+            self.fps_label.config(text='')
 
     def update_frame(self):
-        if self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                # Convert the frame to RGB
-                cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(cv2image)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
-
-                # Process the frame with MediaPipe
-                with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5) as holistic:
-                    image, results = self.mediapipe_detection(frame, holistic)
-                    self.draw_landmarks(image, results)
-
-                    # Extract keypoints
-                    keypoints = self.extract_keypoints(results)
-                    self.sequence.append(keypoints)
-                    self.sequence = self.sequence[-30:]
-
-                    if len(self.sequence) == 30:
-                        res = model.predict(np.expand_dims(self.sequence, axis=0))[0]
-                        self.predictions.append(np.argmax(res))
-
-                        # Smooth predictions
-                        if np.unique(self.predictions[-10:])[0] == np.argmax(res) and res[np.argmax(res)] > threshold:
-                            if len(self.sentence) == 0 or actions[np.argmax(res)] != self.sentence[-1]:
-                                self.sentence.append(actions[np.argmax(res)])
-                            if len(self.sentence) > 5:
-                                self.sentence = self.sentence[-5:]
-
-                        # Update the action label
-                        self.action_label.config(text='Detected Action: ' + ' '.join(self.sentence))
-
-            self.root.after(10, self.update_frame)
-
-    def mediapipe_detection(self, image, model):
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
-        results = model.process(image)
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        return image, results
-
-    def draw_landmarks(self, image, results):
-        mp_drawing.draw_landmarks(image, results.face_landmarks, mp_holistic.FACEMESH_TESSELATION)
-        mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_holistic.POSE_CONNECTIONS)
-        mp_drawing.draw_landmarks(image, results.left_hand_landmarks, mp_holistic.HAND_CONNECTIONS)
-        mp_drawing.draw_landmarks(image, results.right_hand_landmarks, mp_holistic.HAND_CONNECTIONS)
-
-    def extract_keypoints(self, results):
-        pose = np.array([[res.x, res.y, res.z, res.visibility] for res in results.pose_landmarks.landmark]).flatten() if results.pose_landmarks else np.zeros(33*4)
-        face = np.array([[res.x, res.y, res.z] for res in results.face_landmarks.landmark]).flatten() if results.face_landmarks else np.zeros(468*3)
-        lh = np.array([[res.x, res.y, res.z] for res in results.left_hand_landmarks.landmark]).flatten() if results.left_hand_landmarks else np.zeros(21*3)
-        rh = np.array([[res.x, res.y, res.z] for res in results.right_hand_landmarks.landmark]).flatten() if results.right_hand_landmarks else np.zeros(21*3)
-        return np.concatenate([pose, face, lh, rh])
+        if not self.running:
+            return
+        if not self.worker.is_alive():
+            # Camera closed or failed to open
+            self.stop_detection()
+            return
+
+        # Only the newest frame is shown, older ones are skipped
+        item = None
+        try:
+            while True:
+                item = self.worker.frames.get_nowait()
+        except queue.Empty:
+            pass
+
+        if item is not None:
+            rgb, sentence = item
+            imgtk = ImageTk.PhotoImage(image=Image.fromarray(rgb))
+            self.video_label.imgtk = imgtk
+            self.video_label.configure(image=imgtk)
+            self.action_label.config(text='Detected Action: ' + sentence)
+            self.display_fps.tick()
+            self.fps_label.config(text=(
+                f'Capture {self.worker.capture_fps.fps:.1f} fps | '
+                f'Inference {self.worker.inference_fps.fps:.1f} fps | '
+                f'Display {self.display_fps.fps:.1f} fps | '
+                f'Dropped {self.worker.dropped}'
+            ))
+
+        self.root.after(10, self.update_frame)
+
+    def on_close(self):
+        self.stop_detection()
+        self.root.destroy()
 
     def toggle_recording(self):
         if not self.recording:
@@ -180,4 +277,5 @@ class SignLanguageApp:
 if __name__ == '__main__':
     root = tk.Tk()
     app = SignLanguageApp(root)
+    root.protocol('WM_DELETE_WINDOW', app.on_close)
     root.mainloop() 
\ No newline at end of file